@@ -71,7 +71,8 @@ if not st.session_state.logged_in:
                                 "email": user["email"],
                                 "full_name": user.get("full_name", "Not Provided"),
                                 "dob": user.get("dob", "Not Provided"),
-                                "age": user.get("age", "Not Provided")
+                                "age": user.get("age", "Not Provided"),
+                                "sex": user.get("sex")
                             })
 
                             st.session_state["just_logged_in"] = True
@@ -98,6 +99,13 @@ if not st.session_state.logged_in:
                 key="signup_dob"
             )
 
+            # Only used to pick age/sex-specific reference ranges
+            su_sex = st.selectbox(
+                "Sex (optional)",
+                ["Prefer not to say", "Female", "Male"],
+                key="signup_sex"
+            )
+
             su_pass = st.text_input("Password", type="password", key="signup_pass")
             su_pass2 = st.text_input("Confirm Password", type="password", key="signup_pass2")
 
@@ -125,7 +133,8 @@ if not st.session_state.logged_in:
                             su_email.strip(),
                             su_pass.strip(),
                             full_name=su_name.strip() if su_name else None,
-                            dob=dob_str
+                            dob=dob_str,
+                            sex={"Female": "F", "Male": "M"}.get(su_sex)
                         )
 
                         # Save into session for immediate login
@@ -133,7 +142,8 @@ if not st.session_state.logged_in:
                             "email": user["email"],
                             "full_name": user.get("full_name", "Not Provided"),
                             "dob": user.get("dob", "Not Provided"),
-                            "age": user.get("age", "Not Provided")
+                            "age": user.get("age", "Not Provided"),
+                            "sex": user.get("sex")
                         })
 
                         st.session_state["just_signed_up"] = True
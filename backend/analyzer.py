@@ -1,7 +1,10 @@
 # analyzer.py (updated)
+import numpy as np
 import pandas as pd
 import re
 
+from .reference_ranges import get_reference_index, band_ids, age_bucket, sex_code
+
 STANDARD_RANGES = {
     'HEMOGLOBIN': (13.5, 17.5),
     'RBC': (4.5, 5.9),
@@ -66,7 +69,150 @@ def classify_result(value, low, high):
 
     return "No Range Found"
 
-def analyze_results(df):
+# ----------- COLUMNAR HELPERS -----------
+def _codes(values):
+    """Integer code per row, equal for equal values; unhashable values get one code per row."""
+    try:
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    except TypeError:
+        return np.arange(len(values)), len(values)
+    # missing values share one extra code
+    return np.where(codes < 0, len(uniques), codes), len(uniques) + 1
+
+def _per_distinct(columns, fn):
+    """
+    Calls fn once per distinct combination of values across the given columns
+    (with the first row's actual objects) and returns (codes, results), so that
+    results[codes] broadcasts back to every row.
+    """
+    codes = np.zeros(len(columns[0]), dtype=np.int64)
+    for col in columns:
+        col_codes, n = _codes(col)
+        codes = codes * n + col_codes
+    codes, uniques = pd.factorize(codes)
+    # first row of each combination: later writes of the reversed rows win
+    first_rows = np.empty(len(uniques), dtype=np.int64)
+    first_rows[codes[::-1]] = np.arange(len(codes))[::-1]
+    return codes, [fn(*(col[i] for col in columns)) for i in first_rows]
+
+def _to_float(raw_val):
+    try:
+        return float(raw_val)
+    except Exception:
+        return None
+
+def _values(df):
+    """Float array of values plus a mask of rows whose value cannot be read as a number."""
+    if "Value" not in df.columns:
+        return np.full(len(df), np.nan), np.ones(len(df), dtype=bool)
+    col = df["Value"]
+    if pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+        return col.to_numpy(dtype=float, na_value=np.nan), np.zeros(len(df), dtype=bool)
+    # object column: float() per element so strings, None and NaN behave exactly as before
+    floats = [_to_float(v) for v in col.tolist()]
+    invalid = np.fromiter((f is None for f in floats), dtype=bool, count=len(floats))
+    return np.array([np.nan if f is None else f for f in floats], dtype=float), invalid
+
+def _report_range(parsed_range, raw_range_text):
+    """(uses report range, low, high, label) for one parsed range; mirrors the labels of the report branch."""
+    if not parsed_range:
+        return False, None, None, None
+    low, high, comp = parsed_range
+    if low is not None and high is not None:
+        label = f"{low} - {high} (Report)"
+    elif comp == '<' or (comp is None and low is None and high is not None):
+        label = f"< {high} (Report)"
+    elif comp == '>' or (comp is None and low is not None and high is None):
+        label = f"> {low} (Report)"
+    else:
+        label = raw_range_text or "Report Range"
+    return True, low, high, label
+
+def _standard_range(test_name):
+    """(kind, low, high, label) from the first STANDARD_RANGES key contained in the name; kind is '<', '>', 'range' or None."""
+    name = str(test_name).strip().upper()
+    for key, std in STANDARD_RANGES.items():
+        if key in name:
+            if isinstance(std[0], str):
+                op, limit = std
+                return op, None, limit, f"{op} {limit} (Standard)"
+            low, high = std
+            return "range", low, high, f"{low} - {high} (Standard)"
+    return None, None, None, "N/A"
+
+def _column(df, name, default):
+    return df[name].to_numpy(dtype=object) if name in df.columns else np.full(len(df), default, dtype=object)
+
+def _nan_for_none(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+def classify_array(value, low, high):
+    """Vectorized classify_result: low/high are float arrays with NaN where a bound is missing."""
+    has_low, has_high = ~np.isnan(low), ~np.isnan(high)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d_low = (low - value) / np.maximum(low, 1e-6)
+        d_high = (value - high) / np.maximum(high, 1e-6)
+    only_high = has_high & ~has_low
+    only_low = has_low & ~has_high
+    both = has_low & has_high
+    below, above = both & (value < low), both & (value > high)
+    return np.select(
+        [
+            only_high & (value >= high) & (d_high < 0.1),
+            only_high & (value >= high),
+            only_low & (value <= low) & (d_low < 0.1),
+            only_low & (value <= low),
+            below & (d_low < 0.1),
+            below & (d_low < 0.25),
+            below,
+            above & (d_high < 0.1),
+            above & (d_high < 0.25),
+            above,
+            has_low | has_high,
+        ],
+        [
+            "Slightly High", "High",
+            "Slightly Low", "Low",
+            "Slightly Low", "Moderately Low", "Severely Low",
+            "Slightly High", "Moderately High", "Severely High",
+            "Normal",
+        ],
+        default="No Range Found",
+    ).astype(object)
+
+def _demographic_bands(df, names, age, sex):
+    """
+    Band id per row from the age/sex reference index (-1 = none), or None when
+    neither the call nor the frame ("Age"/"Sex" columns) gives any demographics.
+    """
+    if age is None and sex is None and "Age" not in df.columns and "Sex" not in df.columns:
+        return None
+    index = get_reference_index()
+    n = len(df)
+    codes, test_ids = _per_distinct([names], lambda name: index["test_ids"].get(str(name).strip().upper(), -1))
+    test_ids = np.array(test_ids, dtype=np.int64)[codes]
+    if "Age" in df.columns:
+        codes, buckets = _per_distinct([_column(df, "Age", None)], age_bucket)
+        ages = np.array(buckets, dtype=np.int64)[codes]
+    else:
+        ages = np.full(n, age_bucket(age), dtype=np.int64)
+    if "Sex" in df.columns:
+        codes, sex_codes = _per_distinct([_column(df, "Sex", None)], sex_code)
+        sexes = np.array(sex_codes, dtype=np.int64)[codes]
+    else:
+        sexes = np.full(n, sex_code(sex), dtype=np.int64)
+    return band_ids(test_ids, sexes, ages, index)
+
+# ----------- ANALYSIS -----------
+def analyze_results(df, age=None, sex=None):
+    """
+    Adds "Status" and "Reference Range Used" to df (in place) and returns it.
+    The report's own parsed range wins. Otherwise, when the patient's age/sex is
+    known (arguments, or per-row "Age"/"Sex" columns for bulk re-analysis), the
+    matching band from data/reference_ranges.json is used; failing that, the first
+    STANDARD_RANGES key contained in the test name. Works column-wise: ranges and
+    labels are resolved once per distinct range/name, statuses with np.select.
+    """
     if df is None or df.empty:
         if df is None:
             df = pd.DataFrame()
@@ -74,65 +220,57 @@ def analyze_results(df):
         df["Reference Range Used"] = []
         return df
 
-    statuses = []
-    used_ranges = []
-
-    for _, row in df.iterrows():
-        test_name = str(row.get("Test Name", "")).strip().upper()
-        raw_val = row.get("Value", None)
-        parsed_range = row.get("Reference Range Parsed", None)
-        raw_range_text = row.get("Reference Range Raw", "")
-
-        try:
-            value = float(raw_val)
-        except Exception:
-            statuses.append("Invalid Value")
-            used_ranges.append("N/A")
-            continue
-
-        status = "Normal"
-        used_range_label = "N/A"
-
-        # Prefer report-parsed range
-        if parsed_range:
-            low, high, comp = parsed_range
-            status = classify_result(value, low, high)
-            if low is not None and high is not None:
-                used_range_label = f"{low} - {high} (Report)"
-            elif comp == '<' or (comp is None and low is None and high is not None):
-                used_range_label = f"< {high} (Report)"
-            elif comp == '>' or (comp is None and low is not None and high is None):
-                used_range_label = f"> {low} (Report)"
-            else:
-                used_range_label = raw_range_text or "Report Range"
-        else:
-            # fallback to STANDARD_RANGES
-            matched = None
-            for key in STANDARD_RANGES:
-                if key in test_name:
-                    matched = key
-                    break
-
-            if matched:
-                std = STANDARD_RANGES[matched]
-                if isinstance(std[0], str):
-                    op, limit = std
-                    used_range_label = f"{op} {limit} (Standard)"
-                    if op == '<':
-                        status = "Slightly High" if value >= limit else "Normal"
-                    else:
-                        status = "Slightly Low" if value <= limit else "Normal"
-                else:
-                    low, high = std
-                    used_range_label = f"{low} - {high} (Standard)"
-                    status = classify_result(value, low, high)
-            else:
-                status = "No Range Found"
-                used_range_label = "N/A"
-
-        statuses.append(status)
-        used_ranges.append(used_range_label)
-
-    df["Status"] = statuses
-    df["Reference Range Used"] = used_ranges
+    value, invalid = _values(df)
+
+    # report ranges, one resolution per distinct (parsed range, raw text) pair
+    codes, report = _per_distinct(
+        [_column(df, "Reference Range Parsed", None), _column(df, "Reference Range Raw", "")], _report_range
+    )
+    use_report = np.array([r[0] for r in report], dtype=bool)[codes]
+    report_low = _nan_for_none([r[1] for r in report])[codes]
+    report_high = _nan_for_none([r[2] for r in report])[codes]
+    report_labels = np.array([r[3] for r in report] + [None], dtype=object)[:-1][codes]
+
+    # standard ranges, one substring scan per distinct test name
+    names = _column(df, "Test Name", "")
+    codes, standard = _per_distinct([names], _standard_range)
+    kind = np.array([s[0] for s in standard] + [None], dtype=object)[:-1][codes]
+    fallback_low = _nan_for_none([s[1] for s in standard])[codes]
+    fallback_high = _nan_for_none([s[2] for s in standard])[codes]
+    labels = np.array([s[3] for s in standard] + [None], dtype=object)[:-1][codes]
+
+    # age/sex bands take over from the standard table where one applies
+    band = _demographic_bands(df, names, age, sex)
+    if band is not None and (band >= 0).any():
+        index = get_reference_index()
+        use_band = band >= 0
+        b = band[use_band]
+        kind[use_band] = index["kind"][b]
+        fallback_low[use_band] = index["low"][b]
+        fallback_high[use_band] = index["high"][b]
+        labels[use_band] = index["label"][b]
+
+    std_lt = ~use_report & (kind == '<')
+    std_gt = ~use_report & (kind == '>')
+    std_range = ~use_report & (kind == "range")
+
+    low = np.where(use_report, report_low, fallback_low)
+    high = np.where(use_report, report_high, fallback_high)
+
+    status = np.select(
+        [invalid, use_report | std_range, std_lt, std_gt],
+        [
+            "Invalid Value",
+            classify_array(value, low, high),
+            np.where(value >= high, "Slightly High", "Normal"),
+            np.where(value <= high, "Slightly Low", "Normal"),
+        ],
+        default="No Range Found",
+    ).astype(object)
+
+    labels[use_report] = report_labels[use_report]
+    labels[invalid] = "N/A"
+
+    df["Status"] = status.tolist()
+    df["Reference Range Used"] = labels.tolist()
     return df
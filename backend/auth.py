@@ -50,8 +50,8 @@ def calculate_age(dob_str: str):
 
 
 # ---------- CREATE USER ----------
-def create_user(email: str, password: str, full_name: str = None, dob: str = None):
-    """Creates user with full name + DOB + auto age calculation."""
+def create_user(email: str, password: str, full_name: str = None, dob: str = None, sex: str = None):
+    """Creates user with full name + DOB + auto age calculation (+ optional sex for reference ranges)."""
     # Validate email
     try:
         v = validate_email(email)
@@ -75,6 +75,7 @@ def create_user(email: str, password: str, full_name: str = None, dob: str = Non
         "full_name": full_name.strip() if full_name else "Not Provided",
         "dob": dob if dob else None,
         "age": age,
+        "sex": sex if sex else None,
         "created_at": datetime.utcnow()
     }
 
@@ -101,7 +102,8 @@ def authenticate_user(email: str, password: str):
         "email": user["email"],
         "full_name": user.get("full_name", "Not Provided"),
         "dob": user.get("dob"),
-        "age": user.get("age")
+        "age": user.get("age"),
+        "sex": user.get("sex")
     }
     return safe_user
 
@@ -0,0 +1,160 @@
+# backend/cache.py
+import os
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    """Hashes a file in chunks so large scans are never fully read into memory."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ----------- MEMORY TIER -----------
+class LRUCache:
+    """Thread-safe in-memory LRU cache bounded by entry count."""
+
+    def __init__(self, max_items=128):
+        self.max_items = max_items
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# ----------- DISK TIER -----------
+class DiskCache:
+    """
+    Pickle-per-key cache in a directory, bounded by total size on disk.
+    Reads refresh a file's mtime so eviction removes the least recently used entries.
+    A running total of the directory size is kept, so the directory is only listed
+    when that total goes over max_bytes (and once, on the first write, to seed it).
+    Eviction then frees down to EVICT_TO of max_bytes, so a full cache is listed once
+    per that much new data rather than on every write. Other processes writing to
+    the same directory are picked up at each listing.
+    """
+
+    EVICT_TO = 0.9
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # bytes on disk, unknown until the first listing
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # corrupt or unreadable entry: drop it
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def set(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._total is not None:
+                self._total += size - replaced
+                if self._total <= self.max_bytes:
+                    return
+        self._evict()
+
+    def _evict(self):
+        """Lists the directory, removes least recently used entries down to EVICT_TO of max_bytes, resets the total."""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".pkl"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            entries.sort()
+            target = self.max_bytes if total <= self.max_bytes else self.max_bytes * self.EVICT_TO
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._total = total
+
+
+# ----------- TIERED CACHE -----------
+class TieredCache:
+    """Memory LRU in front of an optional disk tier; disk hits are promoted to memory."""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception:
+                # disk tier is best effort; memory tier still serves hits
+                pass
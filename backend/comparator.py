@@ -1,97 +1,82 @@
 # backend/comparator.py
+import os
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from .analyzer import STANDARD_RANGES  # Import normal ranges for overlay
+from .trends import trends_from_history
+from .visualizer import cached_png, chart_key, figure_png, new_figure
 
-def generate_trend_analysis(history_df):
-    """Analyzes a user's report history to find meaningful changes and critical deviations."""
-    if history_df.empty or len(history_df['upload_date'].unique()) < 2:
-        return "This is your first report. Upload future reports to track trends!", {}
-
-    summary = "## 📈 Your Health Trends\n\nHere's how your latest report compares to the previous one:\n"
-    
-    # Convert to datetime
-    history_df['upload_date'] = pd.to_datetime(history_df['upload_date'], errors='coerce')
-    all_dates = sorted(history_df['upload_date'].dropna().unique())
-    latest_date = all_dates[-1]
-    previous_date = all_dates[-2]
-
-    latest_report = history_df[history_df['upload_date'] == latest_date]
-    previous_report = history_df[history_df['upload_date'] == previous_date]
-
-    trends = {}
-    critical_change = None  # track biggest deviation
-    max_change = 0
-
-    all_test_names = history_df['test_name'].unique()
-
-    for test_name in all_test_names:
-        trends.setdefault(test_name, {'dates': [], 'values': []})
-        
-        # Add historical values for plotting
-        all_values = history_df[history_df['test_name'] == test_name].sort_values(by='upload_date')
-        trends[test_name]['dates'] = list(all_values['upload_date'])
-        trends[test_name]['values'] = list(all_values['value'])
-
-        current_test = latest_report[latest_report['test_name'] == test_name]
-        prev_test = previous_report[previous_report['test_name'] == test_name]
-
-        if not current_test.empty and not prev_test.empty:
-            prev_val = prev_test.iloc[0]['value']
-            curr_val = current_test.iloc[0]['value']
-            curr_status = current_test.iloc[0]['status']
-            prev_status = prev_test.iloc[0]['status']
-
-            # Compute percentage change
-            if prev_val != 0:
-                change_percent = ((curr_val - prev_val) / abs(prev_val)) * 100
-            else:
-                change_percent = 0
+# Series longer than TREND_DOWNSAMPLE_ABOVE points are downsampled (LTTB) to TREND_MAX_POINTS
+# before plotting. Below roughly 10-20k points Matplotlib draws the full series as fast as
+# LTTB + a short plot, and the PNG is smaller (benchmark_trend_plot.py)
+TREND_MAX_POINTS = int(os.environ.get("LAB_TREND_MAX_POINTS", 300))
+TREND_DOWNSAMPLE_ABOVE = int(os.environ.get("LAB_TREND_DOWNSAMPLE_ABOVE", 20000))
 
-            if abs(change_percent) > max_change:
-                max_change = abs(change_percent)
-                critical_change = (test_name, change_percent, curr_status)
-
-            # Build summary
-            if curr_status != 'Normal' and prev_status == 'Normal':
-                summary += f"\n- **(⚠️ New Alert)** {test_name}: Became **{curr_status}** ({curr_val:.2f}) from 'Normal'."
-            elif curr_status == 'Normal' and prev_status != 'Normal':
-                summary += f"\n- **(✅ Improvement)** {test_name}: Returned to **Normal** ({curr_val:.2f}) from '{prev_status}'."
-            elif curr_status != 'Normal' and curr_status != prev_status:
-                summary += f"\n- **(Change)** {test_name}: Shifted from '{prev_status}' to **'{curr_status}'** ({curr_val:.2f})."
-            elif curr_status != 'Normal':
-                direction = "increased" if change_percent > 0 else "decreased"
-                if abs(change_percent) > 1:
-                    summary += f"\n- **(Monitoring)** {test_name}: Still **{curr_status}**, {direction} by {abs(change_percent):.1f}%."
-
-    # Add highlight for the largest deviation
-    if critical_change:
-        name, change, status = critical_change
-        direction = "increased" if change > 0 else "decreased"
-        summary = f"### ⚠️ Biggest Change: **{name}** ({status}) — {direction} by {abs(change):.1f}%\n\n" + summary
-
-    if summary.strip().endswith("previous one:"):
-        summary += "\nNo significant changes from your previous report. Keep up the good work!"
-
-    return summary, trends
-
-
-
-def create_trend_plot(trend_data, test_to_plot):
-    """Creates a Matplotlib figure for a specific test trend."""
-    fig, ax = plt.subplots(figsize=(10, 5))
+def generate_trend_analysis(history_df):
+    """
+    Analyzes a user's report history to find meaningful changes and critical deviations.
+    One grouping pass over the history (see backend/trends.py); the frame is not modified.
+    """
+    return trends_from_history(history_df)
+
+
+
+# ----------- DOWNSAMPLING -----------
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points (first and last
+    always kept) that preserve the visual shape of the series y(x).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    bucket = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def downsample_trend(dates, values, max_points=TREND_MAX_POINTS, downsample_above=TREND_DOWNSAMPLE_ABOVE):
+    """
+    (dates, values) cut to max_points plottable points when longer than
+    downsample_above; shorter series are returned as is.
+    """
+    if len(dates) <= max(max_points, downsample_above):
+        return dates, values
+    x = pd.to_datetime(pd.Series(dates), errors="coerce")
+    y = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    # missing dates or values are never drawn, so they are dropped before picking points
+    keep = np.flatnonzero(x.notna().to_numpy() & np.isfinite(y))
+    x = (x.iloc[keep] - x.iloc[keep].min()).dt.total_seconds().to_numpy()
+    picked = keep[lttb_indices(x, y[keep], max_points)].tolist()
+    return [dates[i] for i in picked], [values[i] for i in picked]
+
+
+# ----------- TREND PLOT -----------
+def create_trend_plot(trend_data, test_to_plot, max_points=TREND_MAX_POINTS, downsample_above=TREND_DOWNSAMPLE_ABOVE):
+    """Creates a Matplotlib figure (no pyplot) for a specific test trend; long series are downsampled."""
+    fig = new_figure((10, 5))
+    ax = fig.subplots()
     
     if test_to_plot not in trend_data or not trend_data[test_to_plot]['dates']:
         ax.set_title(f"No data available for {test_to_plot}")
-        plt.close(fig)
         return fig
         
     data = trend_data[test_to_plot]
+    dates, values = downsample_trend(data['dates'], data['values'], max_points, downsample_above)
     
-    if len(data['dates']) == 1:
-        ax.plot(data['dates'], data['values'], 'o', color='blue')
+    if len(dates) == 1:
+        ax.plot(dates, values, 'o', color='blue')
     else:
-        ax.plot(data['dates'], data['values'], marker='o', linestyle='-', linewidth=2, color='blue')
+        ax.plot(dates, values, marker='o', linestyle='-', linewidth=2, color='blue')
     
     # Add standard normal range shading
     matched_key = next((key for key in STANDARD_RANGES if key in test_to_plot.upper()), None)
@@ -103,8 +88,25 @@ def create_trend_plot(trend_data, test_to_plot):
     ax.set_title(f"Trend for {test_to_plot}", fontsize=13, pad=10)
     ax.set_ylabel("Value", fontsize=11)
     ax.set_xlabel("Date", fontsize=11)
-    plt.xticks(rotation=45)
-    plt.grid(alpha=0.3)
-    plt.tight_layout()
-    plt.close(fig)
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
     return fig
+
+
+def trend_plot_png(trend_data, test_to_plot, max_points=TREND_MAX_POINTS, downsample_above=TREND_DOWNSAMPLE_ABOVE):
+    """
+    PNG bytes of create_trend_plot, cached by a hash of the plotted series
+    (backend/visualizer.py): any new, deleted or corrected value changes the
+    key, and users with identical series share one render.
+    """
+    data = trend_data.get(test_to_plot) or {'dates': [], 'values': []}
+    # hash the series as numpy buffers: long histories would be slow through JSON
+    dates = pd.to_datetime(pd.Series(data['dates'], dtype=object), errors="coerce").to_numpy("datetime64[ns]")
+    values = pd.to_numeric(pd.Series(data['values'], dtype=object), errors="coerce").to_numpy(dtype=float)
+    return cached_png(
+        chart_key("trend", test_to_plot, max_points, downsample_above, dates.tobytes(), values.tobytes()),
+        lambda: figure_png(
+            create_trend_plot(trend_data, test_to_plot, max_points, downsample_above), dpi=100, bbox_inches=None
+        ),
+    )
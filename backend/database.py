@@ -1,8 +1,11 @@
 # backend/database.py
 import os
+import warnings
 from datetime import datetime
 import pandas as pd
-from pymongo import MongoClient
+from pymongo import InsertOne, MongoClient, ReplaceOne
+
+from .trends import TREND_STATE_VERSION, add_report_to_state, build_trend_state, summary_from_state
 
 # ---------------- MONGO CONNECTION ----------------
 MONGO_URI = os.environ.get(
@@ -13,36 +16,55 @@ MONGO_URI = os.environ.get(
 client = MongoClient(MONGO_URI)
 db = client["lab_report_db"]
 reports_col = db["reports"]
+trend_state_col = db["trend_state"]
+
+
+def _float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
 
 # ------------------------------------------------------------
-# SAVE — FULL REPORT (for Upload Page)
+# BUILD — REPORT DOCUMENT
 # ------------------------------------------------------------
-def save_full_report_to_db(username, analyzed_df, summary, diagnosis, raw_text, chart_path, filename):
+def build_report_doc(username, analyzed_df, summary, diagnosis, raw_text, chart_path, filename, chart_png=None,
+                     file_hash=None, upload_date=None):
     """
-    Saves EVERYTHING into MongoDB:
+    Builds the MongoDB document for one report:
       - username
       - test results
       - summary
       - diagnosis
       - raw extracted text
-      - chart (base64 image)
+      - chart (base64 image, from PNG bytes or an image file)
       - filename
-      - upload timestamp
+      - upload timestamp (now, unless upload_date is given, e.g. an archived report's own date)
+      - file_hash (sha256 of the source file, when given; see save_full_reports_to_db)
     """
 
-    # Convert tests to list of objects
+    # Convert tests to list of objects (value/unit are canonical; the printed ones are kept when present)
     tests = []
     for _, row in analyzed_df.iterrows():
-        tests.append({
+        test = {
             "test_name": row["Test Name"],
             "value": float(row["Value"]),
             "status": row["Status"]
-        })
+        }
+        if "Unit" in row:
+            test["unit"] = row["Unit"]
+        if "Value Original" in row:
+            test["value_original"] = _float_or_none(row["Value Original"])
+            test["unit_original"] = row.get("Unit Original", "")
+        tests.append(test)
 
     # Convert chart → base64 (optional)
     chart_base64 = None
-    if chart_path:
+    if chart_png:
+        import base64
+        chart_base64 = base64.b64encode(chart_png).decode("utf-8")
+    elif chart_path:
         try:
             with open(chart_path, "rb") as img_file:
                 import base64
@@ -50,10 +72,9 @@ def save_full_report_to_db(username, analyzed_df, summary, diagnosis, raw_text,
         except:
             chart_base64 = None
 
-    # Build document
     doc = {
         "username": username,
-        "upload_date": datetime.utcnow(),
+        "upload_date": upload_date or datetime.utcnow(),
         "filename": filename,
         "summary": summary,
         "diagnosis": diagnosis,
@@ -61,12 +82,78 @@ def save_full_report_to_db(username, analyzed_df, summary, diagnosis, raw_text,
         "tests": tests,
         "chart_b64": chart_base64
     }
+    if file_hash:
+        doc["file_hash"] = file_hash
+    return doc
+
+
+# ------------------------------------------------------------
+# SAVE — FULL REPORT (for Upload Page)
+# ------------------------------------------------------------
+def save_full_report_to_db(username, analyzed_df, summary, diagnosis, raw_text, chart_path, filename, chart_png=None):
+    """Saves EVERYTHING for one report into MongoDB (see build_report_doc)."""
+    doc = build_report_doc(username, analyzed_df, summary, diagnosis, raw_text, chart_path, filename, chart_png)
 
     # Insert into MongoDB
     try:
         reports_col.insert_one(doc)
     except Exception as e:
         raise RuntimeError(f"Error saving report: {e}")
+    update_trend_state(username, [doc])
+
+
+# ------------------------------------------------------------
+# SAVE — MANY REPORTS (for batch ingestion)
+# ------------------------------------------------------------
+_file_hash_index_ready = False
+
+
+def _ensure_file_hash_index():
+    """Unique (username, file_hash) index over reports that carry a file_hash."""
+    global _file_hash_index_ready
+    if not _file_hash_index_ready:
+        reports_col.create_index(
+            [("username", 1), ("file_hash", 1)],
+            unique=True,
+            partialFilterExpression={"file_hash": {"$exists": True}},
+            name="username_file_hash",
+        )
+        _file_hash_index_ready = True
+
+
+def save_full_reports_to_db(docs):
+    """
+    Saves many documents from build_report_doc in one round trip. Documents with a
+    file_hash replace the report saved for the same (username, file_hash), so saving
+    a file again (a batch resumed after a crash between the insert and its
+    checkpoint, or a partial report retried) never duplicates it. Returns the
+    number of reports actually added.
+    """
+    if not docs:
+        return 0
+    try:
+        _ensure_file_hash_index()
+        ops = [
+            ReplaceOne({"username": doc["username"], "file_hash": doc["file_hash"]}, doc, upsert=True)
+            if doc.get("file_hash") else InsertOne(doc)
+            for doc in docs
+        ]
+        result = reports_col.bulk_write(ops, ordered=False)
+    except Exception as e:
+        raise RuntimeError(f"Error saving reports: {e}")
+    # documents that already existed must not be counted into the trend state twice
+    added = [doc for i, doc in enumerate(docs) if not doc.get("file_hash") or i in result.upserted_ids]
+    by_user = {}
+    for doc in added:
+        by_user.setdefault(doc["username"], []).append(doc)
+    for username, user_docs in by_user.items():
+        update_trend_state(username, user_docs)
+    if result.modified_count:
+        # a replaced report may have changed values: rebuild those users' trend state on next read
+        replaced = {doc["username"] for i, doc in enumerate(docs) if doc.get("file_hash") and i not in result.upserted_ids}
+        for username in replaced:
+            trend_state_col.delete_one({"username": username})
+    return len(added)
 
 
 # ------------------------------------------------------------
@@ -83,6 +170,16 @@ def get_user_history(username):
         raise RuntimeError(f"Error fetching history: {e}")
 
 
+# ------------------------------------------------------------
+# LATEST — MOST RECENT REPORT
+# ------------------------------------------------------------
+def get_latest_report(username):
+    try:
+        return reports_col.find_one({"username": username}, {"_id": 0}, sort=[("upload_date", -1)])
+    except Exception as e:
+        raise RuntimeError(f"Error fetching latest report: {e}")
+
+
 # ------------------------------------------------------------
 # LAST TWO — FOR COMPARISON
 # ------------------------------------------------------------
@@ -96,3 +193,81 @@ def get_last_two_reports(username):
         return last_two
     except Exception as e:
         raise RuntimeError(f"Error fetching comparison reports: {e}")
+
+
+# ------------------------------------------------------------
+# TRENDS — PER-USER TREND STATE (see backend/trends.py)
+# ------------------------------------------------------------
+def update_trend_state(username, docs):
+    """
+    Folds newly saved reports into the user's stored trend state. A state that
+    is missing, outdated or can't take the reports in order is dropped and
+    rebuilt on the next get_user_trends. A failed update never fails the save
+    itself: it is reported as a warning and the state is dropped so it cannot
+    go stale.
+    """
+    try:
+        state = trend_state_col.find_one({"username": username}, {"_id": 0})
+        if state is None:
+            return
+        if state.get("version") != TREND_STATE_VERSION or not all(
+            add_report_to_state(state, doc) for doc in sorted(docs, key=lambda d: d["upload_date"])
+        ):
+            trend_state_col.delete_one({"username": username})
+            return
+        trend_state_col.replace_one({"username": username}, state, upsert=True)
+    except Exception as e:
+        warnings.warn(f"Could not update the trend state of {username}: {e}")
+        try:
+            trend_state_col.delete_one({"username": username})
+        except Exception:
+            # get_user_trends also rebuilds a state whose report count is off
+            pass
+
+
+def get_user_trends(username):
+    """
+    (summary, test names) from the stored trend state: the summary
+    generate_trend_analysis gives for the user's history and the tests with a
+    trend to plot (see get_trend_series). The state is rebuilt from the history
+    only when it is missing or its report count no longer matches the reports
+    collection.
+    """
+    try:
+        state = trend_state_col.find_one({"username": username}, {"_id": 0})
+        if (
+            state is None
+            or state.get("version") != TREND_STATE_VERSION
+            or state.get("report_count") != reports_col.count_documents({"username": username})
+        ):
+            reports = reports_col.find(
+                {"username": username},
+                {"_id": 0, "upload_date": 1, "tests.test_name": 1, "tests.value": 1, "tests.status": 1},
+            )
+            state = build_trend_state(username, list(reports))
+            trend_state_col.replace_one({"username": username}, state, upsert=True)
+        return summary_from_state(state)
+    except Exception as e:
+        raise RuntimeError(f"Error fetching trends: {e}")
+
+
+def get_trend_series(username, test_name):
+    """
+    {"dates", "values"} of one test across the user's reports, oldest first,
+    read with a projected query so only this test's points are loaded.
+    """
+    pipeline = [
+        {"$match": {"username": username, "tests.test_name": test_name}},
+        {"$sort": {"upload_date": 1, "_id": 1}},
+        {"$project": {"_id": 0, "upload_date": 1, "tests.test_name": 1, "tests.value": 1}},
+        {"$unwind": "$tests"},
+        {"$match": {"tests.test_name": test_name}},
+    ]
+    try:
+        points = list(reports_col.aggregate(pipeline))
+    except Exception as e:
+        raise RuntimeError(f"Error fetching trend for {test_name}: {e}")
+    return {
+        "dates": [pd.Timestamp(p["upload_date"]) for p in points],
+        "values": [p["tests"].get("value") for p in points],
+    }
@@ -1,85 +1,97 @@
 # extractor.py (updated)
-import pytesseract
-from PIL import Image, ImageFilter, ImageEnhance
-import pdfplumber
+import json
 import pandas as pd
 import os
 import re
-from thefuzz import process
-
-# Set OCR path (keep your configuration)
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-
-VALID_TEST_NAMES = [
-    "HEMOGLOBIN", "HEMATOCRIT", "RBC", "RBC COUNT", "WBC", "WBC COUNT",
-    "NEUTROPHILS", "LYMPHOCYTES", "MONOCYTES", "MCV", "MCH", "MCHC", "RDW",
-    "PLATELET", "PLATELET COUNT",
-    "TOTAL CHOLESTEROL", "LDL CHOLESTEROL", "HDL CHOLESTEROL", "TRIGLYCERIDES",
-    "GLUCOSE", "HBA1C", "UREA", "CREATININE",
-    "SODIUM", "POTASSIUM",
-    "ALT", "AST", "BILIRUBIN",
-    "TSH", "T3", "T4",
-    "VITAMIN D", "VITAMIN B12", "SERUM IRON"
-]
-
-# ----------- IMAGE PREPROCESSING -----------
-def preprocess_image(img):
-    img = img.convert("L")
-    img = img.filter(ImageFilter.SHARPEN)
-    img = ImageEnhance.Contrast(img).enhance(2)
-    img = ImageEnhance.Brightness(img).enhance(1.2)
-    return img
+from datetime import datetime
+from functools import lru_cache
+from .ocr_engine import (
+    extract_pdf_pages, extract_image_pages, iter_pdf_pages, iter_image_pages,
+    read_first_page_words,
+)
+from .cache import LRUCache, DiskCache, TieredCache, sha256_bytes, sha256_file
+from .name_resolver import resolve_test_name
+from .line_tokenizer import iter_lines, tokenize_line, is_candidate_line, truncate_line
+from .ner_extractor import NER_BATCH_SIZE, ner_tokenize_lines
+from .table_extractor import row_tokens, rows_to_text
+from .templates import (
+    get_registry, match_template, template_rows, template_tokens, template_from_words, compile_template,
+    save_learned_template,
+)
+from .time_budget import TimeBudget
+
+# Bump whenever extraction or parsing output changes so stale cache entries are ignored
+EXTRACTOR_VERSION = "7"
+
+# Send lines the regex parser rejects through the trained NER model (LAB_NER_CASCADE=0 to disable)
+NER_CASCADE = os.environ.get("LAB_NER_CASCADE", "1") == "1"
+
+# "text": OCR/text layer parsed line by line; "table": rows rebuilt from word boxes / pdfplumber tables
+EXTRACTION_MODE = os.environ.get("LAB_EXTRACTION_MODE", "text")
+
+# Parse PDFs whose layout matches a known lab template with that template (LAB_TEMPLATES=0 to disable);
+# with LAB_TEMPLATE_LEARN=1, layouts the generic parser handled well are saved as new templates
+TEMPLATES_ENABLED = os.environ.get("LAB_TEMPLATES", "1") == "1"
+TEMPLATE_LEARN = os.environ.get("LAB_TEMPLATE_LEARN", "0") == "1"
+TEMPLATE_LEARN_MIN_ROWS = 3
+
+# Extraction cache: in-memory LRU + size-bounded disk tier (set LAB_CACHE_DIR="" to disable disk)
+CACHE_DIR = os.environ.get("LAB_CACHE_DIR", os.path.join(".cache", "extraction"))
+extraction_cache = TieredCache(
+    LRUCache(int(os.environ.get("LAB_CACHE_MEMORY_ITEMS", 64))),
+    DiskCache(CACHE_DIR, int(os.environ.get("LAB_CACHE_MAX_MB", 256)) * 1024 * 1024) if CACHE_DIR else None,
+)
+
 
 # ----------- TEXT EXTRACTION -----------
-def extract_text_from_pdf(path):
+def extract_text_from_pdf(path, budget=None):
     try:
-        text = ""
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                t = page.extract_text()
-                if t:
-                    text += "\n" + t
+        pages = extract_pdf_pages(path, budget=budget)
+        text = "".join("\n" + t for t in pages if t)
         return text if text.strip() else "Error: No text"
     except Exception as e:
         return f"Error: PDF failed ({e})"
 
-def extract_text_from_image(path):
+def extract_text_from_image(path, budget=None):
     try:
-        img = Image.open(path)
-        img = preprocess_image(img)
-        return pytesseract.image_to_string(img)
+        return "\n".join(extract_image_pages(path, budget=budget))
     except Exception as e:
         return f"Error: Image failed ({e})"
 
 # ----------- TEST NAME CORRECTION -----------
 def correct_test_name(name):
-    if not isinstance(name, str):
-        return None
-    name = re.sub(r'[^A-Za-z0-9 ]', ' ', name).upper().strip()
-    best, score = process.extractOne(name, VALID_TEST_NAMES)
-    return best if score and score > 65 else None
+    return resolve_test_name(name)
 
 # ----------- REFERENCE RANGE PARSING -----------
-def parse_reference_range(raw_range):
-    if not raw_range or str(raw_range).strip().upper() in ("NONE", "N/A", "NAN"):
-        return None
-    s = str(raw_range).strip()
-    s_clean = s.replace("(", "").replace(")", "").replace("NORMAL RANGE", "").replace("REFERENCE", "").strip()
+_RANGE_OP = re.compile(r'([<>])\s*([0-9]+(?:\.[0-9]+)?)')
+_RANGE_SPAN = re.compile(r'([0-9]+(?:\.[0-9]+)?)\s*[-–—]\s*([0-9]+(?:\.[0-9]+)?)')
+_RANGE_NUMBER = re.compile(r'([0-9]+(?:\.[0-9]+)?)')
+_RANGE_NOISE = ("(", ")", "NORMAL RANGE", "REFERENCE")
+
+# The same few range strings ("(13.0-17.0)") repeat across every report of a lab
+RANGE_CACHE_SIZE = 8192
+
+def _clean_range(s):
+    for noise in _RANGE_NOISE:
+        s = s.replace(noise, "")
+    return s.strip()
+
+@lru_cache(maxsize=RANGE_CACHE_SIZE)
+def _parse_range_text(s):
+    s_clean = _clean_range(s)
 
     # comparator formats < or >
-    m = re.search(r'([<>])\s*([0-9]+(?:\.[0-9]+)?)', s_clean)
+    m = _RANGE_OP.search(s_clean)
     if m:
-        op, num = m.group(1), float(m.group(2))
-        return (None, float(num), op)
+        return (None, float(m.group(2)), m.group(1))
 
     # inclusive ranges like 13 - 17 or 13.0-17.0 or en-dash
-    m2 = re.search(r'([0-9]+(?:\.[0-9]+)?)\s*[-–—]\s*([0-9]+(?:\.[0-9]+)?)', s_clean)
+    m2 = _RANGE_SPAN.search(s_clean)
     if m2:
-        low, high = float(m2.group(1)), float(m2.group(2))
-        return (low, high, None)
+        return (float(m2.group(1)), float(m2.group(2)), None)
 
     # single number fallback
-    m3 = re.search(r'([0-9]+(?:\.[0-9]+)?)', s_clean)
+    m3 = _RANGE_NUMBER.search(s_clean)
     if m3:
         num = float(m3.group(1))
         if '<' in s or 'LESS' in s.upper():
@@ -89,13 +101,20 @@ def parse_reference_range(raw_range):
         return (num, None, None)
     return None
 
+def parse_reference_range(raw_range):
+    if not raw_range or str(raw_range).strip().upper() in ("NONE", "N/A", "NAN"):
+        return None
+    return _parse_range_text(str(raw_range).strip())
+
 # ----------- VALUE & UNIT PARSING -----------
+_VALUE_NUMBER = re.compile(r'([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)', re.I)
+
 def parse_value_and_unit(raw_value):
     if raw_value is None:
         return None, ""
     s = str(raw_value).strip()
     # numeric with possible scientific notation and percentage
-    m = re.search(r'([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)', s, flags=re.I)
+    m = _VALUE_NUMBER.search(s)
     if not m:
         return None, ""
     num = m.group(0)
@@ -112,73 +131,377 @@ def parse_value_and_unit(raw_value):
     return val, unit
 
 # ----------- MAIN PARSER -----------
+def _records_to_df(records):
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df
+    df["Test Name"] = df["Test Name"].astype(str)
+    df["Reference Range Raw"] = df["Reference Range Raw"].astype(str)
+    return df
+
+def build_record(raw_name, raw_value, raw_unit, raw_range):
+    """Turns raw tokens into a record, or None if the name or value cannot be resolved."""
+    fixed_name = correct_test_name(raw_name)
+    if not fixed_name:
+        return None
+
+    # parse numeric value + unit
+    val, unit = parse_value_and_unit(raw_value + (" " + raw_unit if raw_unit else ""))
+    if val is None:
+        return None
+
+    parsed_range = parse_reference_range(raw_range) if raw_range else None
+
+    return {
+        "Test Name": fixed_name,
+        "Value": val,
+        "Unit": unit,
+        "Reference Range Raw": raw_range if raw_range else "",
+        "Reference Range Parsed": parsed_range
+    }
+
+def _regex_record(line):
+    tokens = tokenize_line(line)
+    return build_record(*tokens) if tokens else None
+
+def iter_parse_lines(lines, use_ner=None):
+    """
+    Yields one record per result row found in an iterable of lines.
+    Cascade: the regex fast path handles clean lines; only candidate lines it
+    rejects are sent to the NER model, in batches of NER_BATCH_SIZE lines.
+    """
+    use_ner = NER_CASCADE if use_ner is None else use_ner
+    if not use_ner:
+        for line in lines:
+            record = _regex_record(line)
+            if record:
+                yield record
+        return
+
+    for chunk in _chunks(lines, NER_BATCH_SIZE):
+        results = [_regex_record(line) for line in chunk]
+        rejected = [i for i, r in enumerate(results) if r is None and is_candidate_line(chunk[i])]
+        if rejected:
+            ner_tokens = ner_tokenize_lines([truncate_line(chunk[i]) for i in rejected])
+            for i, tokens in zip(rejected, ner_tokens):
+                if tokens:
+                    results[i] = build_record(*tokens)
+        for record in results:
+            if record:
+                yield record
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 def parse_report_text(text):
-    text = text.replace("—", "-").replace("–", "-").replace("|", " ").replace("•", " ")
-    lines = [l.strip() for l in text.split("\n") if l.strip()]
-
-    records = []
-    # stricter regex: name followed by number (with optional unit) and optional parenthesized range
-    for line in lines:
-        # try to capture: NAME <space> VALUE[unit] (RANGE)
-        m = re.search(
-            r'([A-Za-z][A-Za-z \(\)\-]{1,60}?)\s+([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)\s*([A-Za-z%/µg\.\d]*)\s*(\([^\)]*\))?',
-            line
-        )
-        if not m:
-            # fallback looser but still anchored
-            m = re.search(
-                r'([A-Za-z][A-Za-z \(\)\-]{1,60}?)[:\-\s]\s*([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)\s*([A-Za-z%/µg\.\d]*)',
-                line
-            )
-        if not m:
-            continue
+    return _records_to_df(list(iter_parse_lines(iter_lines(text))))
 
-        raw_name = m.group(1).strip()
-        raw_value = m.group(2).strip()
-        raw_unit = m.group(3).strip() if m.lastindex and m.lastindex >= 3 else ""
-        raw_range = m.group(4).strip() if m.lastindex and m.lastindex >= 4 and m.group(4) else None
+# ----------- REPORT DATE -----------
+# lines naming the report's date ("Reported On: 12/03/2021", "Collection Date 2021-03-12")
+_DATE_LINE = re.compile(r'date|reported|collected|collection|sample|received|registered', re.I)
+_NOT_REPORT_DATE = re.compile(r'birth|\bdob\b|\bd\.o\.b', re.I)
+_MONTHS = "jan feb mar apr may jun jul aug sep oct nov dec".split()
+_DATE_PATTERNS = (
+    (re.compile(r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b'), "ymd"),
+    (re.compile(r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4}|\d{2})\b'), "dmy"),
+    (re.compile(r'\b(\d{1,2})[\s\-]*(' + "|".join(_MONTHS) + r')[a-z]*[\s,\-]*(\d{4})\b', re.I), "dMy"),
+    (re.compile(r'\b(' + "|".join(_MONTHS) + r')[a-z]*[\s\-]+(\d{1,2}),?\s+(\d{4})\b', re.I), "Mdy"),
+)
 
-        fixed_name = correct_test_name(raw_name)
-        if not fixed_name:
-            continue
+def _date_from_match(m, order):
+    a, b, c = m.groups()
+    if order == "ymd":
+        year, month, day = int(a), int(b), int(c)
+    elif order == "dmy":
+        day, month, year = int(a), int(b), int(c)
+        if month > 12 >= day:
+            # month/day/year
+            day, month = month, day
+        if year < 100:
+            year += 2000
+    elif order == "dMy":
+        day, month, year = int(a), _MONTHS.index(b[:3].lower()) + 1, int(c)
+    else:
+        month, day, year = _MONTHS.index(a[:3].lower()) + 1, int(b), int(c)
+    try:
+        date = datetime(year, month, day)
+    except ValueError:
+        return None
+    return date if datetime(1950, 1, 1) <= date <= datetime.utcnow() else None
 
-        # parse numeric value + unit
-        val, unit = parse_value_and_unit(raw_value + (" " + raw_unit if raw_unit else ""))
-        if val is None:
+def parse_report_date(text):
+    """
+    The report's own date: the first valid, non-future date on a line that names
+    one (collected / reported / sample date ...), or None. Numeric dates are read
+    day first unless only month first is valid.
+    """
+    for line in iter_lines(text or ""):
+        if not _DATE_LINE.search(line) or _NOT_REPORT_DATE.search(line):
             continue
+        for pattern, order in _DATE_PATTERNS:
+            for m in pattern.finditer(line):
+                date = _date_from_match(m, order)
+                if date is not None:
+                    return date
+    return None
 
-        parsed_range = parse_reference_range(raw_range) if raw_range else None
+# ----------- CACHE HELPERS -----------
+def extraction_settings():
+    """Every setting that changes extraction output, read at call time."""
+    from . import image_preprocess, ocr_backends, ocr_engine, templates
+    return {
+        "ner_cascade": NER_CASCADE,
+        "templates": TEMPLATES_ENABLED,
+        "template_learn": TEMPLATE_LEARN,
+        # learned templates change which layouts are recognised
+        "template_files": templates.registry_mtimes(),
+        "ocr_backend": ocr_backends.OCR_BACKEND,
+        "ocr_lang": ocr_backends.OCR_LANG,
+        "ocr_dpi": ocr_engine.OCR_DPI,
+        "ocr_adaptive": ocr_engine.OCR_ADAPTIVE,
+        "ocr_fast_dpi": ocr_engine.OCR_FAST_DPI,
+        "ocr_min_confidence": ocr_engine.OCR_MIN_CONFIDENCE,
+        "ocr_target_dpi": image_preprocess.TARGET_DPI,
+    }
 
-        records.append({
-            "Test Name": fixed_name,
-            "Value": val,
-            "Unit": unit,
-            "Reference Range Raw": raw_range if raw_range else "",
-            "Reference Range Parsed": parsed_range
-        })
+def extraction_cache_key(file_hash, mode="text"):
+    """Cache key for a file's extraction: its hash, EXTRACTOR_VERSION, mode and extraction_settings()."""
+    settings = sha256_bytes(json.dumps(extraction_settings(), sort_keys=True).encode("utf-8"))[:16]
+    return f"{file_hash}-v{EXTRACTOR_VERSION}-{mode}-{settings}"
 
-    df = pd.DataFrame(records)
-    if df.empty:
-        return df
+# ----------- TABLE MODE -----------
+def iter_parse_rows(rows):
+    """Yields one record per table row (lists of cell strings) that holds a result."""
+    for cells in rows:
+        tokens = row_tokens(cells)
+        if tokens:
+            record = build_record(*tokens)
+            if record:
+                yield record
 
-    df["Test Name"] = df["Test Name"].astype(str)
-    df["Reference Range Raw"] = df["Reference Range Raw"].astype(str)
-    return df
+def iter_table_page_records(rows):
+    """Records for one page of rows; pages with no usable table fall back to the line parser."""
+    found = False
+    for record in iter_parse_rows(rows):
+        found = True
+        yield record
+    if not found:
+        yield from iter_parse_lines(iter_lines(rows_to_text(rows)))
 
-# ----------- MAIN ENTRY POINT -----------
-def process_report(file_path):
+def _iter_pages(file_path, max_pages=None, layout="text", budget=None):
     ext = os.path.splitext(file_path)[1].lower()
     if ext == ".pdf":
-        text = extract_text_from_pdf(file_path)
+        return iter_pdf_pages(file_path, max_pages=max_pages, layout=layout, budget=budget)
+    return iter_image_pages(file_path, max_pages=max_pages, layout=layout, budget=budget)
+
+def extract_table_report(file_path, budget=None):
+    """Table mode: returns (raw_text, records) with rows rebuilt per page."""
+    try:
+        pages = list(_iter_pages(file_path, layout="rows", budget=budget))
+    except Exception as e:
+        return f"Error: Table extraction failed ({e})", []
+    text = "\n".join(rows_to_text(rows) for rows in pages)
+    if not text.strip():
+        return "Error: No text", []
+    records = [r for rows in pages for r in iter_table_page_records(rows)]
+    return text, records
+
+# ----------- LAYOUT TEMPLATES -----------
+def match_template_file(file_path):
+    """
+    The compiled template matching page 1 of a PDF, or None. Returns before the PDF
+    is opened when templates are off or none are registered (the shipped default).
+    """
+    if not TEMPLATES_ENABLED or os.path.splitext(file_path)[1].lower() != ".pdf":
+        return None
+    if not get_registry():
+        return None
+    try:
+        first = read_first_page_words(file_path)
+    except Exception:
+        return None
+    return match_template(first["words"], first["width"]) if first else None
+
+def iter_template_pages(file_path, compiled, max_pages=None, budget=None):
+    """Yields (page_text, records) for each page parsed with the template's column bands."""
+    for page in _iter_pages(file_path, max_pages=max_pages, layout="words", budget=budget):
+        rows = template_rows(compiled, page["words"], page["width"])
+        records = []
+        for cells in rows:
+            tokens = row_tokens(cells)
+            record = build_record(*tokens) if tokens else None
+            if record:
+                records.append(record)
+        yield rows_to_text(rows), records
+
+def extract_template_report(file_path, budget=None):
+    """
+    Known lab layouts: if page 1 of a PDF matches a registered template, every page
+    is parsed with that template's column bands. Returns (raw_text, records), or
+    None when templates are off, nothing matches, or the template finds no results.
+    """
+    compiled = match_template_file(file_path)
+    if compiled is None:
+        return None
+
+    texts, records = [], []
+    for text, page_records in iter_template_pages(file_path, compiled, budget=budget):
+        texts.append(text)
+        records.extend(page_records)
+    return ("\n".join(texts), records) if records else None
+
+def learn_template(file_path, df):
+    """
+    Saves page 1's layout as a template when parsing page 1 with it finds at least
+    TEMPLATE_LEARN_MIN_ROWS tests, all of which the generic parser also found
+    (values may differ: column bands read glued flags and separators correctly).
+    Returns the new template or None.
+    """
+    first = read_first_page_words(file_path)
+    if not first or match_template(first["words"], first["width"]):
+        return None
+    template = template_from_words(first["words"], first["width"])
+    if template is None:
+        return None
+    found = set()
+    for tokens in template_tokens(compile_template(template), first["words"], first["width"]):
+        record = build_record(*tokens)
+        if record:
+            found.add(record["Test Name"])
+    if len(found) < TEMPLATE_LEARN_MIN_ROWS or not found <= set(df["Test Name"]):
+        return None
+    return template if save_learned_template(template) else None
+
+# ----------- STREAMING MODE -----------
+def iter_report_records(file_path, max_pages=None, use_cache=True, mode=None, budget=None):
+    """
+    Yields parsed records page by page as they are found, so memory stays bounded
+    on multi-hundred-page histories. Stops after `max_pages` pages if given.
+    Extraction errors are raised rather than returned as "Error: ..." text.
+    Pages that exceed `budget` are skipped and listed in budget.skipped.
+    PDFs matching a layout template are parsed with it, as in process_report; if the
+    template finds nothing, the generic parser runs instead.
+    """
+    mode = mode or EXTRACTION_MODE
+    if use_cache and max_pages is None:
+        cached = extraction_cache.get(extraction_cache_key(sha256_file(file_path), mode))
+        if cached is not None:
+            yield from (dict(r) for r in cached["records"])
+            return
+
+    compiled = match_template_file(file_path)
+    if compiled is not None:
+        found = False
+        for _, records in iter_template_pages(file_path, compiled, max_pages=max_pages, budget=budget):
+            found = found or bool(records)
+            yield from records
+        if found:
+            return
+
+    if mode == "table":
+        for rows in _iter_pages(file_path, max_pages=max_pages, layout="rows", budget=budget):
+            yield from iter_table_page_records(rows)
+        return
+
+    for page_text in _iter_pages(file_path, max_pages=max_pages, budget=budget):
+        yield from iter_parse_lines(iter_lines(page_text))
+
+class RecordStream:
+    """
+    Iterator over streamed records that also reports, as skipped_pages, the
+    1-based pages skipped so far because they ran out of time.
+    """
+
+    def __init__(self, records, budget):
+        self._records = records
+        self.budget = budget
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._records)
+
+    @property
+    def skipped_pages(self):
+        return sorted(self.budget.skipped)
+
+# ----------- MAIN ENTRY POINT -----------
+def _with_skipped(df, budget):
+    df.attrs["skipped_pages"] = sorted(budget.skipped)
+    return df
+
+def process_report(file_path, use_cache=True, stream=False, max_pages=None, mode=None, budget=None):
+    """
+    Returns (df, diagnosis, raw_text).
+    mode: "text" (default, LAB_EXTRACTION_MODE) or "table"; PDFs matching a known
+    layout template are parsed with the template either way (see extract_template_report).
+    budget: a TimeBudget (default: LAB_REPORT_TIMEOUT total, LAB_PAGE_TIMEOUT per page;
+    with stream=True only the per-page limit).
+    Pages that run out of time are skipped; the result is then partial and
+    df.attrs["skipped_pages"] lists their 1-based numbers (empty when complete).
+    Partial results are not cached.
+    With stream=True, returns a RecordStream of record dicts instead (see
+    iter_report_records); its skipped_pages is complete once it is exhausted.
+    """
+    mode = mode or EXTRACTION_MODE
+    if stream:
+        # pages are read while the caller consumes records, so a report-wide deadline
+        # would also count the caller's time; only the per-page limit applies by default
+        budget = budget or TimeBudget(total=0)
+        return RecordStream(
+            iter_report_records(file_path, max_pages=max_pages, use_cache=use_cache, mode=mode, budget=budget),
+            budget,
+        )
+    budget = budget or TimeBudget()
+
+    key = extraction_cache_key(sha256_file(file_path), mode) if use_cache else None
+    cached = extraction_cache.get(key) if key else None
+
+    if cached is not None:
+        text = cached["text"]
+        df = _records_to_df(cached["records"])
     else:
-        text = extract_text_from_image(file_path)
+        templated = extract_template_report(file_path, budget=budget)
+        if templated is not None:
+            text, records = templated
+        elif mode == "table":
+            text, records = extract_table_report(file_path, budget=budget)
+        else:
+            ext = os.path.splitext(file_path)[1].lower()
+            if ext == ".pdf":
+                text = extract_text_from_pdf(file_path, budget=budget)
+            else:
+                text = extract_text_from_image(file_path, budget=budget)
+            records = None
+
+        if budget.partial and (not text.strip() or text == "Error: No text"):
+            pages = ", ".join(str(p) for p in sorted(budget.skipped))
+            text = f"Error: Time limit reached before any text was found (skipped pages {pages})"
+        if not text or "Error" in text:
+            return _with_skipped(pd.DataFrame(), budget), None, text
+
+        df = _records_to_df(records) if records is not None else parse_report_text(text)
 
-    if not text or "Error" in text:
-        return pd.DataFrame(), None, text
+        if key and not budget.partial:
+            # store plain records so every hit gets a fresh, independently mutable DataFrame
+            extraction_cache.set(key, {"text": text, "records": df.to_dict("records")})
 
-    df = parse_report_text(text)
+        if TEMPLATE_LEARN and templated is None and not df.empty and file_path.lower().endswith(".pdf"):
+            try:
+                learn_template(file_path, df)
+            except Exception:
+                # learning is best effort and never fails a report
+                pass
 
     if df.empty:
-        return pd.DataFrame(), None, "Could not detect test values from the report."
+        return _with_skipped(pd.DataFrame(), budget), None, "Could not detect test values from the report."
 
-    return df, None, text
+    return _with_skipped(df, budget), None, text
@@ -0,0 +1,139 @@
+# backend/image_preprocess.py
+import os
+
+import numpy as np
+from PIL import Image
+
+# Resolution Tesseract works best at; larger inputs are downsampled to it
+TARGET_DPI = int(os.environ.get("LAB_OCR_TARGET_DPI", 300))
+
+# When an image carries no DPI (phone photos), assume it shows one A4 page on its long side
+PAGE_LONG_SIDE_INCHES = 11.7
+
+# Adaptive threshold: local mean over roughly BLOCK_INCHES, minus OFFSET grey levels
+BLOCK_INCHES = 0.1
+THRESHOLD_OFFSET = 12
+
+# Deskew search range/step in degrees, run on a thumbnail this wide
+MAX_SKEW = 5.0
+SKEW_STEP = 0.5
+SKEW_THUMB_WIDTH = 800
+# A tilt is only corrected when it sharpens the row profile by at least this fraction over 0 degrees
+SKEW_MIN_GAIN = 0.05
+
+
+# ----------- LOADING / DPI NORMALIZATION -----------
+def _source_dpi(img):
+    dpi = img.info.get("dpi")
+    try:
+        dpi = float(dpi[0])
+    except (TypeError, IndexError, ValueError):
+        return None
+    # some cameras write 72 dpi (or 1) regardless of content; treat those as unknown
+    return dpi if dpi >= 100 else None
+
+
+def ocr_scale(size, dpi=None, target_dpi=None):
+    """Scale factor (<= 1) that brings an image to the target OCR resolution."""
+    target_dpi = target_dpi or TARGET_DPI
+    if dpi:
+        scale = target_dpi / dpi
+    else:
+        scale = (PAGE_LONG_SIDE_INCHES * target_dpi) / max(size)
+    return min(scale, 1.0)
+
+
+def open_for_ocr(path, frame=0, target_dpi=None):
+    """
+    Opens an image for OCR. JPEGs are decoded in draft mode straight to grayscale
+    at the smallest 1/2, 1/4 or 1/8 scale that is still above the target size,
+    so 12+ MP photos are never fully decoded.
+    """
+    img = Image.open(path)
+    if frame:
+        img.seek(frame)
+    if img.format == "JPEG":
+        dpi = _source_dpi(img)
+        full_width = img.width
+        scale = ocr_scale(img.size, dpi, target_dpi)
+        if scale < 1.0:
+            img.draft("L", (int(img.width * scale), int(img.height * scale)))
+            if dpi and img.width != full_width:
+                # keep the DPI consistent with the reduced decode size
+                reduced = dpi * img.width / full_width
+                img.info["dpi"] = (reduced, reduced)
+    return img
+
+
+def normalize_dpi(img, dpi=None, target_dpi=None):
+    dpi = dpi or _source_dpi(img)
+    scale = ocr_scale(img.size, dpi, target_dpi)
+    if scale >= 0.98:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+
+# ----------- BINARIZATION -----------
+def adaptive_threshold(gray, block=None, offset=THRESHOLD_OFFSET):
+    """
+    Binarizes a grayscale image against its local mean. The local mean is taken
+    by box-downsampling and bilinear-upsampling in PIL, which costs two small
+    resizes instead of a full-size integral image.
+    """
+    block = block or max(8, int(TARGET_DPI * BLOCK_INCHES))
+    small = (max(1, gray.width // block), max(1, gray.height // block))
+    background = gray.resize(small, Image.BOX).resize(gray.size, Image.BILINEAR)
+
+    pixels = np.asarray(gray, dtype=np.int16)
+    local_mean = np.asarray(background, dtype=np.int16)
+    return np.where(pixels > local_mean - offset, 255, 0).astype(np.uint8)
+
+
+# ----------- DESKEW -----------
+def estimate_skew(binary):
+    """
+    Finds the rotation (degrees, PIL convention) that makes text rows horizontal:
+    the angle whose row-ink profile is sharpest. Returns 0 unless some angle beats
+    0 degrees by SKEW_MIN_GAIN, so blank or already straight pages are left alone.
+    """
+    h, w = binary.shape
+    thumb = Image.fromarray(255 - binary)  # ink = bright so rotation fill (0) adds no ink
+    if w > SKEW_THUMB_WIDTH:
+        thumb = thumb.resize((SKEW_THUMB_WIDTH, max(1, h * SKEW_THUMB_WIDTH // w)), Image.BOX)
+
+    def sharpness(angle):
+        rotated = np.asarray(thumb.rotate(angle, resample=Image.NEAREST), dtype=np.float32)
+        profile = rotated.sum(axis=1)
+        return float(np.square(np.diff(profile)).sum())
+
+    straight = sharpness(0.0)
+    best_angle, best_score = 0.0, straight
+    for angle in np.arange(-MAX_SKEW, MAX_SKEW + SKEW_STEP / 2, SKEW_STEP):
+        angle = float(angle)
+        if angle == 0.0:
+            continue
+        score = sharpness(angle)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    if best_score <= straight * (1 + SKEW_MIN_GAIN):
+        return 0.0
+    return best_angle
+
+
+# ----------- PIPELINE -----------
+def preprocess_for_ocr(img, dpi=None, target_dpi=None):
+    """DPI normalization -> grayscale -> adaptive threshold -> deskew. Returns a mode "L" image."""
+    dpi = dpi or _source_dpi(img)
+    gray = normalize_dpi(img.convert("L"), dpi, target_dpi)
+    binary = adaptive_threshold(gray)
+
+    angle = estimate_skew(binary)
+    out = Image.fromarray(binary)
+    if abs(angle) >= SKEW_STEP:
+        out = out.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+
+    # effective resolution after normalization, passed on to Tesseract
+    effective = round(dpi * gray.width / img.width) if dpi else (target_dpi or TARGET_DPI)
+    out.info["dpi"] = (effective, effective)
+    return out
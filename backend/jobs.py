@@ -0,0 +1,292 @@
+# backend/jobs.py
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Reports processed at once; OCR inside each report still fans out to the OCR process pool
+JOB_WORKERS = int(os.environ.get("LAB_JOB_WORKERS", 2))
+
+# Admission control: queued + running jobs allowed before new uploads are turned away
+JOB_MAX_PENDING = int(os.environ.get("LAB_JOB_MAX_PENDING", 16))
+
+# Finished jobs (and their results) are kept this many seconds for later retrieval,
+# and at most this many of them (oldest dropped first): results hold DataFrames and PDFs
+JOB_TTL_SECONDS = int(os.environ.get("LAB_JOB_TTL", 3600))
+JOB_MAX_FINISHED = int(os.environ.get("LAB_JOB_MAX_FINISHED", 64))
+
+REPORT_STAGES = ("extract", "units", "analyze", "summarize", "chart", "save", "pdf")
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when JOB_MAX_PENDING jobs are already queued or running."""
+
+
+_executor = None
+_jobs = {}
+_keys = {}
+_lock = threading.Lock()
+
+
+# ----------- JOB STORE -----------
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="report-job")
+    return _executor
+
+
+def _evict_expired(now):
+    finished = sorted(
+        (job["finished_at"], job_id) for job_id, job in _jobs.items() if job["finished_at"] is not None
+    )
+    over = max(0, len(finished) - JOB_MAX_FINISHED)
+    expired = [
+        job_id for i, (finished_at, job_id) in enumerate(finished)
+        if i < over or now - finished_at > JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        job = _jobs.pop(job_id)
+        if _keys.get(job["key"]) == job_id:
+            del _keys[job["key"]]
+
+
+def _active_count():
+    return sum(1 for job in _jobs.values() if job["status"] in ("queued", "running"))
+
+
+def _update(job_id, **fields):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(fields, updated_at=time.time())
+
+
+def _run(job_id, fn, args, kwargs):
+    _update(job_id, status="running", started_at=time.time())
+
+    def set_stage(stage):
+        with _lock:
+            job = _jobs[job_id]
+            if job["stage"] is not None and job["stage"] not in job["completed"]:
+                job["completed"].append(job["stage"])
+            job["stage"] = stage
+            job["updated_at"] = time.time()
+
+    try:
+        result = fn(set_stage, *args, **kwargs)
+    except Exception as e:
+        _update(job_id, status="failed", error=str(e), traceback=traceback.format_exc(),
+                finished_at=time.time())
+    else:
+        set_stage(None)
+        _update(job_id, status="done", result=result, finished_at=time.time())
+
+
+def submit_job(fn, *args, key=None, stages=(), owner=None, **kwargs):
+    """
+    Queues fn(set_stage, *args, **kwargs) on the bounded job executor and returns a job id.
+    fn calls set_stage(name) as it enters each stage. A job already queued,
+    running or finished under the same key is returned instead of starting a
+    new one, so a page refresh re-attaches rather than re-processing.
+    owner (the submitting username) is stored on the job; see get_job.
+    Raises JobQueueFull when JOB_MAX_PENDING jobs are in flight.
+    """
+    return _submit(fn, args, kwargs, key, stages, owner)[0]
+
+
+def _submit(fn, args, kwargs, key, stages, owner):
+    """submit_job; returns (job id, whether a new job was created)."""
+    now = time.time()
+    with _lock:
+        _evict_expired(now)
+        if key is not None and key in _keys:
+            existing = _jobs[_keys[key]]
+            if existing["status"] != "failed":
+                return existing["id"], False
+        if _active_count() >= JOB_MAX_PENDING:
+            raise JobQueueFull("The server is busy processing other reports. Please try again in a minute.")
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            "id": job_id,
+            "key": key,
+            "owner": owner,
+            "status": "queued",
+            "stages": tuple(stages),
+            "stage": None,
+            "completed": [],
+            "result": None,
+            "error": None,
+            "traceback": None,
+            "submitted_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "updated_at": now,
+        }
+        if key is not None:
+            _keys[key] = job_id
+    _get_executor().submit(_run, job_id, fn, args, kwargs)
+    return job_id, True
+
+
+def get_job(job_id, owner=None):
+    """
+    A snapshot of the job (status, stage, progress, result, ...) or None if unknown,
+    expired or submitted by someone other than owner. Job ids travel in the URL, so
+    callers pass the current username to keep one user from reading another's results.
+    """
+    with _lock:
+        _evict_expired(time.time())
+        job = _jobs.get(job_id)
+        if job is None or job["owner"] != owner:
+            return None
+        snapshot = dict(job, completed=list(job["completed"]))
+        if job["status"] == "queued":
+            snapshot["queue_position"] = sum(
+                1 for other in _jobs.values()
+                if other["status"] == "queued" and other["submitted_at"] <= job["submitted_at"]
+            )
+    n = len(snapshot["stages"])
+    snapshot["progress"] = 1.0 if snapshot["status"] == "done" else (
+        len(snapshot["completed"]) / n if n else 0.0
+    )
+    return snapshot
+
+
+# ----------- REPORT PIPELINE -----------
+def _remove(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def process_upload(set_stage, file_path, username, filename, file_hash, age=None, sex=None):
+    """
+    Everything the Upload page used to run inline: extraction, unit canonicalization, analysis, summary,
+    chart, MongoDB save and PDF. Returns the page's `last_analysis` dict with the
+    chart and PDF as bytes. age/sex select demographic reference ranges when known.
+    The uploaded file is removed when done.
+    """
+    set_stage("extract")
+    import pandas as pd
+
+    from .analyzer import analyze_results
+    from .database import save_full_report_to_db
+    from .extractor import process_report
+    from .report_generator import generate_pdf_report
+    from .units import canonicalize_units
+    from .summarizer import generate_summary, find_possible_connections
+    from .visualizer import create_visual_summary
+
+    try:
+        df, diagnosis, raw_text = process_report(file_path)
+        skipped_pages = df.attrs.get("skipped_pages", [])
+
+        set_stage("units")
+        df = canonicalize_units(df)
+
+        set_stage("analyze")
+        analyzed = analyze_results(df, age=age, sex=sex)
+        # Clean numeric values (important for graph + PDF)
+        try:
+            analyzed["Value Raw"] = analyzed["Value"]
+            analyzed["Value"] = (
+                analyzed["Value"]
+                .astype(str)
+                .str.extract(r"([-+]?\d*\.\d+|[-+]?\d+)", expand=False)
+            )
+            analyzed["Value"] = pd.to_numeric(analyzed["Value"], errors="coerce")
+        except Exception:
+            pass
+
+        set_stage("summarize")
+        summary = generate_summary(analyzed, diagnosis)
+        connections = find_possible_connections(analyzed)
+
+        set_stage("chart")
+        # rendered in memory without pyplot, so jobs can chart concurrently
+        try:
+            chart_png = create_visual_summary(analyzed)
+        except Exception:
+            chart_png = None
+
+        set_stage("save")
+        save_error = None
+        if username:
+            try:
+                save_full_report_to_db(
+                    username=username,
+                    analyzed_df=analyzed.copy().astype(str),
+                    summary=summary,
+                    diagnosis=diagnosis,
+                    raw_text=raw_text,
+                    chart_path=None,
+                    filename=filename,
+                    chart_png=chart_png,
+                )
+            except Exception as e:
+                save_error = str(e)
+
+        set_stage("pdf")
+        pdf_bytes, pdf_error = None, None
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+            pdf_path = tmp.name
+        try:
+            generate_pdf_report(analyzed.copy().astype(str), summary, chart_png, pdf_path)
+            with open(pdf_path, "rb") as f:
+                pdf_bytes = f.read()
+        except Exception as e:
+            pdf_error = str(e)
+        finally:
+            _remove(pdf_path)
+
+        return {
+            "df": analyzed,
+            "summary": summary,
+            "connections": connections,
+            "raw_text": raw_text,
+            "diagnosis": diagnosis,
+            "filename": filename,
+            "file_hash": file_hash,
+            "skipped_pages": skipped_pages,
+            "chart_png": chart_png,
+            "pdf_bytes": pdf_bytes,
+            "pdf_error": pdf_error,
+            "saved_for": username if username and save_error is None else None,
+            "save_error": save_error,
+        }
+    finally:
+        _remove(file_path)
+
+
+def submit_report_job(file_bytes, filename, username, file_hash, age=None, sex=None):
+    """Writes the upload to disk and queues it. Returns the job id (see submit_job)."""
+    key = (username or "", file_hash)
+    with _lock:
+        existing = _keys.get(key)
+        if existing is not None and _jobs[existing]["status"] != "failed":
+            return existing
+
+    upload_dir = "uploads"
+    os.makedirs(upload_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, f"{uuid.uuid4().hex}{os.path.splitext(filename)[1].lower()}")
+    with open(file_path, "wb") as f:
+        f.write(file_bytes)
+    try:
+        job_id, created = _submit(
+            process_upload, (file_path, username, filename, file_hash), {"age": age, "sex": sex},
+            key, REPORT_STAGES, username or None,
+        )
+    except JobQueueFull:
+        _remove(file_path)
+        raise
+    if not created:
+        # a concurrent submission of the same file won; its job has its own copy
+        _remove(file_path)
+    return job_id
@@ -0,0 +1,68 @@
+# backend/line_tokenizer.py
+import os
+import re
+
+# OCR lines longer than this are truncated before matching; real result rows are far shorter,
+# and the lazy name group makes matching cost grow with line length
+MAX_LINE_CHARS = int(os.environ.get("LAB_MAX_LINE_CHARS", 300))
+
+# single-pass replacement of the dash/pipe/bullet variants OCR produces
+_TEXT_TRANSLATION = str.maketrans({"—": "-", "–": "-", "|": " ", "•": " "})
+
+_HAS_DIGIT = re.compile(r'\d')
+_HAS_LETTER = re.compile(r'[A-Za-z]')
+
+# Unit: letters, digits, %, / and ., optionally led by a count exponent
+# ("10^3/uL", "x10³/µL", "× 10^9/L", "10*3/uL")
+_UNIT = r'((?:(?:[x×]\s?)?10(?:\^|\*\*?|³)\d*)?[A-Za-z%/µμg\.\d]*)'
+
+# NAME <space> VALUE[unit] (RANGE)
+_PRIMARY = re.compile(
+    r'([A-Za-z][A-Za-z \(\)\-]{1,60}?)\s+([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)\s*' + _UNIT + r'\s*(\([^\)]*\))?'
+)
+
+# looser but still anchored: NAME[:- ]VALUE[unit]
+_FALLBACK = re.compile(
+    r'([A-Za-z][A-Za-z \(\)\-]{1,60}?)[:\-\s]\s*([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)\s*' + _UNIT
+)
+
+
+def normalize_text(text):
+    return text.translate(_TEXT_TRANSLATION)
+
+
+def iter_lines(text):
+    """Yields stripped, non-empty, normalized lines without building a list."""
+    for line in normalize_text(text).split("\n"):
+        line = line.strip()
+        if line:
+            yield line
+
+
+def truncate_line(line):
+    return line[:MAX_LINE_CHARS] if len(line) > MAX_LINE_CHARS else line
+
+
+def is_candidate_line(line):
+    """Cheap check for lines that could hold a result: a letter and a digit."""
+    return bool(_HAS_DIGIT.search(line)) and bool(_HAS_LETTER.search(line))
+
+
+def tokenize_line(line):
+    """
+    Splits a result row into (raw_name, raw_value, raw_unit, raw_range).
+    Returns None for lines that cannot hold a result (no digits) or do not match.
+    """
+    if not _HAS_DIGIT.search(line):
+        return None
+    line = truncate_line(line)
+
+    m = _PRIMARY.search(line) or _FALLBACK.search(line)
+    if not m:
+        return None
+
+    raw_name = m.group(1).strip()
+    raw_value = m.group(2).strip()
+    raw_unit = m.group(3).strip() if m.lastindex and m.lastindex >= 3 else ""
+    raw_range = m.group(4).strip() if m.lastindex and m.lastindex >= 4 and m.group(4) else None
+    return raw_name, raw_value, raw_unit, raw_range
@@ -0,0 +1,91 @@
+# backend/name_resolver.py
+import re
+from functools import lru_cache
+
+from rapidfuzz import fuzz, process
+from thefuzz import utils
+
+VALID_TEST_NAMES = [
+    "HEMOGLOBIN", "HEMATOCRIT", "RBC", "RBC COUNT", "WBC", "WBC COUNT",
+    "NEUTROPHILS", "LYMPHOCYTES", "MONOCYTES", "MCV", "MCH", "MCHC", "RDW",
+    "PLATELET", "PLATELET COUNT",
+    "TOTAL CHOLESTEROL", "LDL CHOLESTEROL", "HDL CHOLESTEROL", "TRIGLYCERIDES",
+    "GLUCOSE", "HBA1C", "UREA", "CREATININE",
+    "SODIUM", "POTASSIUM",
+    "ALT", "AST", "BILIRUBIN",
+    "TSH", "T3", "T4",
+    "VITAMIN D", "VITAMIN B12", "SERUM IRON"
+]
+
+# Alternate names printed by labs (same list the NER training data uses in training_data.BASE_RECORDS)
+TEST_NAME_ALIASES = {
+    "HB": "HEMOGLOBIN",
+    "HGB": "HEMOGLOBIN",
+    "WHITE BLOOD CELLS": "WBC COUNT",
+    "RED BLOOD CELLS": "RBC COUNT",
+    "PLATELETS": "PLATELET COUNT",
+    "HCT": "HEMATOCRIT",
+    "NEUT": "NEUTROPHILS",
+    "LYMPH": "LYMPHOCYTES",
+    "MONO": "MONOCYTES",
+    "CHOLESTEROL": "TOTAL CHOLESTEROL",
+    "LDL": "LDL CHOLESTEROL",
+    "LDL C": "LDL CHOLESTEROL",
+    "HDL": "HDL CHOLESTEROL",
+    "TG": "TRIGLYCERIDES",
+    "SGPT": "ALT",
+    "SGOT": "AST",
+    "BILIRUBIN TOTAL": "BILIRUBIN",
+    "B12": "VITAMIN B12",
+    "VIT D": "VITAMIN D",
+}
+
+# Tests we recognise but do not track; without this they fuzzy-match to the wrong test
+# (e.g. VLDL -> LDL CHOLESTEROL, ALP -> TOTAL CHOLESTEROL)
+UNTRACKED_TEST_NAMES = {
+    "VLDL", "ALP", "ALKALINE PHOSPHATASE", "BUN", "BLOOD UREA NITROGEN",
+}
+
+FUZZY_SCORE_CUTOFF = 65
+
+_NON_ALNUM = re.compile(r'[^A-Za-z0-9 ]')
+
+_MISSING = object()
+
+# ----------- EXACT / ALIAS INDEX -----------
+ALIAS_INDEX = {name: name for name in VALID_TEST_NAMES}
+ALIAS_INDEX.update(TEST_NAME_ALIASES)
+ALIAS_INDEX.update({name: None for name in UNTRACKED_TEST_NAMES})
+
+# Choices pre-processed once, the same way thefuzz processes them on every call
+_PROCESSED_CHOICES = [utils.full_process(name) for name in VALID_TEST_NAMES]
+
+
+# ----------- FUZZY FALLBACK -----------
+@lru_cache(maxsize=8192)
+def _fuzzy_resolve(name):
+    """
+    Same result as thefuzz.process.extractOne(name, VALID_TEST_NAMES) with a
+    score > 65, but scores against pre-processed choices. thefuzz rounds the
+    WRatio score, so "rounded score > 65" is "raw score >= 65.5".
+    """
+    query = utils.full_process(name)
+    if not query:
+        return None
+    res = process.extractOne(
+        query, _PROCESSED_CHOICES,
+        scorer=fuzz.WRatio, processor=None,
+        score_cutoff=FUZZY_SCORE_CUTOFF + 0.5,
+    )
+    return VALID_TEST_NAMES[res[2]] if res else None
+
+
+def resolve_test_name(name):
+    """Maps a raw test label to a canonical name from VALID_TEST_NAMES, or None."""
+    if not isinstance(name, str):
+        return None
+    name = _NON_ALNUM.sub(' ', name).upper().strip()
+    hit = ALIAS_INDEX.get(" ".join(name.split()), _MISSING)
+    if hit is not _MISSING:
+        return hit
+    return _fuzzy_resolve(name)
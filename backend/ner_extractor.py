@@ -0,0 +1,56 @@
+# backend/ner_extractor.py
+import os
+import threading
+
+# The model trained by train_ner_model.py
+NER_MODEL_PATH = os.environ.get(
+    "LAB_NER_MODEL",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ner_model")
+)
+NER_BATCH_SIZE = int(os.environ.get("LAB_NER_BATCH_SIZE", 256))
+NER_N_PROCESS = int(os.environ.get("LAB_NER_PROCESSES", 1))
+
+_nlp = None
+_load_failed = False
+_lock = threading.Lock()
+
+
+def get_ner_model():
+    """Loads the spaCy model once per process. Returns None if spaCy or the model is unavailable."""
+    global _nlp, _load_failed
+    if _nlp is not None or _load_failed:
+        return _nlp
+    with _lock:
+        if _nlp is None and not _load_failed:
+            try:
+                import spacy
+                _nlp = spacy.load(NER_MODEL_PATH)
+            except Exception:
+                _load_failed = True
+    return _nlp
+
+
+def _doc_to_tokens(doc):
+    """Maps entities to (raw_name, raw_value, raw_unit, raw_range); the VALUE entity carries its unit."""
+    found = {}
+    for ent in doc.ents:
+        found.setdefault(ent.label_, ent.text.strip())
+    if "TEST_NAME" not in found or "VALUE" not in found:
+        return None
+    return found["TEST_NAME"], found["VALUE"], "", found.get("REFERENCE_RANGE")
+
+
+def ner_tokenize_lines(lines, batch_size=None, n_process=None):
+    """
+    Runs the NER model over lines in batches.
+    Returns a list aligned with `lines` holding token tuples or None.
+    """
+    nlp = get_ner_model()
+    if nlp is None or not lines:
+        return [None] * len(lines)
+    docs = nlp.pipe(
+        lines,
+        batch_size=batch_size or NER_BATCH_SIZE,
+        n_process=n_process or NER_N_PROCESS,
+    )
+    return [_doc_to_tokens(doc) for doc in docs]
@@ -0,0 +1,223 @@
+# backend/ocr_backends.py
+import os
+import re
+import shutil
+import threading
+import warnings
+
+# Which engine runs OCR: "pytesseract" (one tesseract subprocess per call) or
+# "tesserocr" (libtesseract in-process, kept loaded for the life of the worker)
+OCR_BACKEND = os.environ.get("LAB_OCR_BACKEND", "pytesseract")
+OCR_LANG = os.environ.get("LAB_OCR_LANG", "eng")
+
+# tessdata directory for tesserocr (default: the one libtesseract was built with)
+TESSDATA_PATH = os.environ.get("LAB_TESSDATA")
+
+_WINDOWS_TESSERACT = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+
+def tesseract_cmd():
+    """The tesseract binary: LAB_TESSERACT_CMD, else the standard Windows install, else PATH."""
+    cmd = os.environ.get("LAB_TESSERACT_CMD")
+    if cmd:
+        return cmd
+    if os.name == "nt" and os.path.exists(_WINDOWS_TESSERACT):
+        return _WINDOWS_TESSERACT
+    return shutil.which("tesseract") or "tesseract"
+
+
+# ----------- CONFIG PARSING -----------
+_PSM = re.compile(r'--psm\s+(\d+)')
+_DPI = re.compile(r'--dpi\s+(\d+)')
+
+
+def _config_value(pattern, config, default=None):
+    m = pattern.search(config or "")
+    return int(m.group(1)) if m else default
+
+
+class OCRTimeout(RuntimeError):
+    """Raised when an OCR call is stopped because its time budget ran out."""
+
+
+# ----------- BACKENDS -----------
+class OCRBackend:
+    """
+    The three calls the OCR pipeline makes, with pytesseract's signatures:
+    image_to_string, image_to_data (Output.DICT layout) and image_to_osd
+    (a dict with "rotate", or None when orientation cannot be detected).
+    `timeout` is in seconds (0 = none); running out raises OCRTimeout.
+    """
+    name = None
+
+    def image_to_string(self, img, config="", timeout=0):
+        raise NotImplementedError
+
+    def image_to_data(self, img, config="", timeout=0):
+        raise NotImplementedError
+
+    def image_to_osd(self, img, timeout=0):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    name = "pytesseract"
+
+    def __init__(self, lang=None, cmd=None):
+        import pytesseract
+        self._tess = pytesseract
+        self.lang = lang or OCR_LANG
+        pytesseract.pytesseract.tesseract_cmd = cmd or tesseract_cmd()
+
+    def _call(self, fn, *args, **kwargs):
+        # pytesseract kills the tesseract process on timeout and raises a plain RuntimeError
+        try:
+            return fn(*args, **kwargs)
+        except RuntimeError as e:
+            if "timeout" in str(e).lower():
+                raise OCRTimeout(str(e)) from None
+            raise
+
+    def image_to_string(self, img, config="", timeout=0):
+        return self._call(self._tess.image_to_string, img, lang=self.lang, config=config, timeout=timeout)
+
+    def image_to_data(self, img, config="", timeout=0):
+        return self._call(
+            self._tess.image_to_data, img, lang=self.lang, config=config,
+            output_type=self._tess.Output.DICT, timeout=timeout,
+        )
+
+    def image_to_osd(self, img, timeout=0):
+        try:
+            return self._call(self._tess.image_to_osd, img, output_type=self._tess.Output.DICT, timeout=timeout)
+        except self._tess.TesseractError:
+            # too little text for orientation detection
+            return None
+
+
+class TesserocrBackend(OCRBackend):
+    """Keeps one libtesseract instance loaded, so calls skip process start-up and model loading."""
+    name = "tesserocr"
+
+    def __init__(self, lang=None, tessdata=None):
+        import tesserocr
+        self._tr = tesserocr
+        self.lang = lang or OCR_LANG
+        self._path = tessdata or TESSDATA_PATH
+        self._api = self._open(self.lang, tesserocr.PSM.AUTO)
+        self._osd_api = None
+        # a TessBaseAPI is not safe to share between threads
+        self._lock = threading.Lock()
+
+    def _open(self, lang, psm):
+        kwargs = {"lang": lang, "psm": psm}
+        if self._path:
+            kwargs["path"] = self._path
+        return self._tr.PyTessBaseAPI(**kwargs)
+
+    def _set_image(self, img, config):
+        self._api.SetPageSegMode(_config_value(_PSM, config, self._tr.PSM.AUTO))
+        self._api.SetImage(img)
+        dpi = _config_value(_DPI, config)
+        if dpi:
+            self._api.SetSourceResolution(dpi)
+
+    def _recognize(self, timeout):
+        # libtesseract checks the deadline between words and stops recognition early
+        if not self._api.Recognize(int(timeout * 1000)) and timeout:
+            raise OCRTimeout("tesseract recognition timeout")
+
+    def image_to_string(self, img, config="", timeout=0):
+        with self._lock:
+            self._set_image(img, config)
+            self._recognize(timeout)
+            return self._api.GetUTF8Text()
+
+    def image_to_data(self, img, config="", timeout=0):
+        RIL = self._tr.RIL
+        data = {k: [] for k in (
+            "level", "page_num", "block_num", "par_num", "line_num", "word_num",
+            "left", "top", "width", "height", "conf", "text",
+        )}
+        with self._lock:
+            self._set_image(img, config)
+            self._recognize(timeout)
+            it = self._api.GetIterator()
+            if it is None:
+                return data
+            block = par = line = word = 0
+            for r in self._tr.iterate_level(it, RIL.WORD):
+                if r.IsAtBeginningOf(RIL.BLOCK):
+                    block, par, line = block + 1, 0, 0
+                if r.IsAtBeginningOf(RIL.PARA):
+                    par, line = par + 1, 0
+                if r.IsAtBeginningOf(RIL.TEXTLINE):
+                    line, word = line + 1, 0
+                word += 1
+                box = r.BoundingBox(RIL.WORD)
+                if box is None:
+                    continue
+                x0, y0, x1, y1 = box
+                for key, value in (
+                    ("level", 5), ("page_num", 1), ("block_num", block), ("par_num", par),
+                    ("line_num", line), ("word_num", word), ("left", x0), ("top", y0),
+                    ("width", x1 - x0), ("height", y1 - y0),
+                    ("conf", r.Confidence(RIL.WORD)), ("text", r.GetUTF8Text(RIL.WORD) or ""),
+                ):
+                    data[key].append(value)
+        return data
+
+    def image_to_osd(self, img, timeout=0):
+        with self._lock:
+            try:
+                if self._osd_api is None:
+                    self._osd_api = self._open("osd", self._tr.PSM.OSD_ONLY)
+                self._osd_api.SetImage(img)
+                osd = self._osd_api.DetectOrientationScript()
+            except RuntimeError:
+                # osd.traineddata missing
+                return None
+        if not osd:
+            return None
+        # same convention as tesseract's "Rotate:" line
+        return {"rotate": (360 - osd["orient_deg"]) % 360, "orientation": osd["orient_deg"]}
+
+    def close(self):
+        self._api.End()
+        if self._osd_api is not None:
+            self._osd_api.End()
+
+
+BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+
+# ----------- PER-PROCESS INSTANCE -----------
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    The OCR backend for this process, created on first use and reused after.
+    Falls back to pytesseract if the configured engine is not installed.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            cls = BACKENDS.get(OCR_BACKEND)
+            if cls is None:
+                raise ValueError(f"Unknown LAB_OCR_BACKEND {OCR_BACKEND!r}; expected one of {sorted(BACKENDS)}")
+            try:
+                _backend = cls()
+            except ImportError:
+                warnings.warn(f"OCR backend {OCR_BACKEND!r} is not installed; falling back to pytesseract")
+                _backend = PytesseractBackend()
+    return _backend
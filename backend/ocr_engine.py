@@ -0,0 +1,425 @@
+# backend/ocr_engine.py
+import atexit
+import os
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+from PIL import Image
+
+from .image_preprocess import open_for_ocr, preprocess_for_ocr
+from .ocr_backends import OCRTimeout, get_backend
+from .table_extractor import words_from_tesseract, rows_from_words, rows_from_tables, row_tokens
+from .time_budget import page_deadline
+
+# Number of OCR worker processes (defaults to all cores)
+OCR_WORKERS = int(os.environ.get("LAB_OCR_WORKERS", os.cpu_count() or 1))
+
+# Resolution used when rasterizing text-less PDF pages
+OCR_DPI = int(os.environ.get("LAB_OCR_DPI", 300))
+
+# Pages with fewer characters than this in their text layer are treated as scans
+MIN_TEXT_CHARS = 20
+
+# Adaptive OCR: fast tier settings, the confidence needed to stop there, and the escalation PSMs
+OCR_ADAPTIVE = os.environ.get("LAB_OCR_ADAPTIVE", "1") == "1"
+OCR_FAST_DPI = int(os.environ.get("LAB_OCR_FAST_DPI", 200))
+OCR_FAST_PSM = 6
+OCR_MIN_CONFIDENCE = float(os.environ.get("LAB_OCR_MIN_CONF", 75))
+OCR_ESCALATION_PSMS = (6, 4, 3)
+
+# Extra seconds to wait for a worker past the report deadline before giving up on its page
+OCR_DEADLINE_GRACE = 2.0
+
+
+# ----------- IMAGE PREPROCESSING -----------
+def preprocess_image(img, dpi=None):
+    return preprocess_for_ocr(img, dpi=dpi)
+
+
+def _image_dpi(img):
+    dpi = img.info.get("dpi")
+    return int(dpi[0]) if dpi else None
+
+
+def _tesseract_config(img, extra=""):
+    dpi = _image_dpi(img)
+    return f"{extra} --dpi {dpi}".strip() if dpi else extra
+
+
+# ----------- PAGE DEADLINES -----------
+# Set while a page is being OCR'd; thread-local because inline jobs run on job threads
+_page = threading.local()
+
+
+def _ocr_timeout():
+    """Seconds left for the current page (0 = no limit). Raises OCRTimeout once it is used up."""
+    deadline = getattr(_page, "deadline", None)
+    if deadline is None:
+        return 0
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise OCRTimeout("page time budget exceeded")
+    return remaining
+
+
+def _with_page_deadline(limits, fn, *args):
+    _page.deadline = page_deadline(limits)
+    try:
+        return fn(*args)
+    finally:
+        _page.deadline = None
+
+
+# ----------- ADAPTIVE OCR -----------
+def _data_lines(data):
+    """Groups image_to_data words into lines: [{"words", "confs", "box"}] in reading order."""
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        if not str(word).strip():
+            continue
+        key = (data["page_num"][i], data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        line = lines.setdefault(key, {"words": [], "confs": [], "box": None})
+        line["words"].append(str(word).strip())
+        line["confs"].append(float(data["conf"][i]))
+        x0, y0 = data["left"][i], data["top"][i]
+        x1, y1 = x0 + data["width"][i], y0 + data["height"][i]
+        box = line["box"]
+        line["box"] = (x0, y0, x1, y1) if box is None else (
+            min(box[0], x0), min(box[1], y0), max(box[2], x1), max(box[3], y1)
+        )
+    return list(lines.values())
+
+
+def _mean_confidence(lines):
+    confs = [c for line in lines for c in line["confs"] if c >= 0]
+    return sum(confs) / len(confs) if confs else 0.0
+
+
+def _lines_text(lines):
+    return "\n".join(" ".join(line["words"]) for line in lines)
+
+
+def _ocr_lines(img, psm):
+    data = get_backend().image_to_data(img, config=_tesseract_config(img, f"--psm {psm}"), timeout=_ocr_timeout())
+    return _data_lines(data)
+
+
+def _escalate_regions(img, lines, scale):
+    """Re-OCRs low-confidence lines from the full-resolution image, keeping whichever read is more confident."""
+    pad = 4
+    for line in lines:
+        if _mean_confidence([line]) >= OCR_MIN_CONFIDENCE:
+            continue
+        x0, y0, x1, y1 = (int(v / scale) for v in line["box"])
+        crop = img.crop((max(0, x0 - pad), max(0, y0 - pad), min(img.width, x1 + pad), min(img.height, y1 + pad)))
+        crop.info["dpi"] = img.info.get("dpi")
+        retry = _ocr_lines(crop, 7)
+        if retry and _mean_confidence(retry) > _mean_confidence([line]):
+            line["words"] = [w for r in retry for w in r["words"]]
+            line["confs"] = [c for r in retry for c in r["confs"]]
+    return lines
+
+
+def _escalate_page(img):
+    """Full-resolution pass with orientation detection and alternative page segmentation modes."""
+    osd = get_backend().image_to_osd(img, timeout=_ocr_timeout())
+    if osd and osd.get("rotate"):
+        dpi = img.info.get("dpi")
+        img = img.rotate(-osd["rotate"], expand=True, fillcolor=255)
+        img.info["dpi"] = dpi
+
+    best = None
+    for psm in OCR_ESCALATION_PSMS:
+        lines = _ocr_lines(img, psm)
+        if best is None or _mean_confidence(lines) > _mean_confidence(best):
+            best = lines
+    return best
+
+
+def ocr_page_image(img):
+    """
+    OCRs a preprocessed page. With adaptive OCR on, a fast low-resolution single-PSM
+    pass runs first; only low-confidence lines, and then whole pages that are still
+    below LAB_OCR_MIN_CONF, are re-read with the expensive settings.
+    """
+    if not OCR_ADAPTIVE:
+        return get_backend().image_to_string(img, config=_tesseract_config(img), timeout=_ocr_timeout())
+
+    dpi = _image_dpi(img) or OCR_FAST_DPI
+    scale = min(1.0, OCR_FAST_DPI / dpi)
+    fast = img
+    if scale < 1.0:
+        fast = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.BILINEAR)
+        fast.info["dpi"] = (OCR_FAST_DPI, OCR_FAST_DPI)
+
+    lines = _ocr_lines(fast, OCR_FAST_PSM)
+    if _mean_confidence(lines) >= OCR_MIN_CONFIDENCE:
+        return _lines_text(lines)
+
+    lines = _escalate_regions(img, lines, scale)
+    if _mean_confidence(lines) >= OCR_MIN_CONFIDENCE:
+        return _lines_text(lines)
+
+    page = _escalate_page(img)
+    if page and _mean_confidence(page) > _mean_confidence(lines):
+        lines = page
+    return _lines_text(lines)
+
+
+def ocr_page_words(img):
+    """OCRs a preprocessed page into word boxes for table reconstruction."""
+    data = get_backend().image_to_data(
+        img, config=_tesseract_config(img, f"--psm {OCR_FAST_PSM}"), timeout=_ocr_timeout()
+    )
+    return words_from_tesseract(data)
+
+
+# ----------- PAGE WORKERS (run inside the process pool) -----------
+def _ocr_image(img, layout):
+    if layout == "rows":
+        return rows_from_words(ocr_page_words(img))
+    if layout == "words":
+        return {"width": img.width, "words": ocr_page_words(img)}
+    return ocr_page_image(img)
+
+
+def _ocr_pdf_page(job):
+    """Rasterizes one PDF page and OCRs it. Opens the PDF in the worker so
+    only the path and page number cross the process boundary."""
+    path, page_number, dpi, layout, limits = job
+    return _with_page_deadline(limits, _rasterize_and_ocr, path, page_number, dpi, layout)
+
+
+def _rasterize_and_ocr(path, page_number, dpi, layout):
+    with pdfplumber.open(path) as pdf:
+        page = pdf.pages[page_number]
+        img = page.to_image(resolution=dpi).original
+    _ocr_timeout()
+    return _ocr_image(preprocess_image(img, dpi=dpi), layout)
+
+
+def _ocr_image_frame(job):
+    """OCRs a single frame of a (possibly multi-page) image file."""
+    path, frame_number, layout, limits = job
+    return _with_page_deadline(limits, _load_and_ocr, path, frame_number, layout)
+
+
+def _load_and_ocr(path, frame_number, layout):
+    with open_for_ocr(path, frame=frame_number) as img:
+        frame = preprocess_image(img)
+    _ocr_timeout()
+    return _ocr_image(frame, layout)
+
+
+# ----------- PERSISTENT OCR POOL -----------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_ocr_worker():
+    # bring the OCR engine up before the first page arrives
+    get_backend()
+
+
+def get_ocr_pool():
+    """
+    The process-wide OCR pool. Workers are started once and stay warm between
+    reports, so each upload skips process start-up, imports and engine loading.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=_init_ocr_worker)
+        return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_ocr_pool)
+
+
+def _run_inline(worker, jobs, budget):
+    results = []
+    for job in jobs:
+        if budget is not None and budget.expired():
+            results.append(None)
+            continue
+        try:
+            results.append(worker(job))
+        except OCRTimeout:
+            results.append(None)
+    return results
+
+
+def _run_pooled(worker, jobs, budget):
+    futures = [get_ocr_pool().submit(worker, job) for job in jobs]
+    give_up_at = budget.deadline + OCR_DEADLINE_GRACE if budget is not None and budget.deadline else None
+    results = []
+    for i, fut in enumerate(futures):
+        try:
+            results.append(fut.result(timeout=None if give_up_at is None else max(0.0, give_up_at - time.time())))
+        except (OCRTimeout, FutureTimeout, CancelledError):
+            results.append(None)
+            if budget is not None and budget.expired():
+                # out of time: drop pages that have not started; running ones stop at their own deadline
+                for rest in futures[i + 1:]:
+                    rest.cancel()
+    return results
+
+
+def run_page_jobs(worker, jobs, budget=None):
+    """
+    Runs page jobs on the OCR pool and returns results in page order.
+    With a TimeBudget, pages that run out of time (or never start) come back as None.
+    """
+    if not jobs:
+        return []
+    if min(OCR_WORKERS, len(jobs)) <= 1:
+        return _run_inline(worker, jobs, budget)
+    try:
+        return _run_pooled(worker, jobs, budget)
+    except BrokenProcessPool:
+        # a worker died (e.g. killed for memory); replace the pool and retry once
+        shutdown_ocr_pool()
+        return _run_pooled(worker, jobs, budget)
+
+
+# ----------- PAGE READERS -----------
+# "text": page text as a string; "rows": table rows as lists of cell strings;
+# "words": {"width", "words"} word boxes for layout templates
+def _read_text_layer(page):
+    t = page.extract_text() or ""
+    return t, len(t.strip()) < MIN_TEXT_CHARS
+
+
+def _read_table_layer(page):
+    words = page.extract_words()
+    if sum(len(w["text"]) for w in words) < MIN_TEXT_CHARS:
+        return [], True
+    # ruled tables first; fall back to rebuilding rows from word coordinates
+    rows = rows_from_tables(page.extract_tables())
+    if not any(row_tokens(r) for r in rows):
+        rows = rows_from_words(words)
+    return rows, False
+
+
+def _read_word_layer(page):
+    words = page.extract_words()
+    return {"width": float(page.width), "words": words}, sum(len(w["text"]) for w in words) < MIN_TEXT_CHARS
+
+
+def read_first_page_words(path):
+    """Page 1's word boxes from the PDF text layer, or None for scanned or empty files."""
+    with pdfplumber.open(path) as pdf:
+        if not pdf.pages:
+            return None
+        content, needs_ocr = _read_word_layer(pdf.pages[0])
+    return None if needs_ocr else content
+
+
+# layout -> (page reader, content size, empty content for skipped pages)
+_LAYOUTS = {
+    "text": (_read_text_layer, lambda text: len(text.strip()), str),
+    "rows": (_read_table_layer, len, list),
+    "words": (_read_word_layer, lambda page: len(page["words"]), lambda: {"width": 1.0, "words": []}),
+}
+
+
+# ----------- PAGE-LEVEL EXTRACTION -----------
+def _ocr_window(path, window, dpi, layout, budget=None):
+    """OCRs the scanned pages of a window of (page_number, content, needs_ocr) and returns contents in order."""
+    size = _LAYOUTS[layout][1]
+    limits = budget.page_limits() if budget is not None else None
+    scanned = [i for i, (_, _, needs_ocr) in enumerate(window) if needs_ocr]
+    ocr_results = run_page_jobs(
+        _ocr_pdf_page, [(path, window[i][0], dpi, layout, limits) for i in scanned], budget=budget
+    )
+    contents = [c for _, c, _ in window]
+    for i, c in zip(scanned, ocr_results):
+        if c is None:
+            budget.skip(window[i][0] + 1)
+        # keep the text layer if OCR found nothing better
+        elif size(c) > size(contents[i]):
+            contents[i] = c
+    return contents
+
+
+def iter_pdf_pages(path, dpi=None, max_pages=None, window=None, layout="text", budget=None):
+    """
+    Yields the content of each page in order (text, or table rows with layout="rows").
+    Pages with a usable text layer are read directly; scanned pages are
+    rasterized and OCR'd in parallel, `window` scanned pages at a time
+    (default: one per worker), so memory stays bounded on very long files.
+    With a TimeBudget, pages that run out of time are recorded in budget.skipped.
+    Once the report deadline passes, text-layer pages are still read (that costs
+    no OCR); scanned pages are no longer OCR'd, keep whatever text layer they
+    have and are recorded as skipped.
+    """
+    dpi = dpi or OCR_DPI
+    window = window or OCR_WORKERS
+    read_page = _LAYOUTS[layout][0]
+    pending = []
+    n_scanned = 0
+    with pdfplumber.open(path) as pdf:
+        n_pages = len(pdf.pages) if max_pages is None else min(len(pdf.pages), max_pages)
+        for i, page in enumerate(pdf.pages):
+            if i >= n_pages:
+                break
+            content, needs_ocr = read_page(page)
+            # drop pdfplumber's per-page object cache once the content is out
+            page.close()
+            if needs_ocr and budget is not None and budget.expired():
+                budget.skip(i + 1)
+                needs_ocr = False
+            if not needs_ocr and not pending:
+                yield content
+                continue
+            pending.append((i, content, needs_ocr))
+            n_scanned += needs_ocr
+            if n_scanned >= window:
+                yield from _ocr_window(path, pending, dpi, layout, budget)
+                pending, n_scanned = [], 0
+    if pending:
+        yield from _ocr_window(path, pending, dpi, layout, budget)
+
+
+def extract_pdf_pages(path, dpi=None, layout="text", budget=None):
+    """Returns the content of every page in order, OCR'ing all scanned pages in one batch."""
+    return list(iter_pdf_pages(path, dpi=dpi, window=sys.maxsize, layout=layout, budget=budget))
+
+
+def iter_image_pages(path, max_pages=None, window=None, layout="text", budget=None):
+    """
+    Yields the OCR content of every frame (multi-page TIFFs) in order, `window` frames at a time.
+    Frames that run out of time yield empty content and are recorded in budget.skipped.
+    """
+    window = window or OCR_WORKERS
+    empty = _LAYOUTS[layout][2]
+    limits = budget.page_limits() if budget is not None else None
+    with Image.open(path) as img:
+        n_frames = getattr(img, "n_frames", 1)
+    if max_pages is not None:
+        n_frames = min(n_frames, max_pages)
+    for start in range(0, n_frames, window):
+        stop = min(start + window, n_frames)
+        jobs = [(path, i, layout, limits) for i in range(start, stop)]
+        for i, content in zip(range(start, stop), run_page_jobs(_ocr_image_frame, jobs, budget=budget)):
+            if content is None:
+                budget.skip(i + 1)
+                content = empty()
+            yield content
+
+
+def extract_image_pages(path, layout="text", budget=None):
+    """Returns the OCR content of every frame in order."""
+    return list(iter_image_pages(path, window=sys.maxsize, layout=layout, budget=budget))
@@ -0,0 +1,116 @@
+# backend/reference_ranges.py
+import json
+import os
+import threading
+
+import numpy as np
+
+# Age/sex reference bands keyed by canonical test name (see data/reference_ranges.json)
+REFERENCE_RANGES_PATH = os.environ.get(
+    "LAB_REFERENCE_RANGES",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "reference_ranges.json")
+)
+
+# Ages are indexed by whole year up to MAX_AGE; the extra slot is "age unknown"
+MAX_AGE = 120
+AGE_UNKNOWN = MAX_AGE + 1
+
+# sex code 0 = unknown: only bands for either sex ("*") apply
+SEX_CODES = {"M": 1, "MALE": 1, "F": 2, "FEMALE": 2}
+
+
+# ----------- INDEX -----------
+def sex_code(sex):
+    return SEX_CODES.get(str(sex).strip().upper(), 0) if sex is not None else 0
+
+
+def age_bucket(age):
+    try:
+        age = float(age)
+    except (TypeError, ValueError):
+        return AGE_UNKNOWN
+    if age != age:
+        return AGE_UNKNOWN
+    return int(min(max(age, 0), MAX_AGE))
+
+
+def _band_applies(band, sex, age):
+    if band.get("sex", "*") != "*" and SEX_CODES.get(band["sex"].upper()) != sex:
+        return False
+    age_min, age_max = band.get("age_min") or 0, band.get("age_max")
+    if age == AGE_UNKNOWN:
+        # without an age only bands covering every age can apply
+        return age_min == 0 and age_max is None
+    return age_min <= age and (age_max is None or age < age_max)
+
+
+def build_index(tests):
+    """
+    Precomputes, for every test, sex code and age year, which band applies
+    (first match in file order), so a lookup is one array access.
+    Returns {"test_ids", "table" (tests x 3 x ages, -1 = none), "kind", "low", "high", "label"}.
+    """
+    test_ids = {}
+    kinds, lows, highs, labels = [], [], [], []
+    table = np.full((len(tests), 3, AGE_UNKNOWN + 1), -1, dtype=np.int32)
+    for t, (name, bands) in enumerate(tests.items()):
+        test_ids[name.strip().upper()] = t
+        first_id = len(kinds)
+        for band in bands:
+            if "op" in band:
+                kinds.append(band["op"])
+                lows.append(np.nan)
+                highs.append(float(band["limit"]))
+                labels.append(f"{band['op']} {band['limit']} ({band.get('label', 'Standard')})")
+            else:
+                kinds.append("range")
+                lows.append(float(band["low"]))
+                highs.append(float(band["high"]))
+                labels.append(f"{band['low']} - {band['high']} ({band.get('label', 'Standard')})")
+        for sex in range(3):
+            for age in range(AGE_UNKNOWN + 1):
+                for i, band in enumerate(bands):
+                    if _band_applies(band, sex, age):
+                        table[t, sex, age] = first_id + i
+                        break
+    return {
+        "test_ids": test_ids,
+        "table": table,
+        "kind": np.array(kinds + [None], dtype=object)[:-1],
+        "low": np.array(lows, dtype=float),
+        "high": np.array(highs, dtype=float),
+        "label": np.array(labels + [None], dtype=object)[:-1],
+    }
+
+
+def load_reference_ranges(path=None):
+    with open(path or REFERENCE_RANGES_PATH, encoding="utf-8") as f:
+        return build_index(json.load(f)["tests"])
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_reference_index():
+    """The band index, built once per process from LAB_REFERENCE_RANGES."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = load_reference_ranges()
+    return _index
+
+
+# ----------- LOOKUP -----------
+def band_ids(test_ids, sexes, ages, index=None):
+    """
+    Vectorized lookup: test index (-1 = no bands), sex code and age bucket arrays
+    -> band id per row (-1 = no band applies).
+    """
+    index = index or get_reference_index()
+    if not len(index["kind"]):
+        return np.full(len(test_ids), -1, dtype=np.int32)
+    ids = index["table"][np.maximum(test_ids, 0), sexes, ages]
+    return np.where(test_ids >= 0, ids, -1)
+
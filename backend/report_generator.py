@@ -1,4 +1,5 @@
 # backend/report_generator.py
+import io
 
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
 from reportlab.lib.pagesizes import letter
@@ -7,7 +8,7 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.colors import HexColor
 
 def generate_pdf_report(analyzed_df, summary, chart_path, output_path):
-    """Generates a complete PDF report using a chart IMAGE FILE, not a figure."""
+    """Generates a complete PDF report using a chart IMAGE (file path or PNG bytes), not a figure."""
     doc = SimpleDocTemplate(output_path, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
@@ -21,10 +22,11 @@ def generate_pdf_report(analyzed_df, summary, chart_path, output_path):
     story.append(Paragraph(summary.replace("\n", "<br/>"), styles['BodyText']))
     story.append(Spacer(1, 0.25 * inch))
 
-    # ---------- Chart (IMAGE file) ----------
-    if chart_path and isinstance(chart_path, str):
+    # ---------- Chart (IMAGE file or PNG bytes) ----------
+    if chart_path and isinstance(chart_path, (str, bytes)):
         try:
-            story.append(Image(chart_path, width=6 * inch, height=4 * inch))
+            image = io.BytesIO(chart_path) if isinstance(chart_path, bytes) else chart_path
+            story.append(Image(image, width=6 * inch, height=4 * inch))
             story.append(Spacer(1, 0.25 * inch))
         except Exception as e:
             story.append(Paragraph(f"(Chart could not be loaded: {e})", styles['BodyText']))
@@ -0,0 +1,139 @@
+# backend/rules.py
+# Compiled matcher for connection rules ("need" lists of (test, status) conditions).
+#
+# A condition holds when some abnormal row's test name contains the test pattern
+# and its status contains the status pattern (case-insensitive regex search, as
+# pandas str.contains did). Every distinct condition gets one bit. A report is
+# reduced to the bitmask of conditions its abnormal rows satisfy, one lookup per
+# distinct test name and status, and a rule fires when its own mask is covered.
+# Rules are indexed by one of their conditions, so only rules whose indexed
+# condition holds are checked at all.
+import json
+import os
+import re
+import threading
+
+# Extra rules file (JSON object label -> {"need": [[test, status], ...], "msg": "..."}),
+# merged over the built-in CONNECTIONS_KNOWLEDGE_BASE; reloaded when it changes
+CONNECTION_RULES_PATH = os.environ.get("LAB_CONNECTION_RULES", "")
+
+_NORMAL = re.compile(r'^\s*Normal\s*$', re.I)
+
+
+# ----------- COMPILE -----------
+def compile_rules(rules):
+    """
+    rules: {label: {"need": [(test, status), ...], "msg": str}} in evaluation order.
+    Returns the compiled engine (see match_rules).
+    """
+    cond_bits = {}
+    test_masks, status_masks = {}, {}
+    compiled, by_condition = [], {}
+    for label, rule in rules.items():
+        mask = 0
+        first_bit = None
+        for test, status in rule["need"]:
+            bit = cond_bits.get((test, status))
+            if bit is None:
+                bit = cond_bits[(test, status)] = 1 << len(cond_bits)
+                test_masks[test] = test_masks.get(test, 0) | bit
+                status_masks[status] = status_masks.get(status, 0) | bit
+            mask |= bit
+            if first_bit is None:
+                first_bit = bit
+        index = len(compiled)
+        compiled.append((mask, label, rule["msg"]))
+        if first_bit is None:
+            # a rule with no conditions always fires
+            by_condition.setdefault(0, []).append(index)
+        else:
+            by_condition.setdefault(first_bit, []).append(index)
+    return {
+        "rules": compiled,
+        "by_condition": by_condition,
+        "tests": [(re.compile(p, re.I), m) for p, m in test_masks.items()],
+        "statuses": [(re.compile(p, re.I), m) for p, m in status_masks.items()],
+        "name_cache": {},
+        "status_cache": {},
+    }
+
+
+def _pattern_mask(patterns, cache, text):
+    mask = cache.get(text)
+    if mask is None:
+        mask = 0
+        if isinstance(text, str):
+            for pattern, bits in patterns:
+                if pattern.search(text):
+                    mask |= bits
+        if len(cache) < 65536:
+            cache[text] = mask
+    return mask
+
+
+def satisfied_conditions(engine, analyzed_df):
+    """Bitmask of the conditions the report's abnormal rows satisfy (one pass over distinct pairs)."""
+    if analyzed_df is None or analyzed_df.empty:
+        return 0
+    status = analyzed_df["Status"]
+    abnormal = ~status.str.match(_NORMAL.pattern, case=False, na=False)
+    pairs = set(zip(analyzed_df["Test Name"][abnormal].tolist(), status[abnormal].tolist()))
+    satisfied = 0
+    for name, stat in pairs:
+        satisfied |= (
+            _pattern_mask(engine["tests"], engine["name_cache"], name)
+            & _pattern_mask(engine["statuses"], engine["status_cache"], stat)
+        )
+    return satisfied
+
+
+def match_rules(engine, analyzed_df):
+    """(label, msg) of every rule that fires, in rule order."""
+    if analyzed_df is None or analyzed_df.empty:
+        return []
+    satisfied = satisfied_conditions(engine, analyzed_df)
+    candidates = list(engine["by_condition"].get(0, []))
+    bits = satisfied
+    while bits:
+        bit = bits & -bits
+        candidates.extend(engine["by_condition"].get(bit, ()))
+        bits ^= bit
+    rules = engine["rules"]
+    fired = [i for i in candidates if rules[i][0] & satisfied == rules[i][0]]
+    return [(rules[i][1], rules[i][2]) for i in sorted(fired)]
+
+
+# ----------- RULE FILES -----------
+def load_rules(path):
+    """Rules from a JSON file, in file order; each "need" entry is a [test, status] pair."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {
+        label: {"need": [tuple(cond) for cond in rule["need"]], "msg": rule["msg"]}
+        for label, rule in raw.items()
+    }
+
+
+_engine = None
+_engine_key = None
+_lock = threading.Lock()
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def get_rule_engine(builtin_rules):
+    """Engine for the built-in rules plus LAB_CONNECTION_RULES, recompiled when the file changes."""
+    global _engine, _engine_key
+    key = (id(builtin_rules), len(builtin_rules), _mtime(CONNECTION_RULES_PATH) if CONNECTION_RULES_PATH else None)
+    with _lock:
+        if _engine is None or key != _engine_key:
+            rules = dict(builtin_rules)
+            if key[2] is not None:
+                rules.update(load_rules(CONNECTION_RULES_PATH))
+            _engine, _engine_key = compile_rules(rules), key
+        return _engine
@@ -1,6 +1,12 @@
 # summarizer.py (updated)
+import re
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 
+from .rules import get_rule_engine, match_rules
+
 # -------------------------------------------------
 #  SMALL, SIMPLE, SUPER-EASY EXPLANATIONS
 # -------------------------------------------------
@@ -43,24 +49,128 @@ EXPERT_KNOWLEDGE_BASE = {
 # -------------------------------------------------
 #  FRIENDLY SUMMARY GENERATOR
 # -------------------------------------------------
-def generate_summary(analyzed_df, diagnosis):
-    """Creates an easy-to-read summary for users."""
+_NORMAL_STATUS = re.compile(r'^\s*Normal\s*$', re.I)
+
+NO_VALUES_SUMMARY = "## 🌿 No test values detected in the report."
+
+ALL_NORMAL_SUMMARY = (
+    "## 🌿 Your Health Looks Great!\n"
+    "All your test values are within the healthy range. Keep drinking water, "
+    "moving daily, and eating balanced meals 💚."
+)
+
+SUMMARY_FOOTER = (
+    "---\n### ✅ Overall\n"
+    "Nothing here looks scary — most numbers shift due to food, stress, water intake, or sleep. "
+    "A few simple habits can balance your levels naturally.\n\n"
+    "If you feel unwell, consider showing this report to your doctor. 💙\n\n"
+    "⚠️ **Note:** This summary is for your information and understanding only. "
+    "Always consult your doctor for medical advice."
+)
+
+DEFAULT_ADVICE = {
+    True: (
+        "- **Meaning:** Slightly high values can be due to meals, stress, or dehydration.",
+        "- **Tip:** Drink water, avoid heavy meals before testing.",
+    ),
+    False: (
+        "- **Meaning:** Low values may reflect nutrition gaps or tiredness.",
+        "- **Tip:** Eat balanced meals and rest well.",
+    ),
+}
+
+
+def _compile_advice(knowledge_base):
+    """(TEST NAME, is high) -> the explanation lines for that test and direction."""
+    fragments = {}
+    for key, info in knowledge_base.items():
+        for high, meaning, fix in ((True, "High", "FixHigh"), (False, "Low", "FixLow")):
+            lines = []
+            if meaning in info:
+                lines.append(f"- **What This Means:** {info[meaning]}")
+            if fix in info:
+                lines.append(f"- **What To Do:** {info[fix]}")
+            fragments[(key, high)] = tuple(lines)
+    return fragments
+
+
+_ADVICE = _compile_advice(EXPERT_KNOWLEDGE_BASE)
+
+
+@lru_cache(maxsize=1024)
+def _is_normal(status):
+    # astype(str) leaves missing statuses as NaN; str.match(na=False) counted those as abnormal
+    return isinstance(status, str) and _NORMAL_STATUS.match(status) is not None
+
+
+@lru_cache(maxsize=4096)
+def _test_block_head(test_name, status):
+    """Heading line and explanation lines for one (test, status); identical across reports."""
+    name = str(test_name).title()
+    high = "High" in status
+    advice = _ADVICE.get((name.upper(), high), DEFAULT_ADVICE[high])
+    return f"### • {name} — {status}", advice
+
+
+def _is_missing_cell(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+def _string_rows(df, rows):
+    """
+    Which of these rows iterrows turned into a string Series (every cell a str or
+    missing); their None / NA cells read as nan. Kept so the text stays exactly
+    what the row-by-row version produced.
+    """
+    mask = np.ones(len(rows), dtype=bool)
+    for name in df.columns:
+        col = df[name]
+        if name == "Status" or (pd.api.types.is_string_dtype(col.dtype) and col.dtype != object):
+            continue
+        if pd.api.types.is_float_dtype(col.dtype):
+            mask &= col.isna().to_numpy()[rows]
+        elif pd.api.types.is_numeric_dtype(col.dtype):
+            return np.zeros(len(rows), dtype=bool)
+        else:
+            cells = col.to_numpy(dtype=object)[rows]
+            mask &= np.fromiter((isinstance(v, str) or _is_missing_cell(v) for v in cells), dtype=bool, count=len(rows))
+    return mask
+
+
+# (column, default when missing) for the per-test lines, as row.get(column, default) read them
+_ROW_FIELDS = (("Test Name", ""), ("Value", ""), ("Unit", ""), ("Reference Range Used", "N/A"))
+
 
+def _row_fields(df, rows):
+    """Test name, value, unit and range text for the given rows, as iterrows gave them."""
+    fields = [
+        df[name].to_numpy(dtype=object)[rows].tolist() if name in df.columns else [default] * len(rows)
+        for name, default in _ROW_FIELDS
+    ]
+    if any(v is None or v is pd.NA for cells in fields for v in cells):
+        string_rows = _string_rows(df, rows)
+        fields = [
+            [float("nan") if as_string and _is_missing_cell(v) else v for v, as_string in zip(cells, string_rows)]
+            for cells in fields
+        ]
+    return fields
+
+
+def _render_summary(analyzed_df, diagnosis):
     if analyzed_df is None or analyzed_df.empty:
         if diagnosis:
             return f"## 🩺 Quick Summary\n**Doctor’s Note / Observation:** {diagnosis}\n\nNo numeric values were extracted."
-        return "## 🌿 No test values detected in the report."
-
-    analyzed_df["Status"] = analyzed_df["Status"].astype(str)
+        return NO_VALUES_SUMMARY
 
-    abnormal = analyzed_df[~analyzed_df["Status"].str.match(r'^\s*Normal\s*$', case=False, na=False)]
+    status = analyzed_df["Status"]
+    if not (isinstance(status.dtype, pd.StringDtype) and status.dtype.na_value is np.nan):
+        # str() of every status, as astype(str) gives, without touching the caller's frame
+        status = status.astype(str)
+    statuses = status.tolist()
+    abnormal = [i for i, text in enumerate(statuses) if not _is_normal(text)]
 
-    if abnormal.empty and not diagnosis:
-        return (
-            "## 🌿 Your Health Looks Great!\n"
-            "All your test values are within the healthy range. Keep drinking water, "
-            "moving daily, and eating balanced meals 💚."
-        )
+    if not abnormal and not diagnosis:
+        return ALL_NORMAL_SUMMARY
 
     summary_lines = []
 
@@ -69,53 +179,35 @@ def generate_summary(analyzed_df, diagnosis):
 
     summary_lines.append("Here’s what stood out in your report:\n")
 
-    for _, row in abnormal.iterrows():
-        name = str(row.get("Test Name", "")).title()
-        value = row.get("Value", "")
-        unit = row.get("Unit", "")
-        status = row.get("Status", "")
-        used_range = row.get("Reference Range Used", "N/A")
-
-        summary_lines.append(f"### • {name} — {status}")
-        val_display = f"{value} {unit}".strip()
-        summary_lines.append(f"- **Your Value:** {val_display} (Normal: {used_range})")
-
-        info = EXPERT_KNOWLEDGE_BASE.get(name.upper(), None)
-
-        if info:
-            if "High" in status:
-                if "High" in info:
-                    summary_lines.append(f"- **What This Means:** {info['High']}")
-                if "FixHigh" in info:
-                    summary_lines.append(f"- **What To Do:** {info['FixHigh']}")
-            else:
-                if "Low" in info:
-                    summary_lines.append(f"- **What This Means:** {info['Low']}")
-                if "FixLow" in info:
-                    summary_lines.append(f"- **What To Do:** {info['FixLow']}")
-        else:
-            if "High" in status:
-                summary_lines.append("- **Meaning:** Slightly high values can be due to meals, stress, or dehydration.")
-                summary_lines.append("- **Tip:** Drink water, avoid heavy meals before testing.")
-            else:
-                summary_lines.append("- **Meaning:** Low values may reflect nutrition gaps or tiredness.")
-                summary_lines.append("- **Tip:** Eat balanced meals and rest well.")
-
-        summary_lines.append("")  # spacing
-
-    # ----------------------- UPDATED PART (your requested line) -----------------------
-    summary_lines.append(
-        "---\n### ✅ Overall\n"
-        "Nothing here looks scary — most numbers shift due to food, stress, water intake, or sleep. "
-        "A few simple habits can balance your levels naturally.\n\n"
-        "If you feel unwell, consider showing this report to your doctor. 💙\n\n"
-        "⚠️ **Note:** This summary is for your information and understanding only. "
-        "Always consult your doctor for medical advice."
-    )
-    # -------------------------------------------------------------------------------
+    if abnormal:
+        names, values, units, used_ranges = _row_fields(analyzed_df, abnormal)
+        for k, i in enumerate(abnormal):
+            head, advice = _test_block_head(names[k], statuses[i])
+            summary_lines.append(head)
+            val_display = f"{values[k]} {units[k]}".strip()
+            summary_lines.append(f"- **Your Value:** {val_display} (Normal: {used_ranges[k]})")
+            summary_lines.extend(advice)
+            summary_lines.append("")  # spacing
+
+    summary_lines.append(SUMMARY_FOOTER)
 
     return "\n".join(summary_lines)
 
+
+def generate_summary(analyzed_df, diagnosis):
+    """Creates an easy-to-read summary for users. The frame is not modified."""
+    return _render_summary(analyzed_df, diagnosis)
+
+
+def generate_summaries(reports):
+    """
+    Summaries for many reports at once: reports is an iterable of
+    (analyzed_df, diagnosis) pairs; returns one Markdown string per report,
+    identical to generate_summary. Heading and explanation fragments are
+    shared across the whole batch; no frame is copied or modified.
+    """
+    return [_render_summary(analyzed_df, diagnosis) for analyzed_df, diagnosis in reports]
+
 # -------------------------------------------------
 #  CONNECTION PATTERNS
 # -------------------------------------------------
@@ -131,23 +223,12 @@ CONNECTIONS_KNOWLEDGE_BASE = {
 }
 
 def find_possible_connections(analyzed_df):
-    insights = []
+    """
+    Messages of the CONNECTIONS_KNOWLEDGE_BASE rules (plus any LAB_CONNECTION_RULES file)
+    whose conditions all match an abnormal row. Evaluated by the compiled matcher in
+    backend/rules.py, so the cost does not grow with the number of rules.
+    """
     if analyzed_df is None or analyzed_df.empty:
-        return insights
-
-    abnormal = analyzed_df[~analyzed_df["Status"].str.match(r'^\s*Normal\s*$', case=False, na=False)]
-
-    for label, rule in CONNECTIONS_KNOWLEDGE_BASE.items():
-        found = True
-        for test, cond in rule["need"]:
-            match = abnormal[
-                abnormal["Test Name"].str.contains(test, case=False, na=False)
-                & abnormal["Status"].str.contains(cond, case=False, na=False)
-            ]
-            if match.empty:
-                found = False
-                break
-        if found:
-            insights.append(rule["msg"])
-
-    return insights
+        return []
+    engine = get_rule_engine(CONNECTIONS_KNOWLEDGE_BASE)
+    return [msg for _, msg in match_rules(engine, analyzed_df)]
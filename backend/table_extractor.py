@@ -0,0 +1,142 @@
+# backend/table_extractor.py
+import re
+from statistics import median
+
+# A cell that is just a number (optionally with a comparator or thousands separators)
+_NUMBER_CELL = re.compile(r'^[<>]?\s*[-+]?\d[\d,]*(?:\.\d+)?$')
+
+# A number with the unit glued on, e.g. "13.5g/dL"
+_VALUE_WITH_UNIT = re.compile(r'^([<>]?\s*[-+]?\d[\d,]*(?:\.\d+)?)\s*([A-Za-z%/µ][^\s]*)$')
+
+# Reference range cells: "13.0-17.0", "(4500 - 11000)", "<200", "> 40"
+_RANGE_CELL = re.compile(r'\d\s*[-–—]\s*\d|[<>]\s*\d')
+
+# Abnormal-flag columns some labs print between value and unit
+_FLAG_CELLS = {"H", "L", "HH", "LL", "*", "HIGH", "LOW"}
+
+_THOUSANDS = re.compile(r'^\d{1,3}(,\d{3})+(\.\d+)?$')
+
+
+# ----------- WORD BOXES -----------
+def words_from_tesseract(data):
+    """Converts image_to_data output into pdfplumber-style word dicts."""
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = str(text).strip()
+        if not text:
+            continue
+        x0, top = data["left"][i], data["top"][i]
+        words.append({
+            "text": text,
+            "x0": x0,
+            "x1": x0 + data["width"][i],
+            "top": top,
+            "bottom": top + data["height"][i],
+        })
+    return words
+
+
+def group_rows(words):
+    """Groups word boxes into rows by vertical center, then sorts each row left to right."""
+    if not words:
+        return []
+    heights = [w["bottom"] - w["top"] for w in words]
+    tolerance = max(1.0, median(heights) * 0.6)
+
+    rows = []
+    for w in sorted(words, key=lambda w: (w["top"] + w["bottom"]) / 2):
+        center = (w["top"] + w["bottom"]) / 2
+        if rows and abs(center - rows[-1]["center"]) <= tolerance:
+            row = rows[-1]
+            row["words"].append(w)
+            row["center"] += (center - row["center"]) / len(row["words"])
+        else:
+            rows.append({"center": center, "words": [w]})
+    return [sorted(r["words"], key=lambda w: w["x0"]) for r in rows]
+
+
+def split_cell_boxes(row_words):
+    """Merges words separated by less than about one character height into cells: [{"text", "x0", "x1"}]."""
+    if not row_words:
+        return []
+    gap = max(4.0, median(w["bottom"] - w["top"] for w in row_words) * 1.0)
+    cells = [[row_words[0]]]
+    for w in row_words[1:]:
+        if w["x0"] - cells[-1][-1]["x1"] > gap:
+            cells.append([w])
+        else:
+            cells[-1].append(w)
+    return [
+        {"text": " ".join(w["text"] for w in cell), "x0": cell[0]["x0"], "x1": cell[-1]["x1"]}
+        for cell in cells
+    ]
+
+
+def split_cells(row_words):
+    """Merges words separated by less than about one character height into a cell."""
+    return [cell["text"] for cell in split_cell_boxes(row_words)]
+
+
+def rows_from_words(words):
+    """Word boxes -> list of rows, each a list of cell strings."""
+    return [split_cells(row) for row in group_rows(words)]
+
+
+def rows_from_tables(tables):
+    """pdfplumber extract_tables() output -> list of rows with empty cells dropped."""
+    rows = []
+    for table in tables:
+        for row in table:
+            cells = [str(c).replace("\n", " ").strip() for c in row if c is not None and str(c).strip()]
+            if cells:
+                rows.append(cells)
+    return rows
+
+
+# ----------- CELL CLASSIFICATION -----------
+def _clean_number(text):
+    text = text.replace(" ", "")
+    return text.replace(",", "") if _THOUSANDS.match(text.lstrip("<>+-")) else text
+
+
+def row_tokens(cells):
+    """
+    Classifies the cells of one table row into (raw_name, raw_value, raw_unit, raw_range),
+    the same tokens the line tokenizer produces. Returns None for header/note rows.
+    """
+    cells = [c.strip() for c in cells if c and c.strip()]
+    if len(cells) < 2 or not cells[0][:1].isalpha():
+        return None
+
+    # name: leading cells up to the first cell that starts with a number
+    i = 0
+    name_parts = []
+    while i < len(cells) and not _NUMBER_CELL.match(cells[i]) and not _VALUE_WITH_UNIT.match(cells[i]):
+        if _RANGE_CELL.search(cells[i]) and name_parts:
+            return None
+        name_parts.append(cells[i])
+        i += 1
+    if i >= len(cells) or not name_parts:
+        return None
+
+    value, unit = cells[i], ""
+    m = _VALUE_WITH_UNIT.match(value)
+    if m:
+        value, unit = m.group(1), m.group(2)
+    value = _clean_number(value)
+    i += 1
+
+    raw_range = None
+    for cell in cells[i:]:
+        if cell.upper() in _FLAG_CELLS:
+            continue
+        if raw_range is None and _RANGE_CELL.search(cell):
+            raw_range = cell
+        elif not unit and raw_range is None and not _NUMBER_CELL.match(cell):
+            unit = cell
+
+    return " ".join(name_parts), value.lstrip("<> "), unit, raw_range
+
+
+def rows_to_text(rows):
+    return "\n".join(" ".join(cells) for cells in rows)
@@ -0,0 +1,244 @@
+# backend/templates.py
+# Layout templates for known lab formats.
+#
+# A template is keyed by the report's column-header row (its normalized text) and
+# checked against where each header cell sits on the page. A matching report is
+# parsed by assigning word boxes to fixed column bands instead of guessing
+# name/value/unit/range per line. Template file format (JSON list):
+#   {"id": "...", "name": "...", "header": "TEST NAME|RESULT|UNIT|REFERENCE",
+#    "columns": [{"role": "name", "x": 0.08, "start": 0.0}, ...],
+#    "anchor": "optional text that must appear on page 1"}
+# with x (header cell left edge) and start (band left edge) as fractions of page width.
+import hashlib
+import json
+import os
+import re
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+from .table_extractor import group_rows, split_cell_boxes, row_tokens
+
+# Shipped templates, and the file templates learned at runtime are added to
+TEMPLATES_PATH = os.environ.get(
+    "LAB_TEMPLATES_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "lab_templates.json")
+)
+LEARNED_TEMPLATES_PATH = os.environ.get(
+    "LAB_LEARNED_TEMPLATES_FILE", os.path.join(".cache", "templates", "learned.json")
+)
+
+# How far (fraction of page width) a header cell may sit from the template's position
+X_TOLERANCE = 0.03
+
+# The header row is looked for among the first rows of page 1
+HEADER_SEARCH_ROWS = 40
+
+# Header words -> column role; a header row needs a name and a value column plus one more
+ROLE_KEYWORDS = {
+    "name": {"TEST", "TESTS", "INVESTIGATION", "PARAMETER", "EXAMINATION", "DESCRIPTION"},
+    "value": {"RESULT", "RESULTS", "VALUE", "OBSERVED"},
+    "flag": {"FLAG", "FLAGS"},
+    "unit": {"UNIT", "UNITS", "UOM"},
+    "range": {"REFERENCE", "RANGE", "INTERVAL", "NORMAL", "REF", "BIOLOGICAL"},
+}
+
+_NON_ALNUM = re.compile(r'[^A-Z0-9]+')
+
+
+# ----------- FINGERPRINT -----------
+def _normalize(text):
+    return _NON_ALNUM.sub(" ", text.upper()).strip()
+
+
+def _cell_role(text):
+    words = set(_normalize(text).split())
+    for role, keywords in ROLE_KEYWORDS.items():
+        if words & keywords:
+            return role
+    return None
+
+
+def find_header(words, width):
+    """
+    Locates the column-header row among page word boxes.
+    Returns {"key", "columns": [{"role", "x", "x1"}], "bottom"} or None.
+    """
+    for row in group_rows(words)[:HEADER_SEARCH_ROWS]:
+        cells, roles = [], []
+        for cell in split_cell_boxes(row):
+            role = _cell_role(cell["text"])
+            if role and roles and roles[-1] == role:
+                # "Reference" + "Range" printed as two cells
+                prev = cells[-1]
+                cells[-1] = {"text": f"{prev['text']} {cell['text']}", "x0": prev["x0"], "x1": cell["x1"]}
+                continue
+            cells.append(cell)
+            roles.append(role)
+        found = [r for r in roles if r]
+        if len(set(found)) < 3 or len(found) != len(set(found)) or not {"name", "value"} <= set(found):
+            continue
+        columns = [
+            {"role": role, "x": cell["x0"] / width, "x1": cell["x1"] / width, "text": cell["text"]}
+            for cell, role in zip(cells, roles) if role
+        ]
+        return {
+            "key": "|".join(_normalize(c["text"]) for c in columns),
+            "columns": columns,
+            "bottom": max(w["bottom"] for w in row),
+        }
+    return None
+
+
+def layout_fingerprint(words, width):
+    """Stable id for a page layout: header text plus header cell positions (2% grid)."""
+    header = find_header(words, width)
+    if header is None:
+        return None
+    positions = ",".join(f"{round(c['x'] * 50)}" for c in header["columns"])
+    return hashlib.sha1(f"{header['key']}@{positions}".encode("utf-8")).hexdigest()[:16]
+
+
+# ----------- REGISTRY -----------
+_registry = None
+_registry_mtimes = None
+_registry_lock = threading.Lock()
+
+
+def _read_templates(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def registry_mtimes():
+    """Modification times of the shipped and learned template files (None when missing)."""
+    return _mtime(TEMPLATES_PATH), _mtime(LEARNED_TEMPLATES_PATH)
+
+
+def get_registry():
+    """header key -> [compiled templates]. Reloaded when either template file changes."""
+    global _registry, _registry_mtimes
+    mtimes = registry_mtimes()
+    with _registry_lock:
+        if _registry is None or mtimes != _registry_mtimes:
+            registry = {}
+            for template in _read_templates(TEMPLATES_PATH) + _read_templates(LEARNED_TEMPLATES_PATH):
+                registry.setdefault(template["header"], []).append(compile_template(template))
+            _registry, _registry_mtimes = registry, mtimes
+        return _registry
+
+
+def compile_template(template):
+    """Precomputes the sorted column bands used to place each word."""
+    columns = sorted(template["columns"], key=lambda c: c["start"])
+    return {
+        "template": template,
+        "starts": [c["start"] for c in columns],
+        "roles": [c["role"] for c in columns],
+        "xs": [c["x"] for c in template["columns"]],
+        "anchor": _normalize(template["anchor"]) if template.get("anchor") else None,
+    }
+
+
+def match_template(words, width):
+    """The compiled template whose header and column positions match page 1, or None."""
+    header = find_header(words, width)
+    if header is None:
+        return None
+    candidates = get_registry().get(header["key"])
+    if not candidates:
+        return None
+    xs = [c["x"] for c in header["columns"]]
+    page_text = None
+    for compiled in candidates:
+        if len(compiled["xs"]) != len(xs) or any(abs(a - b) > X_TOLERANCE for a, b in zip(compiled["xs"], xs)):
+            continue
+        if compiled["anchor"]:
+            if page_text is None:
+                page_text = _normalize(" ".join(w["text"] for w in words))
+            if compiled["anchor"] not in page_text:
+                continue
+        return compiled
+    return None
+
+
+# ----------- TEMPLATE PARSER -----------
+def template_rows(compiled, words, width):
+    """
+    Places every word below the header into its column band and returns one row
+    per line as cells in column order (flag columns dropped).
+    Pages without the header (continuation pages) use every line.
+    """
+    header = find_header(words, width)
+    top = header["bottom"] if header is not None else float("-inf")
+    starts, roles = compiled["starts"], compiled["roles"]
+    rows = []
+    for row in group_rows([w for w in words if w["top"] >= top]):
+        bands = [[] for _ in roles]
+        for w in row:
+            center = (w["x0"] + w["x1"]) / 2 / width
+            bands[max(0, bisect_right(starts, center) - 1)].append(w["text"])
+        cells = [" ".join(b) for b, role in zip(bands, roles) if role != "flag"]
+        if any(cells):
+            rows.append(cells)
+    return rows
+
+
+def template_tokens(compiled, words, width):
+    """(raw_name, raw_value, raw_unit, raw_range) for every result row on the page."""
+    tokens = []
+    for cells in template_rows(compiled, words, width):
+        t = row_tokens(cells)
+        if t:
+            tokens.append(t)
+    return tokens
+
+
+# ----------- LEARNING -----------
+def template_from_words(words, width, name=None):
+    """Builds a template from page 1's header row, or None if no header row is found."""
+    header = find_header(words, width)
+    if header is None:
+        return None
+    columns = header["columns"]
+    # each band starts halfway between the previous header cell's right edge and this one's left edge
+    starts = [0.0] + [(prev["x1"] + cur["x"]) / 2 for prev, cur in zip(columns, columns[1:])]
+    fingerprint = layout_fingerprint(words, width)
+    return {
+        "id": f"learned-{fingerprint}",
+        "name": name or f"Learned layout {fingerprint}",
+        "header": header["key"],
+        "columns": [
+            {"role": c["role"], "x": round(c["x"], 4), "start": round(s, 4)}
+            for c, s in zip(columns, starts)
+        ],
+        "learned": True,
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+
+def save_learned_template(template):
+    """Adds a template to the learned-templates file (atomic replace). Returns False if already known."""
+    with _registry_lock:
+        learned = _read_templates(LEARNED_TEMPLATES_PATH)
+        if any(t["id"] == template["id"] for t in learned):
+            return False
+        learned.append(template)
+        directory = os.path.dirname(LEARNED_TEMPLATES_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{LEARNED_TEMPLATES_PATH}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(learned, f, indent=2)
+        os.replace(tmp, LEARNED_TEMPLATES_PATH)
+    return True
@@ -0,0 +1,49 @@
+# backend/time_budget.py
+import os
+import time
+
+# Seconds one report may spend in extraction, and one page in OCR (0 disables either)
+REPORT_TIME_BUDGET = float(os.environ.get("LAB_REPORT_TIMEOUT", 300))
+PAGE_TIME_BUDGET = float(os.environ.get("LAB_PAGE_TIMEOUT", 60))
+
+
+class TimeBudget:
+    """
+    Total and per-page time limits for extracting one report, plus the
+    (1-based) page numbers that were skipped because time ran out.
+    Deadlines are wall-clock so they mean the same thing inside OCR workers.
+    """
+
+    def __init__(self, total=None, per_page=None):
+        total = REPORT_TIME_BUDGET if total is None else total
+        per_page = PAGE_TIME_BUDGET if per_page is None else per_page
+        self.deadline = time.time() + total if total else None
+        self.per_page = per_page or None
+        self.skipped = []
+
+    def remaining(self):
+        """Seconds left for the whole report, or None when there is no total limit."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def expired(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def page_limits(self):
+        """(per_page seconds, report deadline): the picklable part handed to OCR workers."""
+        return self.per_page, self.deadline
+
+    def skip(self, page_number):
+        self.skipped.append(page_number)
+
+    @property
+    def partial(self):
+        return bool(self.skipped)
+
+
+def page_deadline(limits):
+    """Absolute deadline for a page that starts now under `page_limits()`, or None."""
+    per_page, report_deadline = limits or (None, None)
+    deadlines = [d for d in (time.time() + per_page if per_page else None, report_deadline) if d]
+    return min(deadlines) if deadlines else None
@@ -0,0 +1,304 @@
+# backend/trends.py
+# Trend engine behind generate_trend_analysis.
+#
+# From a history DataFrame: one grouping pass (rows ordered by test, then date)
+# instead of three boolean masks over the whole frame per test.
+# Per user: a compact trend state (each test's streaming statistics, plus the
+# first value and status of every test on the two latest report dates) that is
+# updated when a report is saved, so the Dashboard summary never re-reads or
+# re-groups the full history. Its size depends on the number of distinct tests,
+# not on the number of reports; plotted series are loaded per test on demand.
+# The statistics (Welford mean/variance, EWMA, rate of change) are updated in
+# O(1) per value and used to flag statistically unusual jumps.
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Bump when the state layout changes; older stored states are rebuilt
+TREND_STATE_VERSION = 3
+
+# Smoothing factor of each test's exponentially weighted moving average
+TREND_EWMA_ALPHA = float(os.environ.get("LAB_TREND_EWMA_ALPHA", 0.3))
+# A latest value this many standard deviations from the test's history is flagged
+TREND_Z_THRESHOLD = float(os.environ.get("LAB_TREND_Z_THRESHOLD", 2.5))
+# Values needed before a test's history is trusted for flagging
+TREND_MIN_HISTORY = int(os.environ.get("LAB_TREND_MIN_HISTORY", 3))
+
+FIRST_REPORT_SUMMARY = "This is your first report. Upload future reports to track trends!"
+
+
+# ----------- STREAMING STATS -----------
+def new_test_stats():
+    """
+    Running statistics of one test's values. The newest value is held apart in
+    "last" so it can be scored against everything before it ("n", "mean",
+    "m2" and "ewma" cover only the earlier values); "rate" is the change per
+    day between the two newest values.
+    """
+    return {"n": 0, "mean": 0.0, "m2": 0.0, "ewma": None, "last": None, "last_date": None, "rate": None}
+
+
+def update_test_stats(stats, date, value):
+    """
+    Folds one (date, value) point into stats in O(1); missing dates or values are
+    skipped. Points must arrive in date order. A test printed twice in one report
+    counts once, with its first value (the one the summary compares), so "n" is
+    the number of report dates the test has a value on.
+    """
+    if value is None or date is None or pd.isna(date):
+        return stats
+    if stats["last_date"] is not None and date == stats["last_date"]:
+        return stats
+    value = float(value)
+    if not math.isfinite(value):
+        return stats
+    last, last_date = stats["last"], stats["last_date"]
+    if last is not None:
+        # the held-back value joins the baseline (Welford update and EWMA)
+        stats["n"] += 1
+        delta = last - stats["mean"]
+        stats["mean"] += delta / stats["n"]
+        stats["m2"] += delta * (last - stats["mean"])
+        ewma = stats["ewma"]
+        stats["ewma"] = last if ewma is None else TREND_EWMA_ALPHA * last + (1 - TREND_EWMA_ALPHA) * ewma
+        days = (date - last_date).total_seconds() / 86400
+        if days > 0:
+            stats["rate"] = (value - last) / days
+    stats["last"], stats["last_date"] = value, date
+    return stats
+
+
+def jump_score(stats):
+    """Standard score of the newest value against the earlier ones, or None without enough history."""
+    if stats is None or stats["last"] is None or stats["n"] < TREND_MIN_HISTORY:
+        return None
+    std = math.sqrt(stats["m2"] / (stats["n"] - 1))
+    if std == 0:
+        return None
+    return (stats["last"] - stats["mean"]) / std
+
+
+def _unusual_change_line(test_name, status, stats, z):
+    direction = "above" if z > 0 else "below"
+    line = (
+        f"\n- **{test_name}** ({status}): {stats['last']:.2f} is {abs(z):.1f} standard deviations "
+        f"{direction} your usual {stats['mean']:.2f} (recent average {stats['ewma']:.2f}"
+    )
+    if stats["rate"] is not None:
+        line += f", {stats['rate']:+.2f} per day since the previous value"
+    return line + ")."
+
+
+# ----------- SUMMARY -----------
+def render_trend_summary(test_names, latest, previous, stats=None, latest_date=None):
+    """
+    Summary text comparing the latest report date with the previous one.
+    latest / previous: {test name: (value, status)} for the first row of each
+    test on that date; test_names gives the order tests are reported in.
+    stats: {test name: streaming stats}; tests whose newest value (from
+    latest_date) is an unusual jump for their history are listed first. Only
+    while no test has enough history is the largest percentage change
+    highlighted instead.
+    """
+    summary = "## 📈 Your Health Trends\n\nHere's how your latest report compares to the previous one:\n"
+
+    critical_change = None  # track biggest deviation
+    max_change = 0
+
+    for test_name in test_names:
+        if test_name not in latest or test_name not in previous:
+            continue
+        curr_val, curr_status = latest[test_name]
+        prev_val, prev_status = previous[test_name]
+
+        # Compute percentage change
+        if prev_val != 0:
+            change_percent = ((curr_val - prev_val) / abs(prev_val)) * 100
+        else:
+            change_percent = 0
+
+        if abs(change_percent) > max_change:
+            max_change = abs(change_percent)
+            critical_change = (test_name, change_percent, curr_status)
+
+        # Build summary
+        if curr_status != 'Normal' and prev_status == 'Normal':
+            summary += f"\n- **(⚠️ New Alert)** {test_name}: Became **{curr_status}** ({curr_val:.2f}) from 'Normal'."
+        elif curr_status == 'Normal' and prev_status != 'Normal':
+            summary += f"\n- **(✅ Improvement)** {test_name}: Returned to **Normal** ({curr_val:.2f}) from '{prev_status}'."
+        elif curr_status != 'Normal' and curr_status != prev_status:
+            summary += f"\n- **(Change)** {test_name}: Shifted from '{prev_status}' to **'{curr_status}'** ({curr_val:.2f})."
+        elif curr_status != 'Normal':
+            direction = "increased" if change_percent > 0 else "decreased"
+            if abs(change_percent) > 1:
+                summary += f"\n- **(Monitoring)** {test_name}: Still **{curr_status}**, {direction} by {abs(change_percent):.1f}%."
+
+    # Statistically unusual jumps in the latest report, largest first
+    stats = stats or {}
+    scored = []
+    for test_name in test_names:
+        test_stats = stats.get(test_name)
+        if test_name not in latest or test_stats is None or test_stats["last_date"] != latest_date:
+            continue
+        z = jump_score(test_stats)
+        if z is not None:
+            scored.append((test_name, z))
+    unusual = sorted(
+        ((name, z) for name, z in scored if abs(z) >= TREND_Z_THRESHOLD),
+        key=lambda item: -abs(item[1]),
+    )
+
+    if unusual:
+        lines = "".join(_unusual_change_line(name, latest[name][1], stats[name], z) for name, z in unusual)
+        summary = f"### ⚠️ Unusual Changes\nCompared with your own history:{lines}\n\n" + summary
+    # Add highlight for the largest deviation
+    elif critical_change and not scored:
+        name, change, status = critical_change
+        direction = "increased" if change > 0 else "decreased"
+        summary = f"### ⚠️ Biggest Change: **{name}** ({status}) — {direction} by {abs(change):.1f}%\n\n" + summary
+
+    if summary.strip().endswith("previous one:"):
+        summary += "\nNo significant changes from your previous report. Keep up the good work!"
+
+    return summary
+
+
+# ----------- FROM A HISTORY FRAME -----------
+def _sorted_by_date(rows, dates):
+    """rows ordered by date the way sort_values(by='upload_date') orders them (quicksort, NaT last)."""
+    group = dates[rows]
+    missing = np.isnat(group)
+    present = rows[~missing]
+    return np.concatenate([present[group[~missing].argsort(kind="quicksort")], rows[missing]])
+
+
+def trends_from_history(history_df):
+    """
+    (summary, trends) for a history frame with upload_date / test_name / value /
+    status columns, same as generate_trend_analysis always returned, from one
+    grouping pass. The frame is not modified.
+    """
+    if history_df.empty or len(history_df['upload_date'].unique()) < 2:
+        return FIRST_REPORT_SUMMARY, {}
+
+    dates = pd.to_datetime(history_df['upload_date'], errors='coerce')
+    all_dates = sorted(dates.dropna().unique())
+    latest_date = all_dates[-1]
+    previous_date = all_dates[-2]
+
+    date_values = dates.to_numpy()
+    date_list = dates.tolist()
+    value_list = history_df['value'].tolist()
+    status_list = history_df['status'].tolist()
+
+    # rows grouped by test, each group in original row order; missing names match nothing
+    codes, _ = pd.factorize(history_df['test_name'])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(codes.max() + 2))
+
+    def first_rows_on(date):
+        first = {}
+        for i in np.flatnonzero(date_values == np.datetime64(date)).tolist():
+            if codes[i] >= 0 and codes[i] not in first:
+                first[codes[i]] = i
+        return first
+
+    latest_rows, previous_rows = first_rows_on(latest_date), first_rows_on(previous_date)
+
+    # a missing name never compares equal, so it keeps an empty series and no summary line
+    all_names = history_df['test_name'].unique()
+    trends = {test_name: {'dates': [], 'values': []} for test_name in all_names}
+    latest, previous, stats = {}, {}, {}
+    # factorize numbers names in order of first appearance, the order unique() lists them in
+    named = [test_name for test_name in all_names if not pd.isna(test_name)]
+    for code, test_name in enumerate(named):
+        rows = _sorted_by_date(order[bounds[code]:bounds[code + 1]], date_values)
+        trends[test_name]['dates'] = [date_list[i] for i in rows]
+        trends[test_name]['values'] = [value_list[i] for i in rows]
+        if code in latest_rows:
+            latest[test_name] = (value_list[latest_rows[code]], status_list[latest_rows[code]])
+        if code in previous_rows:
+            previous[test_name] = (value_list[previous_rows[code]], status_list[previous_rows[code]])
+        # stats fold the points in saving order (date, then row), as the stored state does
+        group = order[bounds[code]:bounds[code + 1]]
+        test_stats = stats[test_name] = new_test_stats()
+        for i in group[np.argsort(date_values[group], kind="stable")].tolist():
+            update_test_stats(test_stats, date_list[i], value_list[i])
+
+    return render_trend_summary(named, latest, previous, stats, latest_date), trends
+
+
+# ----------- PER-USER STATE -----------
+def _millis(date):
+    """MongoDB keeps datetimes to the millisecond; truncate so fresh and stored states agree."""
+    return date.replace(microsecond=date.microsecond - date.microsecond % 1000)
+
+
+def new_trend_state(username):
+    return {
+        "username": username,
+        "version": TREND_STATE_VERSION,
+        "report_count": 0,
+        "date_count": 0,
+        "tests": [],     # [{"name", "stats"}] in order of first appearance
+        "latest": None,  # {"date", "rows": [{"name", "value", "status"}]} first row per test
+        "previous": None,
+    }
+
+
+def add_report_to_state(state, report):
+    """
+    Folds one saved report ({"upload_date", "tests": [...]}) into the state, in
+    place. Reports must arrive in upload order; returns False (state untouched)
+    for one older than the latest, which needs a rebuild instead.
+    """
+    date = _millis(report["upload_date"])
+    latest = state["latest"]
+    if latest is not None and date < latest["date"]:
+        return False
+
+    if latest is None or date > latest["date"]:
+        state["previous"] = latest
+        state["latest"] = latest = {"date": date, "rows": []}
+        state["date_count"] += 1
+    series = {entry["name"]: entry for entry in state["tests"]}
+    seen = {row["name"] for row in latest["rows"]}
+    for test in report.get("tests", []):
+        name = test.get("test_name")
+        if name is None:
+            continue
+        entry = series.get(name)
+        if entry is None:
+            entry = series[name] = {"name": name, "stats": new_test_stats()}
+            state["tests"].append(entry)
+        update_test_stats(entry["stats"], date, test.get("value"))
+        if name not in seen:
+            seen.add(name)
+            latest["rows"].append({"name": name, "value": test.get("value"), "status": test.get("status")})
+    state["report_count"] += 1
+    return True
+
+
+def build_trend_state(username, reports):
+    """State for a user's reports (any order); one pass after sorting by upload date."""
+    state = new_trend_state(username)
+    for report in sorted(reports, key=lambda r: r["upload_date"]):
+        add_report_to_state(state, report)
+    return state
+
+
+def summary_from_state(state):
+    """
+    (summary, test names) from a trend state: the summary generate_trend_analysis
+    gives for the same history, and the tests that have a trend to plot (empty
+    before the second report date), in order of first appearance.
+    """
+    if state is None or state["date_count"] < 2:
+        return FIRST_REPORT_SUMMARY, []
+    names = [entry["name"] for entry in state["tests"]]
+    latest = {row["name"]: (row["value"], row["status"]) for row in state["latest"]["rows"]}
+    previous = {row["name"]: (row["value"], row["status"]) for row in state["previous"]["rows"]}
+    stats = {entry["name"]: entry["stats"] for entry in state["tests"]}
+    return render_trend_summary(names, latest, previous, stats, state["latest"]["date"]), names
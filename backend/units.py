@@ -0,0 +1,154 @@
+# backend/units.py
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .analyzer import _per_distinct, _column
+
+# Printed unit -> unit id, and per-test conversions into the unit STANDARD_RANGES uses
+UNIT_CONVERSIONS_PATH = os.environ.get(
+    "LAB_UNIT_CONVERSIONS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "unit_conversions.json")
+)
+
+# Converted values and ranges are rounded to this many decimals
+CANONICAL_DECIMALS = 3
+
+_UNIT_SUBS = [
+    (re.compile(r'\s+'), ""),
+    (re.compile(r'[µμ]|mc(?=g|mol|l)'), "u"),
+    (re.compile(r'(cumm|cmm|mm\^?3|mm³)'), "ul"),
+    (re.compile(r'³'), "^3"),
+    (re.compile(r'10\*\*?'), "10^"),
+    (re.compile(r'^[x×]'), ""),
+]
+
+
+# ----------- TABLE -----------
+def normalize_unit(unit):
+    """Printed unit -> lookup form ("x10³/µL" -> "10^3/ul")."""
+    s = str(unit).lower()
+    for pattern, repl in _UNIT_SUBS:
+        s = pattern.sub(repl, s)
+    return s
+
+
+def load_unit_table(path=None):
+    """{"units": {normalized unit: id}, "tests": {TEST NAME: (canonical id, {unit id: (scale, offset)})}}."""
+    with open(path or UNIT_CONVERSIONS_PATH, encoding="utf-8") as f:
+        raw = json.load(f)
+    tests = {}
+    for name, entry in raw["tests"].items():
+        factors = {}
+        for unit_id, factor in entry.get("from", {}).items():
+            scale, offset = factor if isinstance(factor, list) else (factor, 0.0)
+            factors[unit_id] = (float(scale), float(offset))
+        tests[name.strip().upper()] = (entry["canonical"], factors)
+    return {"units": dict(raw["units"]), "tests": tests}
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_unit_table():
+    """The conversion table, loaded once per process from LAB_UNIT_CONVERSIONS."""
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = load_unit_table()
+    return _table
+
+
+@lru_cache(maxsize=4096)
+def unit_id(unit):
+    """Unit id for a printed unit, or None. Falls back to the first word ("mg/dL (fasting)")."""
+    units = get_unit_table()["units"]
+    if not unit:
+        return None
+    hit = units.get(normalize_unit(unit))
+    if hit is None and str(unit).split():
+        hit = units.get(normalize_unit(str(unit).split()[0]))
+    return hit
+
+
+def conversion(test_name, unit):
+    """(scale, offset, canonical unit) turning this test's value into the canonical unit, or None."""
+    entry = get_unit_table()["tests"].get(str(test_name).strip().upper())
+    if entry is None or not isinstance(unit, str):
+        return None
+    canonical, factors = entry
+    factor = factors.get(unit_id(unit))
+    if factor is None:
+        return None
+    return factor[0], factor[1], canonical
+
+
+# ----------- PIPELINE STAGE -----------
+def _convert_range(parsed, scale, offset):
+    if not parsed:
+        return parsed
+    low, high, op = parsed
+    return (
+        None if low is None else round(low * scale + offset, CANONICAL_DECIMALS),
+        None if high is None else round(high * scale + offset, CANONICAL_DECIMALS),
+        op,
+    )
+
+
+def canonicalize_units(df):
+    """
+    Converts "Value", "Unit" and "Reference Range Parsed" to each test's canonical
+    unit (data/unit_conversions.json), in place, and returns df. The printed
+    value and unit are kept in "Value Original" and "Unit Original". One table
+    lookup per distinct (test, unit) pair; values are converted column-wise.
+    """
+    if df is None or df.empty or "Value" not in df.columns:
+        return df
+    df["Value Original"] = df["Value"]
+    df["Unit Original"] = _column(df, "Unit", "")
+    if "Unit" not in df.columns:
+        return df
+
+    codes, found = _per_distinct([_column(df, "Test Name", ""), _column(df, "Unit", "")], conversion)
+    convert = np.array([c is not None for c in found], dtype=bool)[codes]
+    if not convert.any():
+        return df
+    scale = np.array([c[0] if c else 1.0 for c in found])[codes]
+    offset = np.array([c[1] if c else 0.0 for c in found])[codes]
+    canonical = np.array([c[2] if c else None for c in found] + [None], dtype=object)[:-1][codes]
+
+    values = pd.to_numeric(df["Value"], errors="coerce").to_numpy(dtype=float)
+    convert &= ~np.isnan(values)
+    converted = np.round(values * scale + offset, CANONICAL_DECIMALS)
+
+    # keep the column's dtype: object columns keep None / text entries as they were
+    if pd.api.types.is_numeric_dtype(df["Value"]):
+        df["Value"] = np.where(convert, converted, df["Value"].to_numpy(dtype=float))
+    else:
+        value_col = df["Value"].to_numpy(dtype=object, copy=True)
+        value_col[convert] = converted[convert].tolist()
+        df["Value"] = value_col
+    unit_col = _column(df, "Unit", "").copy()
+    unit_col[convert] = canonical[convert]
+    df["Unit"] = unit_col.tolist()
+
+    if "Reference Range Parsed" in df.columns:
+        # the same printed range repeats for every row of a test: convert each (range, factor) pair once
+        ranges = _column(df, "Reference Range Parsed", None)
+        rows = np.flatnonzero(convert)
+        range_codes, new_ranges = _per_distinct(
+            [ranges[rows], codes[rows]],
+            lambda parsed, code: _convert_range(parsed, found[code][0], found[code][1]),
+        )
+        ranges = ranges.tolist()
+        for i, code in zip(rows.tolist(), range_codes.tolist()):
+            ranges[i] = new_ranges[code]
+        df["Reference Range Parsed"] = ranges
+    return df
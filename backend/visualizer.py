@@ -1,35 +1,128 @@
-import matplotlib.pyplot as plt
+# backend/visualizer.py
+# Charts are built on matplotlib's object-oriented API (Figure + Agg canvas), never
+# through pyplot: no global figure registry to leak into, and safe to call from
+# worker threads. Renderers return PNG bytes.
+#
+# Rendered PNGs are cached by a hash of exactly what is plotted plus
+# CHART_STYLE_VERSION, so identical charts (Upload page reruns, the PDF, every
+# History expander) are drawn once; memory LRU in front of an optional disk tier.
+import hashlib
+import io
+import json
+import os
 
-def create_visual_summary(analyzed_df):
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from .cache import LRUCache, DiskCache, TieredCache
+
+# Bump whenever chart styling changes so cached PNGs are not reused
+CHART_STYLE_VERSION = 1
+
+# Chart cache: in-memory LRU + size-bounded disk tier (set LAB_CHART_CACHE_DIR="" to disable disk)
+CHART_CACHE_DIR = os.environ.get("LAB_CHART_CACHE_DIR", os.path.join(".cache", "charts"))
+chart_cache = TieredCache(
+    LRUCache(int(os.environ.get("LAB_CHART_CACHE_MEMORY_ITEMS", 256))),
+    DiskCache(CHART_CACHE_DIR, int(os.environ.get("LAB_CHART_CACHE_MAX_MB", 128)) * 1024 * 1024) if CHART_CACHE_DIR else None,
+)
+
+# Full color map for all cases
+STATUS_COLORS = {
+    "Normal": "#2ecc71",            # green
+    "Slightly Low": "#f1c40f",      # yellow
+    "Low": "#f39c12",               # orange
+    "Severely Low": "#e67e22",      # dark orange
+    "Slightly High": "#e67e22",     # dark orange
+    "Moderately High": "#d35400",   # deeper orange
+    "High": "#e74c3c",              # red
+    "Severely High": "#c0392b",     # dark red
+}
+
+LEGEND_ITEMS = [
+    ("#2ecc71", 'Normal (Green)'),
+    ("#f1c40f", 'Slightly Low (Yellow)'),
+    ("#f39c12", 'Low (Orange)'),
+    ("#e67e22", 'Slightly High (Dark Orange)'),
+    ("#d35400", 'Moderately High'),
+    ("#e74c3c", 'High (Red)'),
+    ("#c0392b", 'Severely High (Dark Red)'),
+    ("gray", 'No Range / Unknown'),
+]
+
+
+def new_figure(figsize):
+    """A Figure attached to its own Agg canvas (no pyplot)."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_png(fig, dpi=150, bbox_inches="tight"):
+    """PNG bytes of a figure, rendered in memory."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches=bbox_inches)
+    return buf.getvalue()
+
+
+# ----------- RENDER CACHE -----------
+def chart_key(kind, *plotted):
     """
-    Creates a clean, readable horizontal bar chart with color-coded results.
-    Supports Slightly/Moderately/Severely variations.
+    Cache key: hash of the chart kind, everything it plots and the style version.
+    Parts are bytes (e.g. a numpy buffer, for long series) or JSON-serializable,
+    and must be the plotted data itself, never metadata standing in for it: the
+    disk tier outlives the process, so a key that misses a change serves a stale PNG.
     """
+    h = hashlib.sha256(json.dumps([CHART_STYLE_VERSION, kind]).encode("utf-8"))
+    for part in plotted:
+        if not isinstance(part, bytes):
+            part = json.dumps(part, default=str).encode("utf-8")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def cached_png(key, render):
+    """PNG bytes for key, calling render() (which returns PNG bytes) only on a miss."""
+    png = chart_cache.get(key)
+    if png is None:
+        png = render()
+        if png is not None:
+            chart_cache.set(key, png)
+    return png
+
+
+# ----------- RESULTS CHART -----------
+def _visual_summary_data(analyzed_df):
+    """(test names, values, statuses) the results chart plots, or None when there is nothing to plot."""
     if analyzed_df.empty or "Test Name" not in analyzed_df.columns:
         return None
+    return (
+        analyzed_df["Test Name"].tolist(),
+        analyzed_df["Value"].astype(float).tolist(),
+        analyzed_df["Status"].tolist(),
+    )
 
-    # Extract data
-    test_names = analyzed_df["Test Name"].tolist()
-    values = analyzed_df["Value"].astype(float).tolist()
-    statuses = analyzed_df["Status"].tolist()
-
-    # Full color map for all cases
-    color_map = {
-        "Normal": "#2ecc71",            # green
-        "Slightly Low": "#f1c40f",      # yellow
-        "Low": "#f39c12",               # orange
-        "Severely Low": "#e67e22",      # dark orange
-        "Slightly High": "#e67e22",     # dark orange
-        "Moderately High": "#d35400",   # deeper orange
-        "High": "#e74c3c",              # red
-        "Severely High": "#c0392b",     # dark red
-    }
 
+def build_visual_summary(analyzed_df):
+    """
+    Creates a clean, readable horizontal bar chart with color-coded results.
+    Supports Slightly/Moderately/Severely variations. Returns the Figure, or None.
+    """
+    data = _visual_summary_data(analyzed_df)
+    if data is None:
+        return None
+    return _draw_visual_summary(*data)
+
+
+def _draw_visual_summary(test_names, values, statuses):
+    """The results chart Figure for the given data."""
     # Assign colors
-    colors = [color_map.get(status, "gray") for status in statuses]
+    colors = [STATUS_COLORS.get(status, "gray") for status in statuses]
 
     # Plot
-    fig, ax = plt.subplots(figsize=(9, len(test_names) * 0.45))
+    fig = new_figure((9, len(test_names) * 0.45))
+    ax = fig.subplots()
     y_positions = range(len(test_names))
 
     ax.barh(y_positions, values, color=colors, edgecolor='black', linewidth=0.4)
@@ -48,18 +141,23 @@ def create_visual_summary(analyzed_df):
 
     # ------------------ COLOR LEGEND ------------------
     legend_items = [
-        plt.Line2D([0], [0], marker='s', color="#2ecc71", markersize=10, linestyle='None', label='Normal (Green)'),
-        plt.Line2D([0], [0], marker='s', color="#f1c40f", markersize=10, linestyle='None', label='Slightly Low (Yellow)'),
-        plt.Line2D([0], [0], marker='s', color="#f39c12", markersize=10, linestyle='None', label='Low (Orange)'),
-        plt.Line2D([0], [0], marker='s', color="#e67e22", markersize=10, linestyle='None', label='Slightly High (Dark Orange)'),
-        plt.Line2D([0], [0], marker='s', color="#d35400", markersize=10, linestyle='None', label='Moderately High'),
-        plt.Line2D([0], [0], marker='s', color="#e74c3c", markersize=10, linestyle='None', label='High (Red)'),
-        plt.Line2D([0], [0], marker='s', color="#c0392b", markersize=10, linestyle='None', label='Severely High (Dark Red)'),
-        plt.Line2D([0], [0], marker='s', color="gray", markersize=10, linestyle='None', label='No Range / Unknown')
+        Line2D([0], [0], marker='s', color=color, markersize=10, linestyle='None', label=label)
+        for color, label in LEGEND_ITEMS
     ]
 
     ax.legend(handles=legend_items, title="Color Meaning", loc="lower right", fontsize=8, title_fontsize=9)
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     return fig
+
+
+def create_visual_summary(analyzed_df, dpi=150):
+    """PNG bytes of the color-coded results chart (see build_visual_summary), or None. Cached by content."""
+    data = _visual_summary_data(analyzed_df)
+    if data is None:
+        return None
+    return cached_png(
+        chart_key("visual_summary", dpi, *data),
+        lambda: figure_png(_draw_visual_summary(*data), dpi=dpi),
+    )
@@ -0,0 +1,235 @@
+# batch_ingest.py
+# Back-loads a directory of archived reports:
+#   process_report -> canonicalize_units -> analyze_results  (process pool)
+#   -> generate_summaries -> save_full_reports_to_db           (once per bulk insert)
+# Every finished file is appended to a JSONL checkpoint so a crashed run resumes where it stopped.
+# Reports are upserted on (username, file hash), so files saved just before a crash are not duplicated.
+# Files whose pages ran out of time are saved and checkpointed as "partial"; --retry-failed
+# re-extracts them (and failed files) and replaces the partial report.
+# Reports are dated by the date printed on them, or the file's modification time.
+#
+# Usage:
+#   python batch_ingest.py ./archive --username clinic@example.com --workers 8
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+STAGES = ("extract", "units", "analyze", "summarize", "save")
+
+
+# ---------------------------------------------------------
+# FILE DISCOVERY + CHECKPOINT
+# ---------------------------------------------------------
+def find_reports(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.abspath(os.path.join(dirpath, name))
+
+
+def load_checkpoint(path, retry_failed=False):
+    """Returns the set of files already handled by a previous run (without failed/partial ones if retry_failed)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # a crash can leave a truncated last line
+                continue
+            if retry_failed and entry.get("status") in ("failed", "partial"):
+                continue
+            done.add(entry["file"])
+    return done
+
+
+def append_checkpoint(path, entries):
+    with open(path, "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# ---------------------------------------------------------
+# WORKER
+# ---------------------------------------------------------
+def _init_worker():
+    # one OCR process per batch worker; the batch pool already uses every core
+    from backend import ocr_engine
+    ocr_engine.OCR_WORKERS = 1
+
+
+def process_file(path):
+    from backend.extractor import parse_report_date, process_report
+    from backend.analyzer import analyze_results
+    from backend.cache import sha256_file
+    from backend.units import canonicalize_units
+
+    timings = {}
+    try:
+        start = time.perf_counter()
+        df, diagnosis, raw_text = process_report(path)
+        timings["extract"] = time.perf_counter() - start
+        skipped_pages = df.attrs.get("skipped_pages", [])
+
+        if df.empty:
+            status = "failed" if raw_text and raw_text.startswith("Error") else "empty"
+            return {"file": path, "status": status, "message": raw_text, "timings": timings,
+                    "skipped_pages": skipped_pages}
+
+        start = time.perf_counter()
+        df = canonicalize_units(df)
+        timings["units"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        analyzed = analyze_results(df)
+        timings["analyze"] = time.perf_counter() - start
+
+        file_hash = sha256_file(path)
+        report_date = parse_report_date(raw_text) or datetime.utcfromtimestamp(os.path.getmtime(path))
+    except Exception as e:
+        return {"file": path, "status": "failed", "message": str(e), "timings": timings}
+
+    return {
+        "file": path,
+        "status": "partial" if skipped_pages else "ok",
+        "timings": timings,
+        "skipped_pages": skipped_pages,
+        "analyzed": analyzed,
+        "file_hash": file_hash,
+        "report_date": report_date,
+        "diagnosis": diagnosis,
+        "raw_text": raw_text,
+    }
+
+
+# ---------------------------------------------------------
+# RUNNER
+# ---------------------------------------------------------
+def run_batch(root, username, workers=None, checkpoint=None, bulk_size=100, retry_failed=False):
+    from backend.database import build_report_doc, save_full_reports_to_db
+    from backend.summarizer import generate_summaries
+
+    checkpoint = checkpoint or os.path.join(root, ".ingest_checkpoint.jsonl")
+    done = load_checkpoint(checkpoint, retry_failed=retry_failed)
+    files = [p for p in find_reports(root) if p not in done]
+    print(f"📂 {len(files)} files to ingest ({len(done)} already in checkpoint)")
+
+    workers = workers or os.cpu_count() or 1
+    stage_totals = defaultdict(float)
+    counts = defaultdict(int)
+    results, entries = [], []
+    already_saved = 0
+
+    def flush():
+        nonlocal already_saved
+        if entries:
+            # summarized in this process, once per batch, so the summary fragment caches are shared by every file
+            start = time.perf_counter()
+            summaries = generate_summaries((r["analyzed"], r["diagnosis"]) for r in results)
+            stage_totals["summarize"] += time.perf_counter() - start
+            docs = [
+                build_report_doc(
+                    username=username,
+                    analyzed_df=r["analyzed"],
+                    summary=summary,
+                    diagnosis=r["diagnosis"],
+                    raw_text=r["raw_text"],
+                    chart_path=None,
+                    filename=os.path.basename(r["file"]),
+                    file_hash=r["file_hash"],
+                    upload_date=r["report_date"],
+                )
+                for r, summary in zip(results, summaries)
+            ]
+
+            start = time.perf_counter()
+            added = save_full_reports_to_db(docs)
+            stage_totals["save"] += time.perf_counter() - start
+            already_saved += len(docs) - added
+            # checkpoint only after the insert succeeded
+            append_checkpoint(checkpoint, entries)
+            results.clear()
+            entries.clear()
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        # keep a bounded number of files in flight so tens of thousands of paths never become futures at once
+        for path in files:
+            pending.add(pool.submit(process_file, path))
+            if len(pending) < workers * 4:
+                continue
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                _collect(fut.result(), results, entries, stage_totals, counts)
+            if len(entries) >= bulk_size:
+                flush()
+
+        for fut in wait(pending).done:
+            _collect(fut.result(), results, entries, stage_totals, counts)
+    flush()
+
+    elapsed = time.perf_counter() - started
+    processed = sum(counts.values())
+    print("\n🎉 Batch complete!")
+    print(f"   files: {processed} (ok {counts['ok']}, partial {counts['partial']}, "
+          f"empty {counts['empty']}, failed {counts['failed']})")
+    if counts["partial"]:
+        print("   partial files were saved without the pages that ran out of time; rerun with --retry-failed")
+    if already_saved:
+        print(f"   {already_saved} files were already in the database and were replaced, not re-inserted")
+    print(f"   elapsed: {elapsed:.1f}s | throughput: {processed / elapsed if elapsed else 0:.2f} files/sec")
+    print("   per-stage time (summed across workers):")
+    for stage in STAGES:
+        n = counts["ok"] + counts["partial"] if stage != "extract" else processed
+        avg = stage_totals[stage] / n if n else 0
+        print(f"     {stage:<10} total {stage_totals[stage]:8.2f}s | avg {avg * 1000:8.1f} ms/file")
+    return counts
+
+
+def _collect(result, results, entries, stage_totals, counts):
+    for stage, seconds in result["timings"].items():
+        stage_totals[stage] += seconds
+    counts[result["status"]] += 1
+
+    entry = {"file": result["file"], "status": result["status"]}
+    if result.get("skipped_pages"):
+        # saved as a partial result; the listed pages ran out of time (LAB_PAGE_TIMEOUT / LAB_REPORT_TIMEOUT)
+        entry["skipped_pages"] = result["skipped_pages"]
+        print(f"  ⏱️ partial: {result['file']} (skipped pages {result['skipped_pages']})")
+    if result["status"] in ("ok", "partial"):
+        results.append(result)
+    else:
+        entry["message"] = result.get("message")
+        print(f"  ⚠️ {result['status']}: {result['file']} ({entry['message']})")
+    entries.append(entry)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-ingest archived lab reports into MongoDB.")
+    parser.add_argument("directory", help="folder to scan recursively for PDFs and images")
+    parser.add_argument("--username", required=True, help="account the reports are saved under")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default: <directory>/.ingest_checkpoint.jsonl)")
+    parser.add_argument("--bulk-size", type=int, default=100, help="reports per MongoDB insert")
+    parser.add_argument("--retry-failed", action="store_true", help="re-run files that failed or were only partly read last time")
+    args = parser.parse_args()
+
+    run_batch(
+        args.directory,
+        args.username,
+        workers=args.workers,
+        checkpoint=args.checkpoint,
+        bulk_size=args.bulk_size,
+        retry_failed=args.retry_failed,
+    )
@@ -0,0 +1,147 @@
+# benchmark_analyzer.py
+# Compares the old iterrows analyze_results with the columnar backend.analyzer version
+# on a synthetic bulk history, and checks both produce identical labels.
+#
+# Usage:
+#   python benchmark_analyzer.py [rows]
+import random
+import sys
+import time
+
+import pandas as pd
+
+from backend.analyzer import STANDARD_RANGES, classify_result, analyze_results
+
+random.seed(11)
+
+NAMES = [
+    "HEMOGLOBIN", "WBC COUNT", "PLATELET COUNT", "RBC COUNT", "HEMATOCRIT", "MCV", "MCH", "MCHC",
+    "TOTAL CHOLESTEROL", "LDL CHOLESTEROL", "HDL CHOLESTEROL", "TRIGLYCERIDES", "GLUCOSE", "HBA1C",
+    "CREATININE", "SODIUM", "POTASSIUM", "ALT", "AST", "BILIRUBIN TOTAL", "TSH", "VITAMIN D",
+    "VITAMIN B12", "SERUM IRON", "FERRITIN", "Hemoglobin", " tsh ",
+]
+RANGES = [
+    None, None, None,
+    ((13.0, 17.0, None), "(13.0-17.0)"),
+    ((4500, 11000, None), "(4500-11000)"),
+    ((None, 200.0, "<"), "(<200)"),
+    ((40.0, None, ">"), "(>40)"),
+    ((None, None, None), "(see note)"),
+    ((None, None, None), ""),
+    ((5.0, None, "<"), "(odd)"),
+]
+
+
+def make_history(n_rows):
+    rows = []
+    for _ in range(n_rows):
+        name = random.choice(NAMES)
+        rng = random.choice(RANGES)
+        value = random.choice([random.uniform(0, 300), random.uniform(0, 20), random.uniform(1000, 20000)])
+        rows.append({
+            "Test Name": name,
+            "Value": value,
+            "Unit": "",
+            "Reference Range Raw": rng[1] if rng else "",
+            "Reference Range Parsed": rng[0] if rng else None,
+        })
+    return pd.DataFrame(rows)
+
+
+def old_analyze_results(df):
+    """The row-by-row implementation analyze_results replaced (kept verbatim for comparison)."""
+    if df is None or df.empty:
+        if df is None:
+            df = pd.DataFrame()
+        df["Status"] = []
+        df["Reference Range Used"] = []
+        return df
+
+    statuses = []
+    used_ranges = []
+
+    for _, row in df.iterrows():
+        test_name = str(row.get("Test Name", "")).strip().upper()
+        raw_val = row.get("Value", None)
+        parsed_range = row.get("Reference Range Parsed", None)
+        raw_range_text = row.get("Reference Range Raw", "")
+
+        try:
+            value = float(raw_val)
+        except Exception:
+            statuses.append("Invalid Value")
+            used_ranges.append("N/A")
+            continue
+
+        status = "Normal"
+        used_range_label = "N/A"
+
+        # Prefer report-parsed range
+        if parsed_range:
+            low, high, comp = parsed_range
+            status = classify_result(value, low, high)
+            if low is not None and high is not None:
+                used_range_label = f"{low} - {high} (Report)"
+            elif comp == '<' or (comp is None and low is None and high is not None):
+                used_range_label = f"< {high} (Report)"
+            elif comp == '>' or (comp is None and low is not None and high is None):
+                used_range_label = f"> {low} (Report)"
+            else:
+                used_range_label = raw_range_text or "Report Range"
+        else:
+            # fallback to STANDARD_RANGES
+            matched = None
+            for key in STANDARD_RANGES:
+                if key in test_name:
+                    matched = key
+                    break
+
+            if matched:
+                std = STANDARD_RANGES[matched]
+                if isinstance(std[0], str):
+                    op, limit = std
+                    used_range_label = f"{op} {limit} (Standard)"
+                    if op == '<':
+                        status = "Slightly High" if value >= limit else "Normal"
+                    else:
+                        status = "Slightly Low" if value <= limit else "Normal"
+                else:
+                    low, high = std
+                    used_range_label = f"{low} - {high} (Standard)"
+                    status = classify_result(value, low, high)
+            else:
+                status = "No Range Found"
+                used_range_label = "N/A"
+
+        statuses.append(status)
+        used_ranges.append(used_range_label)
+
+    df["Status"] = statuses
+    df["Reference Range Used"] = used_ranges
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    out = fn(df.copy())
+    return out, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = make_history(n)
+
+    old, t_old = timed(old_analyze_results, df)
+    new, t_new = timed(analyze_results, df)
+
+    same = (
+        old["Status"].tolist() == new["Status"].tolist()
+        and old["Reference Range Used"].tolist() == new["Reference Range Used"].tolist()
+    )
+    print(f"{n:,} rows | identical labels: {same}")
+    print(f"old iterrows : {t_old:8.2f} s")
+    print(f"columnar     : {t_new:8.2f} s  ({t_old / t_new:5.1f}x)")
+
+    big = pd.concat([df] * 10, ignore_index=True)
+    _, t_big = timed(analyze_results, big)
+    print(f"columnar on {len(big):,} rows: {t_big:.2f} s")
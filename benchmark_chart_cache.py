@@ -0,0 +1,62 @@
+# benchmark_chart_cache.py
+# Simulates repeated History page loads (one results chart per stored report) and
+# counts how many charts are actually drawn with Matplotlib: the first load fills
+# the chart cache, later loads (and loads after a restart, from the disk tier)
+# should draw nothing.
+#
+# Usage:
+#   python benchmark_chart_cache.py [reports] [loads]
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("LAB_CHART_CACHE_DIR", os.path.join(tempfile.mkdtemp(), "charts"))
+
+import matplotlib
+matplotlib.use("Agg")
+
+from backend import visualizer
+from benchmark_chart_memory import make_report
+
+draws = 0
+_draw = visualizer._draw_visual_summary
+
+
+def counting_draw(*args):
+    global draws
+    draws += 1
+    return _draw(*args)
+
+
+visualizer._draw_visual_summary = counting_draw
+
+
+def history_page_load(stored_reports):
+    """What pages/3_History.py does for reports without a saved chart."""
+    for tests in stored_reports:
+        visualizer.create_visual_summary(
+            tests.rename(columns={"test_name": "Test Name", "value": "Value", "status": "Status"})
+        )
+
+
+if __name__ == "__main__":
+    n_reports = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    n_loads = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    stored = [
+        make_report().rename(columns={"Test Name": "test_name", "Value": "value", "Status": "status"})
+        for _ in range(n_reports)
+    ]
+
+    def timed_load(label):
+        global draws
+        draws = 0
+        start = time.perf_counter()
+        history_page_load(stored)
+        print(f"{label:<22}: {(time.perf_counter() - start) * 1000:9.1f} ms  charts drawn: {draws}")
+
+    timed_load("cold load")
+    for i in range(n_loads):
+        timed_load(f"warm load {i + 1}")
+    visualizer.chart_cache.memory.clear()
+    timed_load("after restart (disk)")
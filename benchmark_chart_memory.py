@@ -0,0 +1,95 @@
+# benchmark_chart_memory.py
+# Renders many results charts and tracks the process RSS, to check chart
+# rendering does not leak. With --pyplot, the old pyplot-based chart (figure
+# never closed, as the History page used it) is rendered instead for comparison.
+#
+# Usage:
+#   python benchmark_chart_memory.py [charts] [--pyplot]
+import gc
+import io
+import os
+import random
+import resource
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+
+from backend.visualizer import STATUS_COLORS, build_visual_summary, figure_png
+
+random.seed(24)
+
+NAMES = [
+    "HEMOGLOBIN", "WBC", "PLATELET", "GLUCOSE", "CHOLESTEROL", "TSH", "RBC COUNT", "HEMATOCRIT",
+    "MCV", "LDL CHOLESTEROL", "HDL CHOLESTEROL", "TRIGLYCERIDES", "CREATININE", "VITAMIN D",
+]
+STATUSES = list(STATUS_COLORS) + ["No Range Found"]
+
+
+def rss_mb():
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_report():
+    names = random.sample(NAMES, random.randint(5, len(NAMES)))
+    return pd.DataFrame({
+        "Test Name": names,
+        "Value": [round(random.uniform(1, 300), 1) for _ in names],
+        "Status": [random.choice(STATUSES) for _ in names],
+    })
+
+
+def render_chart(analyzed_df):
+    """create_visual_summary without its render cache, so every chart is really drawn."""
+    return figure_png(build_visual_summary(analyzed_df))
+
+
+def old_pyplot_chart(analyzed_df):
+    """The old pyplot path, reduced to what matters here: plt.subplots, rendered, never closed."""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(9, len(analyzed_df) * 0.45))
+    ax.barh(range(len(analyzed_df)), analyzed_df["Value"].tolist())
+    ax.set_yticks(range(len(analyzed_df)))
+    ax.set_yticklabels(analyzed_df["Test Name"].tolist(), fontsize=9)
+    plt.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if args else 10000
+    render = old_pyplot_chart if "--pyplot" in sys.argv else render_chart
+    reports = [make_report() for _ in range(50)]
+    checkpoint = max(n // 10, 1)
+
+    # the first charts load fonts and caches; measure growth from after that
+    for report in reports[:5]:
+        render(report)
+    gc.collect()
+    baseline = rss_mb()
+    samples = []
+
+    start = time.perf_counter()
+    for i in range(1, n + 1):
+        png = render(reports[i % len(reports)])
+        assert png
+        if i % checkpoint == 0:
+            gc.collect()
+            samples.append(rss_mb())
+            print(f"{i:>7,} charts | RSS {samples[-1]:8.1f} MB")
+    elapsed = time.perf_counter() - start
+
+    print(f"{render.__name__}: {n:,} charts in {elapsed:.1f} s ({elapsed / n * 1000:.1f} ms each)")
+    print(f"RSS after warm-up {baseline:.1f} MB, final {samples[-1]:.1f} MB, "
+          f"growth {samples[-1] - baseline:+.1f} MB (max {max(samples) - baseline:+.1f} MB)")
+    # matplotlib's text layout and font caches fill during the first checkpoint; after that RSS should stay flat
+    print(f"growth after the first {checkpoint:,} charts: {samples[-1] - samples[0]:+.1f} MB")
@@ -0,0 +1,58 @@
+# benchmark_name_resolver.py
+# Compares the old per-line thefuzz scan with backend.name_resolver on a synthetic 500-line report.
+import random
+import re
+import time
+from thefuzz import process
+
+from backend.name_resolver import VALID_TEST_NAMES, resolve_test_name, _fuzzy_resolve
+
+random.seed(7)
+
+LABELS = [
+    "Hemoglobin", "Hb", "HGB", "WBC Count", "Platelet Count", "Platelets", "RBC Count",
+    "Hematocrit", "MCV", "MCH", "MCHC", "RDW", "Neutrophils", "Lymphocytes", "Monocytes",
+    "Total Cholesterol", "LDL-C", "HDL Cholesterol", "Triglycerides", "TG", "Glucose",
+    "HbA1c", "Urea", "Creatinine", "Sodium", "Potassium", "SGPT", "SGOT", "Bilirubin Total",
+    "TSH", "T3", "T4", "Vitamin D", "Vit D", "Vitamin B12", "Serum Iron",
+]
+NOISE = ["Patient Name", "Sample Collected On", "Page", "Ref By Dr", "Hemoglobn", "Triglycerdes", "Creatinin"]
+
+
+def make_report(n_lines=500):
+    return [random.choice(LABELS + NOISE) for _ in range(n_lines)]
+
+
+def old_correct_test_name(name):
+    name = re.sub(r'[^A-Za-z0-9 ]', ' ', name).upper().strip()
+    best, score = process.extractOne(name, VALID_TEST_NAMES)
+    return best if score and score > 65 else None
+
+
+def bench(fn, names, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for n in names:
+            fn(n)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    names = make_report()
+
+    old = bench(old_correct_test_name, names)
+
+    _fuzzy_resolve.cache_clear()
+    start = time.perf_counter()
+    for n in names:
+        resolve_test_name(n)
+    cold = time.perf_counter() - start
+
+    warm = bench(resolve_test_name, names)
+
+    print(f"500-line report, {len(set(names))} distinct labels")
+    print(f"old extractOne scan : {old * 1000:8.2f} ms")
+    print(f"resolver (cold)     : {cold * 1000:8.2f} ms  ({old / cold:5.1f}x)")
+    print(f"resolver (warm)     : {warm * 1000:8.2f} ms  ({old / warm:5.1f}x)")
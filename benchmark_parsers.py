@@ -0,0 +1,106 @@
+# benchmark_parsers.py
+# Compares the original per-record parse_reference_range / parse_value_and_unit
+# with the current ones (precompiled patterns, memoized range strings) on a
+# synthetic bulk history, and checks both give identical output.
+#
+# Usage:
+#   python benchmark_parsers.py [rows]
+import random
+import re
+import sys
+import time
+
+from backend.extractor import parse_reference_range, parse_value_and_unit, _parse_range_text
+
+random.seed(13)
+
+RANGES = [
+    "(13.0-17.0)", "(4500-11000)", "(<200)", "(>40)", "4.5 - 11.0", "70 – 100", "Less than 5.7",
+    "NORMAL RANGE 0.6-1.2", "REFERENCE: >30", "see note", "N/A", "", "None",
+]
+UNITS = ["g/dL", "mg/dL", "%", "% of total", "cells/cumm", "x10^3/uL", ""]
+
+
+def make_history(n_rows, decimals=1):
+    """Labs print a fixed number of decimals, so values repeat; decimals=4 makes nearly all distinct."""
+    ranges = [random.choice(RANGES) for _ in range(n_rows)]
+    values = [
+        f"{random.choice([random.uniform(0, 300), random.uniform(1000, 20000)]):.{decimals}f} {random.choice(UNITS)}"
+        for _ in range(n_rows)
+    ]
+    return ranges, values
+
+
+def old_parse_reference_range(raw_range):
+    """The per-record range parser before precompiled patterns and memoization (kept verbatim)."""
+    if not raw_range or str(raw_range).strip().upper() in ("NONE", "N/A", "NAN"):
+        return None
+    s = str(raw_range).strip()
+    s_clean = s.replace("(", "").replace(")", "").replace("NORMAL RANGE", "").replace("REFERENCE", "").strip()
+
+    # comparator formats < or >
+    m = re.search(r'([<>])\s*([0-9]+(?:\.[0-9]+)?)', s_clean)
+    if m:
+        op, num = m.group(1), float(m.group(2))
+        return (None, float(num), op)
+
+    # inclusive ranges like 13 - 17 or 13.0-17.0 or en-dash
+    m2 = re.search(r'([0-9]+(?:\.[0-9]+)?)\s*[-–—]\s*([0-9]+(?:\.[0-9]+)?)', s_clean)
+    if m2:
+        low, high = float(m2.group(1)), float(m2.group(2))
+        return (low, high, None)
+
+    # single number fallback
+    m3 = re.search(r'([0-9]+(?:\.[0-9]+)?)', s_clean)
+    if m3:
+        num = float(m3.group(1))
+        if '<' in s or 'LESS' in s.upper():
+            return (None, num, '<')
+        if '>' in s or 'GREATER' in s.upper():
+            return (num, None, '>')
+        return (num, None, None)
+    return None
+
+
+def old_parse_value_and_unit(raw_value):
+    """The per-record value parser before the precompiled pattern (kept verbatim)."""
+    if raw_value is None:
+        return None, ""
+    s = str(raw_value).strip()
+    # numeric with possible scientific notation and percentage
+    m = re.search(r'([-+]?\d*\.\d+|\d+e[+-]?\d+|\d+)', s, flags=re.I)
+    if not m:
+        return None, ""
+    num = m.group(0)
+    try:
+        val = float(num)
+    except:
+        try:
+            val = float(num.replace(',', ''))
+        except:
+            return None, ""
+    unit = s[m.end():].strip()
+    if unit == "%" or unit.startswith("%"):
+        unit = "%"
+    return val, unit
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    out = [fn(x) for x in items]
+    return out, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    ranges, values = make_history(n)
+
+    _parse_range_text.cache_clear()
+    old_ranges, t_old_r = timed(old_parse_reference_range, ranges)
+    new_ranges, t_new_r = timed(parse_reference_range, ranges)
+    old_values, t_old_v = timed(old_parse_value_and_unit, values)
+    new_values, t_new_v = timed(parse_value_and_unit, values)
+
+    print(f"{n:,} rows | identical ranges: {old_ranges == new_ranges} | identical values/units: {old_values == new_values}")
+    print(f"ranges  original: {t_old_r:6.2f} s   memoized   : {t_new_r:6.2f} s  ({t_old_r / t_new_r:5.1f}x)")
+    print(f"values  original: {t_old_v:6.2f} s   precompiled: {t_new_v:6.2f} s  ({t_old_v / t_new_v:5.1f}x)")
@@ -0,0 +1,93 @@
+# benchmark_rules.py
+# Compares the old per-rule str.contains scan in find_possible_connections with the
+# compiled matcher in backend.rules on a synthetic library of rules, and checks both
+# fire the same rules.
+#
+# Usage:
+#   python benchmark_rules.py [rules] [reports]
+import random
+import sys
+import time
+
+import pandas as pd
+
+from backend.name_resolver import VALID_TEST_NAMES
+from backend.rules import compile_rules, match_rules
+from backend.summarizer import CONNECTIONS_KNOWLEDGE_BASE
+
+random.seed(19)
+
+STATUSES = [
+    "Normal", "Slightly High", "Moderately High", "Severely High", "High",
+    "Slightly Low", "Moderately Low", "Severely Low", "Low", "No Range Found", "Invalid Value",
+]
+CONDITIONS = ["High", "Low", "Severely", "Slightly", "Moderately"]
+
+
+def make_rules(n_rules):
+    rules = dict(CONNECTIONS_KNOWLEDGE_BASE)
+    for i in range(n_rules - len(rules)):
+        need = [
+            (random.choice(VALID_TEST_NAMES), random.choice(CONDITIONS))
+            for _ in range(random.randint(1, 4))
+        ]
+        rules[f"Pattern {i}"] = {"need": need, "msg": f"Pattern {i} matched."}
+    return rules
+
+
+def make_report(n_tests=30):
+    names = random.sample(VALID_TEST_NAMES, min(n_tests, len(VALID_TEST_NAMES)))
+    return pd.DataFrame({
+        "Test Name": names,
+        "Value": [random.uniform(0, 200) for _ in names],
+        "Status": [random.choice(STATUSES) for _ in names],
+    })
+
+
+def old_find_possible_connections(analyzed_df, rules):
+    """The per-rule scan find_possible_connections replaced (kept verbatim apart from the rules argument)."""
+    insights = []
+    if analyzed_df is None or analyzed_df.empty:
+        return insights
+
+    abnormal = analyzed_df[~analyzed_df["Status"].str.match(r'^\s*Normal\s*$', case=False, na=False)]
+
+    for label, rule in rules.items():
+        found = True
+        for test, cond in rule["need"]:
+            match = abnormal[
+                abnormal["Test Name"].str.contains(test, case=False, na=False)
+                & abnormal["Status"].str.contains(cond, case=False, na=False)
+            ]
+            if match.empty:
+                found = False
+                break
+        if found:
+            insights.append(rule["msg"])
+
+    return insights
+
+
+if __name__ == "__main__":
+    n_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_reports = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rules = make_rules(n_rules)
+    reports = [make_report() for _ in range(n_reports)]
+
+    start = time.perf_counter()
+    engine = compile_rules(rules)
+    t_compile = time.perf_counter() - start
+
+    start = time.perf_counter()
+    old = [old_find_possible_connections(df, rules) for df in reports]
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [[msg for _, msg in match_rules(engine, df)] for df in reports]
+    t_new = time.perf_counter() - start
+
+    fired = sum(len(r) for r in new)
+    print(f"{len(rules):,} rules x {n_reports} reports | identical: {old == new} | rules fired: {fired}")
+    print(f"compile        : {t_compile * 1000:8.1f} ms")
+    print(f"old per report : {t_old / n_reports * 1000:8.2f} ms")
+    print(f"compiled       : {t_new / n_reports * 1000:8.2f} ms  ({t_old / t_new:6.1f}x)")
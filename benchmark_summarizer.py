@@ -0,0 +1,127 @@
+# benchmark_summarizer.py
+# Compares the old iterrows generate_summary with generate_summaries on a batch of
+# synthetic analyzed reports, and checks both produce byte-identical Markdown.
+#
+# Usage:
+#   python benchmark_summarizer.py [reports]
+import random
+import sys
+import time
+
+import pandas as pd
+
+from backend.summarizer import EXPERT_KNOWLEDGE_BASE, generate_summaries
+
+random.seed(20)
+
+NAMES = [
+    "HEMOGLOBIN", "WBC", "PLATELET", "GLUCOSE", "CHOLESTEROL", "TSH", "RBC COUNT", "HEMATOCRIT",
+    "MCV", "LDL CHOLESTEROL", "HDL CHOLESTEROL", "TRIGLYCERIDES", "CREATININE", "VITAMIN D",
+]
+STATUSES = ["Normal"] * 6 + ["Slightly High", "Moderately High", "Slightly Low", "Severely Low", "No Range Found"]
+UNITS = ["g/dL", "mg/dL", "%", "/uL", ""]
+
+
+def make_reports(n_reports):
+    reports = []
+    for _ in range(n_reports):
+        names = random.sample(NAMES, random.randint(5, len(NAMES)))
+        df = pd.DataFrame({
+            "Test Name": names,
+            "Value": [round(random.uniform(0, 300), 1) for _ in names],
+            "Unit": [random.choice(UNITS) for _ in names],
+            "Status": [random.choice(STATUSES) for _ in names],
+            "Reference Range Used": [random.choice(["70.0 - 100.0 (Report)", "< 200 (Standard)", "N/A"]) for _ in names],
+        })
+        reports.append((df, random.choice([None, "", "Mild anemia noted."])))
+    return reports
+
+
+def old_generate_summary(analyzed_df, diagnosis):
+    """The iterrows implementation generate_summary replaced (kept verbatim for comparison)."""
+
+    if analyzed_df is None or analyzed_df.empty:
+        if diagnosis:
+            return f"## 🩺 Quick Summary\n**Doctor’s Note / Observation:** {diagnosis}\n\nNo numeric values were extracted."
+        return "## 🌿 No test values detected in the report."
+
+    analyzed_df["Status"] = analyzed_df["Status"].astype(str)
+
+    abnormal = analyzed_df[~analyzed_df["Status"].str.match(r'^\s*Normal\s*$', case=False, na=False)]
+
+    if abnormal.empty and not diagnosis:
+        return (
+            "## 🌿 Your Health Looks Great!\n"
+            "All your test values are within the healthy range. Keep drinking water, "
+            "moving daily, and eating balanced meals 💚."
+        )
+
+    summary_lines = []
+
+    if diagnosis:
+        summary_lines.append(f"**Doctor’s Note / Observation:** {diagnosis}\n")
+
+    summary_lines.append("Here’s what stood out in your report:\n")
+
+    for _, row in abnormal.iterrows():
+        name = str(row.get("Test Name", "")).title()
+        value = row.get("Value", "")
+        unit = row.get("Unit", "")
+        status = row.get("Status", "")
+        used_range = row.get("Reference Range Used", "N/A")
+
+        summary_lines.append(f"### • {name} — {status}")
+        val_display = f"{value} {unit}".strip()
+        summary_lines.append(f"- **Your Value:** {val_display} (Normal: {used_range})")
+
+        info = EXPERT_KNOWLEDGE_BASE.get(name.upper(), None)
+
+        if info:
+            if "High" in status:
+                if "High" in info:
+                    summary_lines.append(f"- **What This Means:** {info['High']}")
+                if "FixHigh" in info:
+                    summary_lines.append(f"- **What To Do:** {info['FixHigh']}")
+            else:
+                if "Low" in info:
+                    summary_lines.append(f"- **What This Means:** {info['Low']}")
+                if "FixLow" in info:
+                    summary_lines.append(f"- **What To Do:** {info['FixLow']}")
+        else:
+            if "High" in status:
+                summary_lines.append("- **Meaning:** Slightly high values can be due to meals, stress, or dehydration.")
+                summary_lines.append("- **Tip:** Drink water, avoid heavy meals before testing.")
+            else:
+                summary_lines.append("- **Meaning:** Low values may reflect nutrition gaps or tiredness.")
+                summary_lines.append("- **Tip:** Eat balanced meals and rest well.")
+
+        summary_lines.append("")  # spacing
+
+    summary_lines.append(
+        "---\n### ✅ Overall\n"
+        "Nothing here looks scary — most numbers shift due to food, stress, water intake, or sleep. "
+        "A few simple habits can balance your levels naturally.\n\n"
+        "If you feel unwell, consider showing this report to your doctor. 💙\n\n"
+        "⚠️ **Note:** This summary is for your information and understanding only. "
+        "Always consult your doctor for medical advice."
+    )
+
+    return "\n".join(summary_lines)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    reports = make_reports(n)
+    copies = [(df.copy(), diagnosis) for df, diagnosis in reports]
+
+    start = time.perf_counter()
+    old = [old_generate_summary(df, diagnosis) for df, diagnosis in copies]
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = generate_summaries(reports)
+    t_new = time.perf_counter() - start
+
+    print(f"{n:,} reports | byte-identical: {old == new}")
+    print(f"old iterrows : {t_old:8.2f} s")
+    print(f"batch        : {t_new:8.2f} s  ({t_old / t_new:5.1f}x)")
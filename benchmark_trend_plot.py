@@ -0,0 +1,66 @@
+# benchmark_trend_plot.py
+# Times the Dashboard trend chart for long synthetic series: full-resolution
+# rendering against LTTB-downsampled rendering at several lengths (to check where
+# TREND_DOWNSAMPLE_ABOVE should sit), plus a cached PNG hit (keyed on a hash of the
+# plotted series).
+#
+# Usage:
+#   python benchmark_trend_plot.py [points ...]
+import io
+import statistics
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+
+from backend.comparator import TREND_DOWNSAMPLE_ABOVE, TREND_MAX_POINTS, create_trend_plot, trend_plot_png
+
+rng = np.random.default_rng(22)
+REPEATS = 5
+
+
+def make_trend(n_points):
+    dates = list(pd.date_range("2015-01-01", periods=n_points, freq="D"))
+    values = (100 + np.cumsum(rng.normal(0, 2, n_points))).tolist()
+    return {"GLUCOSE": {"dates": dates, "values": values}}
+
+
+def png_bytes(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    return buf.getvalue()
+
+
+def timed_render(trend, downsample_above):
+    """Median render time (ms) and PNG size (KiB) over REPEATS renders."""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        png = png_bytes(create_trend_plot(trend, "GLUCOSE", downsample_above=downsample_above))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, len(png) / 1024
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 5000, 10000, 20000, 50000]
+    png_bytes(create_trend_plot(make_trend(10), "GLUCOSE"))  # warm up fonts and caches
+
+    print(f"downsampling to {TREND_MAX_POINTS} points above {TREND_DOWNSAMPLE_ABOVE:,} (median of {REPEATS})")
+    for n in sizes:
+        trend = make_trend(n)
+        t_full, kib_full = timed_render(trend, downsample_above=n)
+        t_lttb, kib_lttb = timed_render(trend, downsample_above=0)
+        default = "LTTB" if n > TREND_DOWNSAMPLE_ABOVE else "full"
+        print(f"{n:>8,} points | full {t_full:7.1f} ms {kib_full:6.1f} KiB"
+              f" | LTTB {t_lttb:7.1f} ms {kib_lttb:6.1f} KiB | default: {default}")
+
+    trend = make_trend(sizes[-1])
+    trend_plot_png(trend, "GLUCOSE")
+    start = time.perf_counter()
+    for _ in range(100):
+        trend_plot_png(trend, "GLUCOSE")
+    t_hit = (time.perf_counter() - start) / 100
+    print(f"cached PNG hit ({sizes[-1]:,} points): {t_hit * 1e6:8.1f} us")
@@ -0,0 +1,181 @@
+# benchmark_trends.py
+# Compares the old per-test mask loop in generate_trend_analysis with the one-pass
+# trend engine (backend.trends) on synthetic report histories. Checks the trends
+# dict is identical to the old one, and that the history DataFrame and the
+# incrementally updated per-user trend state produce the same summary. Summaries
+# differ from the old loop only where an unusual jump is flagged. Also reports
+# the stored state's BSON size, which must not grow with the number of reports.
+#
+# Usage:
+#   python benchmark_trends.py [users] [reports per user]
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bson
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+
+from backend.comparator import generate_trend_analysis
+from backend.trends import add_report_to_state, new_trend_state, summary_from_state
+
+random.seed(21)
+
+NAMES = [
+    "HEMOGLOBIN", "WBC", "PLATELET", "GLUCOSE", "CHOLESTEROL", "TSH", "RBC COUNT", "HEMATOCRIT",
+    "MCV", "LDL CHOLESTEROL", "HDL CHOLESTEROL", "TRIGLYCERIDES", "CREATININE", "VITAMIN D",
+    "SODIUM", "POTASSIUM", "CALCIUM", "IRON", "FERRITIN", "HBA1C",
+]
+STATUSES = ["Normal"] * 5 + ["Slightly High", "Moderately High", "Slightly Low", "Severely Low"]
+
+
+def make_history(n_reports):
+    """Reports as get_user_history returns them (oldest first, millisecond dates)."""
+    date = datetime(2023, 1, 1)
+    reports = []
+    for _ in range(n_reports):
+        date += timedelta(days=random.randint(1, 60), milliseconds=random.randint(0, 10**6))
+        names = random.sample(NAMES, random.randint(3, len(NAMES)))
+        if random.random() < 0.2:
+            names.append(random.choice(names))  # a test printed twice in one report
+        reports.append({
+            "upload_date": date,
+            "tests": [
+                {
+                    "test_name": name,
+                    "value": random.choice([0.0, round(random.uniform(0, 300), 1)]),
+                    "status": random.choice(STATUSES),
+                }
+                for name in names
+            ],
+        })
+    return reports
+
+
+def history_frame(history):
+    """The Dashboard's old trend_rows frame."""
+    trend_rows = []
+    for report in history:
+        for test in report["tests"]:
+            trend_rows.append({
+                "upload_date": report["upload_date"],
+                "test_name": test["test_name"],
+                "value": test["value"],
+                "status": test["status"]
+            })
+    return pd.DataFrame(trend_rows)
+
+
+def old_generate_trend_analysis(history_df):
+    """The per-test mask loop generate_trend_analysis replaced (kept verbatim for comparison)."""
+    if history_df.empty or len(history_df['upload_date'].unique()) < 2:
+        return "This is your first report. Upload future reports to track trends!", {}
+
+    summary = "## 📈 Your Health Trends\n\nHere's how your latest report compares to the previous one:\n"
+
+    # Convert to datetime
+    history_df['upload_date'] = pd.to_datetime(history_df['upload_date'], errors='coerce')
+    all_dates = sorted(history_df['upload_date'].dropna().unique())
+    latest_date = all_dates[-1]
+    previous_date = all_dates[-2]
+
+    latest_report = history_df[history_df['upload_date'] == latest_date]
+    previous_report = history_df[history_df['upload_date'] == previous_date]
+
+    trends = {}
+    critical_change = None  # track biggest deviation
+    max_change = 0
+
+    all_test_names = history_df['test_name'].unique()
+
+    for test_name in all_test_names:
+        trends.setdefault(test_name, {'dates': [], 'values': []})
+
+        # Add historical values for plotting
+        all_values = history_df[history_df['test_name'] == test_name].sort_values(by='upload_date')
+        trends[test_name]['dates'] = list(all_values['upload_date'])
+        trends[test_name]['values'] = list(all_values['value'])
+
+        current_test = latest_report[latest_report['test_name'] == test_name]
+        prev_test = previous_report[previous_report['test_name'] == test_name]
+
+        if not current_test.empty and not prev_test.empty:
+            prev_val = prev_test.iloc[0]['value']
+            curr_val = current_test.iloc[0]['value']
+            curr_status = current_test.iloc[0]['status']
+            prev_status = prev_test.iloc[0]['status']
+
+            # Compute percentage change
+            if prev_val != 0:
+                change_percent = ((curr_val - prev_val) / abs(prev_val)) * 100
+            else:
+                change_percent = 0
+
+            if abs(change_percent) > max_change:
+                max_change = abs(change_percent)
+                critical_change = (test_name, change_percent, curr_status)
+
+            # Build summary
+            if curr_status != 'Normal' and prev_status == 'Normal':
+                summary += f"\n- **(⚠️ New Alert)** {test_name}: Became **{curr_status}** ({curr_val:.2f}) from 'Normal'."
+            elif curr_status == 'Normal' and prev_status != 'Normal':
+                summary += f"\n- **(✅ Improvement)** {test_name}: Returned to **Normal** ({curr_val:.2f}) from '{prev_status}'."
+            elif curr_status != 'Normal' and curr_status != prev_status:
+                summary += f"\n- **(Change)** {test_name}: Shifted from '{prev_status}' to **'{curr_status}'** ({curr_val:.2f})."
+            elif curr_status != 'Normal':
+                direction = "increased" if change_percent > 0 else "decreased"
+                if abs(change_percent) > 1:
+                    summary += f"\n- **(Monitoring)** {test_name}: Still **{curr_status}**, {direction} by {abs(change_percent):.1f}%."
+
+    # Add highlight for the largest deviation
+    if critical_change:
+        name, change, status = critical_change
+        direction = "increased" if change > 0 else "decreased"
+        summary = f"### ⚠️ Biggest Change: **{name}** ({status}) — {direction} by {abs(change):.1f}%\n\n" + summary
+
+    if summary.strip().endswith("previous one:"):
+        summary += "\nNo significant changes from your previous report. Keep up the good work!"
+
+    return summary, trends
+
+
+if __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n_reports = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    histories = [make_history(random.randint(1, n_reports)) for _ in range(n_users)]
+    frames = [history_frame(h) for h in histories]
+
+    start = time.perf_counter()
+    old = [old_generate_trend_analysis(df.copy()) for df in frames]
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [generate_trend_analysis(df) for df in frames]
+    t_new = time.perf_counter() - start
+
+    # incremental: fold every report into the state as it would be saved, then render
+    states = []
+    start = time.perf_counter()
+    for i, history in enumerate(histories):
+        state = new_trend_state(f"user{i}")
+        for report in history:
+            add_report_to_state(state, report)
+        states.append(state)
+    t_fold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental = [summary_from_state(state) for state in states]
+    t_state = time.perf_counter() - start
+
+    same_trends = all(o[1] == f[1] for o, f in zip(old, new))
+    same_summary = all(f[0] == i[0] and list(f[1]) == i[1] for f, i in zip(new, incremental))
+    flagged = sum("Unusual Changes" in f[0] for f in new)
+    print(f"{n_users} users, up to {n_reports} reports | trends as before: {same_trends} | frame == state: {same_summary}")
+    print(f"unusual jumps flagged for {flagged} users")
+    print(f"old per user           : {t_old / n_users * 1000:8.2f} ms")
+    print(f"one pass per user      : {t_new / n_users * 1000:8.2f} ms  ({t_old / t_new:5.1f}x)")
+    print(f"state render per user  : {t_state / n_users * 1000:8.2f} ms  ({t_old / t_state:5.1f}x)")
+    print(f"state update per report: {t_fold / sum(len(h) for h in histories) * 1e6:8.1f} us")
+    print(f"largest state document : {max(len(bson.encode(s)) for s in states) / 1024:8.1f} KiB")
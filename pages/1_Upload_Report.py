@@ -1,17 +1,25 @@
 # Upload_Report.py (FINAL FIXED VERSION)
 
 import streamlit as st
-import os
-import tempfile
-import pandas as pd
-from backend.extractor import process_report
-from backend.analyzer import analyze_results
-from backend.summarizer import generate_summary, find_possible_connections
-from backend.report_generator import generate_pdf_report
+import time
+from backend.cache import sha256_bytes
 from backend.ask_ai import get_ai_answer
 from backend.session_manager import init_session, get_current_user
-from backend.visualizer import create_visual_summary
-from backend.database import save_full_report_to_db
+from backend.auth import calculate_age
+from backend.jobs import submit_report_job, get_job, JobQueueFull
+
+# seconds between status checks while a report is processing
+POLL_SECONDS = 1.0
+
+STAGE_LABELS = {
+    "extract": "Reading the report",
+    "units": "Converting units",
+    "analyze": "Checking results against reference ranges",
+    "summarize": "Writing the summary",
+    "chart": "Drawing the chart",
+    "save": "Saving to your history",
+    "pdf": "Building the PDF",
+}
 
 # ---------------- INITIAL SETUP ----------------
 init_session()
@@ -24,62 +32,58 @@ username = user.get("email") if user else st.text_input("Enter Username (for sav
 
 uploaded_file = st.file_uploader(
     "Upload your lab report (PDF or Image)",
-    type=["pdf", "png", "jpg", "jpeg"]
+    type=["pdf", "png", "jpg", "jpeg", "tif", "tiff"]
 )
 
 # ---------------- FILE PROCESSING ----------------
-if uploaded_file:
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, uploaded_file.name)
-
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    with st.spinner(" Analyzing your report..."):
-        try:
-            df, diagnosis, raw_text = process_report(file_path)
-
-            analyzed = analyze_results(df)
-
-            # FIX: Clean numeric values (important for graph + PDF)
-            try:
-                analyzed["Value Raw"] = analyzed["Value"]
-                analyzed["Value"] = (
-                    analyzed["Value"]
-                    .astype(str)
-                    .str.extract(r"([-+]?\d*\.\d+|[-+]?\d+)", expand=False)
-                )
-                analyzed["Value"] = pd.to_numeric(analyzed["Value"], errors="coerce")
-            except Exception:
-                pass
-
-            summary = generate_summary(analyzed, diagnosis)
-            connections = find_possible_connections(analyzed)
-
-        except Exception as e:
-            st.error(f"Error processing report: {e}")
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
-            st.stop()
-
-    st.session_state["last_analysis"] = {
-        "df": analyzed,
-        "summary": summary,
-        "connections": connections,
-        "raw_text": raw_text,
-        "diagnosis": diagnosis,
-        "filename": uploaded_file.name
-    }
-
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-        except:
-            pass
+# Processing runs as a background job (backend/jobs.py); this page only submits
+# and polls it. The job id lives in the URL so a refresh re-attaches to the job.
+# Streamlit reruns the script on every interaction; only submit a file whose bytes changed
+file_hash = sha256_bytes(uploaded_file.getvalue()) if uploaded_file else None
+already_processed = (
+    file_hash is not None
+    and st.session_state.get("last_analysis", {}).get("file_hash") == file_hash
+)
+
+if uploaded_file and not already_processed:
+    try:
+        # age from DOB at upload time (the stored age is from signup)
+        age = (calculate_age(user.get("dob")) or user.get("age")) if user else None
+        job_id = submit_report_job(
+            uploaded_file.getvalue(), uploaded_file.name, username, file_hash,
+            age=age, sex=user.get("sex") if user else None,
+        )
+    except JobQueueFull as e:
+        st.warning(str(e))
+        st.stop()
+    if st.query_params.get("job") != job_id:
+        st.query_params["job"] = job_id
+
+job_id = st.query_params.get("job")
+if job_id and st.session_state.get("last_analysis", {}).get("job_id") != job_id:
+    job = get_job(job_id, owner=username or None)
+    if job is None:
+        # expired, the server restarted, or the job belongs to another user
+        del st.query_params["job"]
+    elif job["status"] in ("queued", "running"):
+        if job["status"] == "queued":
+            text = f"Waiting in queue (position {job.get('queue_position', 1)})..."
+        else:
+            text = STAGE_LABELS.get(job["stage"], "Analyzing your report") + "..."
+        st.progress(job["progress"], text=text)
+        for stage in job["stages"]:
+            if stage in job["completed"]:
+                st.markdown(f"✅ {STAGE_LABELS[stage]}")
+            elif stage == job["stage"]:
+                st.markdown(f"⏳ {STAGE_LABELS[stage]}")
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"Error processing report: {job['error']}")
+        st.stop()
+    else:
+        st.session_state["last_analysis"] = dict(job["result"], job_id=job_id)
+        st.session_state.pop("ai_response", None)
 
 # ---------------- DISPLAY ANALYSIS ----------------
 if "last_analysis" in st.session_state:
@@ -89,10 +93,12 @@ if "last_analysis" in st.session_state:
     summary = data["summary"]
     connections = data["connections"]
     raw_text = data["raw_text"]
-    diagnosis = data["diagnosis"]
-    filename = data["filename"]
+    chart_png = data["chart_png"]
 
     st.success(" Analysis Complete!")
+    if data["skipped_pages"]:
+        pages = ", ".join(str(p) for p in data["skipped_pages"])
+        st.warning(f"Time limit reached: page(s) {pages} were skipped, so some results may be missing.")
 
     # --------------------------------------------------------
     # 🟣 FIXED SHORT SUMMARY – SHOW ONLY THE HEADING, NO BULLET
@@ -112,32 +118,8 @@ if "last_analysis" in st.session_state:
         st.markdown(summary)
 
     # ---------------- VISUALIZATION ----------------
-    fig = None
-    try:
-        fig = create_visual_summary(analyzed)
-    except:
-        st.info("Visualization could not be created for this report.")
-        fig = None
-
-    chart_path = None
-    if fig is not None:
-        try:
-            fig_obj = getattr(fig, "figure", None)
-            if fig_obj is not None:
-                fig_to_save = fig_obj
-            else:
-                fig_to_save = fig
-
-            st.pyplot(fig, use_container_width=True)
-
-            temp_chart = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-            chart_path = temp_chart.name
-            temp_chart.close()
-
-            fig_to_save.savefig(chart_path, dpi=150, bbox_inches="tight")
-        except:
-            chart_path = None
-            st.info("Visualization save skipped.")
+    if chart_png:
+        st.image(chart_png, use_container_width=True)
     else:
         st.info("No visual data available for this report.")
 
@@ -165,56 +147,26 @@ if "last_analysis" in st.session_state:
         st.info(st.session_state["ai_response"])
 
     # ---------------- SAVE REPORT TO MONGODB ----------------
-    if username:
-        try:
-            safe_df = analyzed.copy().astype(str)
-            save_full_report_to_db(
-                username=username,
-                analyzed_df=safe_df,
-                summary=summary,
-                diagnosis=diagnosis,
-                raw_text=raw_text,
-                chart_path=chart_path,
-                filename=filename
-            )
-            st.success(f" Saved to {username}'s history in MongoDB!")
-        except Exception as e:
-            st.error(f" Save failed: {e}")
+    # saved once by the job, not on every rerun
+    if data["saved_for"]:
+        st.success(f" Saved to {data['saved_for']}'s history in MongoDB!")
+    elif data["save_error"]:
+        st.error(f" Save failed: {data['save_error']}")
 
     # ---------------- PDF DOWNLOAD ----------------
     st.markdown("---")
     st.subheader("Download PDF Report")
 
-    pdf_path = "Simplified_Lab_Report.pdf"
-
-    try:
-        pdf_df = analyzed.copy().astype(str)
-        generate_pdf_report(pdf_df, summary, chart_path, pdf_path)
-
-        if os.path.exists(pdf_path):
-            with open(pdf_path, "rb") as pdf_file:
-                st.download_button(
-                    label="Download PDF",
-                    data=pdf_file,
-                    file_name="Simplified_Lab_Report.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-        else:
-            st.error("PDF generation failed.")
-    except Exception as e:
-        st.error(f"PDF generation failed: {e}")
-    finally:
-        if os.path.exists(pdf_path):
-            try:
-                os.remove(pdf_path)
-            except:
-                pass
-        if chart_path and os.path.exists(chart_path):
-            try:
-                os.remove(chart_path)
-            except:
-                pass
+    if data["pdf_bytes"]:
+        st.download_button(
+            label="Download PDF",
+            data=data["pdf_bytes"],
+            file_name="Simplified_Lab_Report.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+    else:
+        st.error(f"PDF generation failed: {data['pdf_error']}")
 
     # ---------------- DETAILS ----------------
     with st.expander("Detailed Results Table"):
@@ -2,8 +2,8 @@
 import streamlit as st
 import pandas as pd
 from backend.session_manager import init_session, get_current_user
-from backend.database import get_user_history
-from backend.comparator import generate_trend_analysis, create_trend_plot
+from backend.database import get_latest_report, get_user_trends, get_trend_series
+from backend.comparator import trend_plot_png
 
 # ---------------- INITIAL SETUP ----------------
 init_session()
@@ -20,16 +20,14 @@ if not user:
 username = user["email"]
 st.info(f"Welcome back, **{username}**! Here's your personalized health overview.")
 
-# ---------------- FETCH HISTORY ----------------
-history = get_user_history(username)
+# ---------------- FETCH LATEST ----------------
+latest = get_latest_report(username)
 
-if not history:
+if not latest:
     st.info("You haven't uploaded any lab reports yet. Upload your first report to begin tracking your health!")
     st.stop()
 
 # ---------------- LATEST REPORT ----------------
-latest = history[-1]
-
 st.markdown("## 🧪 Latest Report Overview")
 
 col1, col2 = st.columns(2)
@@ -51,22 +49,8 @@ st.dataframe(latest_df, use_container_width=True)
 st.markdown("---")
 st.markdown("## 📈 Overall Health Trends")
 
-# Convert full history to DataFrame
-trend_rows = []
-
-for report in history:
-    for test in report["tests"]:
-        trend_rows.append({
-            "upload_date": report["upload_date"],
-            "test_name": test["test_name"],
-            "value": test["value"],
-            "status": test["status"]
-        })
-
-history_df = pd.DataFrame(trend_rows)
-
-# Generate trend insights
-trend_summary, trend_data = generate_trend_analysis(history_df)
+# Trend insights from the stored per-user trend state (updated on every save)
+trend_summary, trend_tests = get_user_trends(username)
 
 st.markdown(f"### 🔍 Trend Summary")
 st.info(trend_summary)
@@ -75,16 +59,20 @@ st.info(trend_summary)
 st.markdown("---")
 st.subheader("📊 Visualize Test Trends Over Time")
 
-tests_available = sorted(list(trend_data.keys()))
+tests_available = sorted(trend_tests)
 
 if not tests_available:
     st.info("Not enough trend data yet. Upload more reports to see changes over time.")
 else:
     selected_test = st.selectbox("Choose a test to visualize its trend:", tests_available)
 
-    fig = create_trend_plot(trend_data, selected_test)
+    # only the selected test's points are loaded
+    trend_data = {selected_test: get_trend_series(username, selected_test)}
+
+    # Rendered once per distinct series; switching tests reuses cached PNGs
+    png = trend_plot_png(trend_data, selected_test)
 
-    if fig:
-        st.pyplot(fig)
+    if png:
+        st.image(png, use_container_width=True)
     else:
         st.warning("Not enough data points to generate a trend chart for this test.")
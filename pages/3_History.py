@@ -1,10 +1,11 @@
+import base64
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 
 from backend.session_manager import get_current_user
 from backend.database import get_user_history, get_last_two_reports
-from backend.visualizer import create_visual_summary
+from backend.visualizer import create_visual_summary, figure_png, new_figure
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(page_title="History", page_icon="📚", layout="wide")
@@ -50,11 +51,17 @@ for report in history:
         st.markdown("### 🧪 Test Results")
         st.dataframe(tests, use_container_width=True)
 
-        # Chart
+        # Chart: the one saved with the report, else rendered through the chart cache
+        # (stored tests use lowercase column names)
         st.markdown("### 📊 Visual Chart")
-        fig = create_visual_summary(tests)
-        if fig:
-            st.pyplot(fig, use_container_width=True)
+        if report.get("chart_b64"):
+            chart_png = base64.b64decode(report["chart_b64"])
+        else:
+            chart_png = create_visual_summary(
+                tests.rename(columns={"test_name": "Test Name", "value": "Value", "status": "Status"})
+            )
+        if chart_png:
+            st.image(chart_png, use_container_width=True)
         else:
             st.info("No chart available for this report.")
 
@@ -88,7 +95,8 @@ else:
     # Graph for differences
     st.markdown("### 📈 Test Value Changes")
 
-    fig, ax = plt.subplots(figsize=(10, 5))
+    fig = new_figure((10, 5))
+    ax = fig.subplots()
 
     ax.scatter(comparison["test_name"], comparison["value_old"], label="Old Value", s=80)
     ax.scatter(comparison["test_name"], comparison["value_new"], label="New Value", s=80)
@@ -105,4 +113,4 @@ else:
     ax.set_xticklabels(comparison["test_name"], rotation=45)
     ax.legend()
 
-    st.pyplot(fig)
+    st.image(figure_png(fig), use_container_width=True)
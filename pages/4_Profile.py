@@ -20,6 +20,7 @@ email = user.get("email", "Not Provided")
 full_name = user.get("full_name", "Not Provided")
 dob = user.get("dob", "Not Provided")
 age = user.get("age", "Not Provided")
+sex = {"F": "Female", "M": "Male"}.get(user.get("sex"), "Not Provided")
 
 # ---- Profile Header ----
 st.subheader("Your Profile Details")
@@ -33,6 +34,7 @@ with col1:
 with col2:
     st.write(f"**Date of Birth:** {dob}")
     st.write(f"**Age:** {age}")
+    st.write(f"**Sex:** {sex}")
 
 st.markdown("---")
 
@@ -0,0 +1,12 @@
+# tests/conftest.py
+# Settings applied before any backend module is imported: no real MongoDB
+# (pymongo connects lazily) and no on-disk caches shared with a local app run.
+import os
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:1")
+os.environ.setdefault("LAB_CHART_CACHE_DIR", "")
+os.environ.setdefault("LAB_CACHE_DIR", "")
+
+import matplotlib
+
+matplotlib.use("Agg")
@@ -0,0 +1,116 @@
+# tests/test_batch_ingest.py
+import json
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pymongo import InsertOne, ReplaceOne
+
+import batch_ingest
+from backend import database, extractor
+
+TEXT = "Collected On: 12/03/2021\nGLUCOSE 150 mg/dL 70-100\nHEMOGLOBIN 10.2 g/dL 13-17"
+
+
+@pytest.fixture
+def fake_report(monkeypatch):
+    def install(text=TEXT, skipped=()):
+        def process_report(path):
+            df = extractor.parse_report_text(text)
+            df.attrs["skipped_pages"] = list(skipped)
+            return df, None, text
+        monkeypatch.setattr(extractor, "process_report", process_report)
+    return install
+
+
+def test_checkpoint_retry_includes_partial_files(tmp_path):
+    checkpoint = tmp_path / "ckpt.jsonl"
+    batch_ingest.append_checkpoint(checkpoint, [
+        {"file": "a", "status": "ok"},
+        {"file": "b", "status": "partial", "skipped_pages": [3]},
+        {"file": "c", "status": "failed"},
+    ])
+    assert batch_ingest.load_checkpoint(checkpoint) == {"a", "b", "c"}
+    assert batch_ingest.load_checkpoint(checkpoint, retry_failed=True) == {"a"}
+
+
+def test_file_with_skipped_pages_is_partial(tmp_path, fake_report):
+    fake_report(skipped=[2, 3])
+    path = tmp_path / "r.pdf"
+    path.write_bytes(b"%PDF")
+    result = batch_ingest.process_file(str(path))
+    assert result["status"] == "partial"
+
+    entries, results, counts = [], [], {"partial": 0}
+    batch_ingest._collect(result, results, entries, {"extract": 0, "units": 0, "analyze": 0}, counts)
+    assert entries == [{"file": str(path), "status": "partial", "skipped_pages": [2, 3]}]
+    assert results == [result]
+
+
+def test_report_is_dated_by_its_printed_date(tmp_path, fake_report):
+    fake_report()
+    path = tmp_path / "r.pdf"
+    path.write_bytes(b"%PDF")
+    assert batch_ingest.process_file(str(path))["report_date"] == datetime(2021, 3, 12)
+
+
+def test_report_without_a_date_falls_back_to_file_mtime(tmp_path, fake_report):
+    fake_report(text="GLUCOSE 150 mg/dL 70-100")
+    path = tmp_path / "r.pdf"
+    path.write_bytes(b"%PDF")
+    os.utime(path, (1_500_000_000, 1_500_000_000))
+    result = batch_ingest.process_file(str(path))
+    assert result["status"] == "ok"
+    assert result["report_date"] == datetime.utcfromtimestamp(1_500_000_000)
+
+
+class FakeReports:
+    """The slice of a pymongo collection save_full_reports_to_db uses, with the unique (username, file_hash) index."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def bulk_write(self, ops, ordered):
+        upserted, modified = {}, 0
+        for i, op in enumerate(ops):
+            if isinstance(op, InsertOne):
+                self.docs[object()] = op._doc
+                continue
+            assert isinstance(op, ReplaceOne) and op._upsert
+            key = (op._filter["username"], op._filter["file_hash"])
+            if key in self.docs:
+                modified += self.docs[key] != op._doc
+            else:
+                upserted[i] = key
+            self.docs[key] = op._doc
+        return SimpleNamespace(upserted_ids=upserted, modified_count=modified)
+
+
+def test_resaving_replaces_instead_of_duplicating(monkeypatch):
+    reports = FakeReports()
+    dropped, folded = [], []
+    monkeypatch.setattr(database, "reports_col", reports)
+    monkeypatch.setattr(database, "trend_state_col", SimpleNamespace(delete_one=lambda q: dropped.append(q)))
+    monkeypatch.setattr(database, "update_trend_state", lambda username, docs: folded.extend(docs))
+    monkeypatch.setattr(database, "_file_hash_index_ready", False)
+
+    df = extractor.parse_report_text("GLUCOSE 150 mg/dL 70-100").assign(Status="High")
+
+    def docs(value):
+        df["Value"] = value
+        return [database.build_report_doc("u", df, "s", None, "t", None, "r.pdf", file_hash="h",
+                                          upload_date=datetime(2021, 3, 12))]
+
+    assert database.save_full_reports_to_db(docs(150.0)) == 1
+    assert database.save_full_reports_to_db(docs(150.0)) == 0
+    assert dropped == [] and len(folded) == 1
+    # a retried partial report with new values replaces the old one and invalidates the trend state
+    assert database.save_full_reports_to_db(docs(155.0)) == 0
+    assert len(reports.docs) == 1
+    assert reports.docs[("u", "h")]["tests"][0]["value"] == 155.0
+    assert reports.docs[("u", "h")]["upload_date"] == datetime(2021, 3, 12)
+    assert dropped == [{"username": "u"}]
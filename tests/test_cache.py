@@ -0,0 +1,88 @@
+# tests/test_cache.py
+import os
+
+import pytest
+
+from backend import cache, extractor, image_preprocess, ocr_backends, ocr_engine, templates
+from backend.cache import DiskCache
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    """Counts directory listings made by the disk cache."""
+    calls = []
+    scandir = os.scandir
+
+    def counting(path):
+        calls.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(cache.os, "scandir", counting)
+    return calls
+
+
+def directory_size(directory):
+    return sum(e.stat().st_size for e in os.scandir(directory) if e.name.endswith(".pkl"))
+
+
+def test_disk_cache_lists_directory_only_when_over_budget(tmp_path, listings):
+    disk = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    for i in range(50):
+        disk.set(f"k{i}", b"x" * 1000)
+    # one listing seeds the running total; later writes stay under the budget
+    assert len(listings) == 1
+    assert disk._total == directory_size(tmp_path)
+    assert disk.get("k0") == b"x" * 1000
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=20_000)
+    for i in range(10):
+        disk.set(f"k{i}", b"x" * 5000)
+        os.utime(disk._path(f"k{i}"), (i, i))
+    assert directory_size(tmp_path) <= 20_000
+    assert disk._total == directory_size(tmp_path)
+    assert disk.get("k9") is not None
+    assert disk.get("k0") is None
+
+
+def test_full_disk_cache_is_not_listed_on_every_write(tmp_path, listings):
+    disk = DiskCache(str(tmp_path), max_bytes=50_000)
+    for i in range(200):
+        disk.set(f"k{i}", b"x" * 1000)
+    assert directory_size(tmp_path) <= 50_000
+    assert disk._total == directory_size(tmp_path)
+    # eviction frees 10% of the budget (about 4 entries) each time
+    assert len(listings) < 100
+
+
+def test_disk_cache_overwrite_keeps_total(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    disk.set("k", b"x" * 1000)
+    disk.set("k", b"x" * 3000)
+    disk.set("other", b"y")
+    assert disk._total == directory_size(tmp_path)
+
+
+@pytest.mark.parametrize("module, name, value", [
+    (extractor, "NER_CASCADE", not extractor.NER_CASCADE),
+    (extractor, "TEMPLATES_ENABLED", not extractor.TEMPLATES_ENABLED),
+    (extractor, "TEMPLATE_LEARN", not extractor.TEMPLATE_LEARN),
+    (ocr_backends, "OCR_BACKEND", "tesserocr"),
+    (ocr_engine, "OCR_DPI", 150),
+    (ocr_engine, "OCR_ADAPTIVE", not ocr_engine.OCR_ADAPTIVE),
+    (image_preprocess, "TARGET_DPI", 200),
+])
+def test_extraction_key_follows_settings(monkeypatch, module, name, value):
+    before = extractor.extraction_cache_key("abc", "text")
+    monkeypatch.setattr(module, name, value)
+    assert extractor.extraction_cache_key("abc", "text") != before
+
+
+def test_extraction_key_follows_learned_templates(monkeypatch, tmp_path):
+    learned = tmp_path / "learned.json"
+    monkeypatch.setattr(templates, "LEARNED_TEMPLATES_PATH", str(learned))
+    before = extractor.extraction_cache_key("abc", "text")
+    learned.write_text("[]")
+    assert extractor.extraction_cache_key("abc", "text") != before
+    assert extractor.extraction_cache_key("abc", "text") == extractor.extraction_cache_key("abc", "text")
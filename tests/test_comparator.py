@@ -0,0 +1,62 @@
+# tests/test_comparator.py
+import numpy as np
+import pandas as pd
+
+from backend.comparator import create_trend_plot, downsample_trend, lttb_indices, trend_plot_png
+
+
+def make_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = list(pd.date_range("2020-01-01", periods=n, freq="D"))
+    values = (100 + np.cumsum(rng.normal(0, 2, n))).tolist()
+    return dates, values
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[337], y[612] = 50.0, -50.0
+    picked = lttb_indices(x, y, 20)
+    assert len(picked) == 20
+    assert picked[0] == 0 and picked[-1] == 999
+    assert np.all(np.diff(picked) > 0)
+    assert 337 in picked and 612 in picked
+
+
+def test_lttb_leaves_short_series_alone():
+    assert lttb_indices(np.arange(10.0), np.arange(10.0), 20).tolist() == list(range(10))
+
+
+def test_downsample_only_above_the_threshold():
+    dates, values = make_series(500)
+    assert downsample_trend(dates, values, max_points=50, downsample_above=1000) == (dates, values)
+
+    small_dates, small_values = downsample_trend(dates, values, max_points=50, downsample_above=100)
+    assert len(small_dates) == len(small_values) == 50
+    assert small_dates[0] == dates[0] and small_dates[-1] == dates[-1]
+    picked = [dates.index(d) for d in small_dates]
+    assert [values[i] for i in picked] == small_values
+
+
+def test_downsample_drops_unplottable_points():
+    dates, values = make_series(200)
+    dates[10], values[20] = None, None
+    small_dates, small_values = downsample_trend(dates, values, max_points=30, downsample_above=0)
+    assert None not in small_dates and None not in small_values
+
+
+def test_trend_plot_draws_downsampled_series():
+    dates, values = make_series(400)
+    trend = {"GLUCOSE": {"dates": dates, "values": values}}
+    line = create_trend_plot(trend, "GLUCOSE", max_points=40, downsample_above=100).axes[0].lines[0]
+    assert len(line.get_xdata()) == 40
+    line = create_trend_plot(trend, "GLUCOSE", max_points=40, downsample_above=1000).axes[0].lines[0]
+    assert len(line.get_xdata()) == 400
+
+
+def test_trend_png_is_rendered_once_per_series():
+    dates, values = make_series(50)
+    trend = {"GLUCOSE": {"dates": dates, "values": values}}
+    png = trend_plot_png(trend, "GLUCOSE")
+    assert png.startswith(b"\x89PNG")
+    assert trend_plot_png({"GLUCOSE": {"dates": list(dates), "values": list(values)}}, "GLUCOSE") is png
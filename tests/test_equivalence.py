@@ -0,0 +1,66 @@
+# tests/test_equivalence.py
+# The rewritten analyzer, summarizer, connection rules and trend analysis must give
+# the same output as the implementations they replaced, which the benchmark scripts
+# keep verbatim.
+import random
+
+import pytest
+
+import benchmark_analyzer
+import benchmark_rules
+import benchmark_summarizer
+import benchmark_trends
+from backend.analyzer import analyze_results
+from backend.comparator import generate_trend_analysis
+from backend.rules import compile_rules, match_rules
+from backend.summarizer import (
+    CONNECTIONS_KNOWLEDGE_BASE, find_possible_connections, generate_summaries, generate_summary,
+)
+from backend.trends import add_report_to_state, new_trend_state, summary_from_state
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(21)
+
+
+def test_analyze_results_matches_baseline():
+    df = benchmark_analyzer.make_history(5000)
+    old = benchmark_analyzer.old_analyze_results(df.copy())
+    new = analyze_results(df.copy())
+    assert new["Status"].tolist() == old["Status"].tolist()
+    assert new["Reference Range Used"].tolist() == old["Reference Range Used"].tolist()
+
+
+def test_generate_summary_matches_baseline():
+    reports = benchmark_summarizer.make_reports(200)
+    old = [benchmark_summarizer.old_generate_summary(df.copy(), diagnosis) for df, diagnosis in reports]
+    assert [generate_summary(df, diagnosis) for df, diagnosis in reports] == old
+    assert generate_summaries(reports) == old
+
+
+def test_connection_rules_match_baseline():
+    reports = [benchmark_rules.make_report() for _ in range(40)]
+    old = [benchmark_rules.old_find_possible_connections(df, CONNECTIONS_KNOWLEDGE_BASE) for df in reports]
+    assert [find_possible_connections(df) for df in reports] == old
+
+    rules = benchmark_rules.make_rules(100)
+    engine = compile_rules(rules)
+    old = [benchmark_rules.old_find_possible_connections(df, rules) for df in reports]
+    assert [[msg for _, msg in match_rules(engine, df)] for df in reports] == old
+    assert any(old)
+
+
+def test_trend_analysis_matches_baseline():
+    histories = [benchmark_trends.make_history(random.randint(1, 40)) for _ in range(30)]
+    for i, history in enumerate(histories):
+        frame = benchmark_trends.history_frame(history)
+        _, old_trends = benchmark_trends.old_generate_trend_analysis(frame.copy())
+        summary, trends = generate_trend_analysis(frame)
+        assert trends == old_trends
+
+        # the incremental state saved with each report renders the same summary
+        state = new_trend_state(f"user{i}")
+        for report in history:
+            add_report_to_state(state, report)
+        assert summary_from_state(state) == (summary, list(trends))
@@ -0,0 +1,22 @@
+# tests/test_extractor.py
+from datetime import datetime
+
+import pytest
+
+from backend.extractor import parse_report_date
+
+
+@pytest.mark.parametrize("text, date", [
+    ("Patient: A\nCollected On: 12/03/2021 10:20\nGLUCOSE 90", datetime(2021, 3, 12)),
+    ("Report Date 2021-03-12", datetime(2021, 3, 12)),
+    ("Sample date: 5 Mar 2020", datetime(2020, 3, 5)),
+    ("Reported: March 7, 2019", datetime(2019, 3, 7)),
+    ("Date: 03/25/2022", datetime(2022, 3, 25)),
+    ("Date of Birth: 01/02/1980\nReported: 04/05/2021", datetime(2021, 5, 4)),
+    ("GLUCOSE 12/03/2021", None),
+    ("Date: 31/02/2021", None),
+    ("Date: 01/01/2099", None),
+    ("", None),
+])
+def test_parse_report_date(text, date):
+    assert parse_report_date(text) == date
@@ -0,0 +1,72 @@
+# tests/test_jobs.py
+import os
+import threading
+import time
+
+import pytest
+
+from backend import jobs
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    jobs._jobs.clear()
+    jobs._keys.clear()
+    yield
+    jobs._jobs.clear()
+    jobs._keys.clear()
+
+
+def wait_done(job_id, owner=None):
+    for _ in range(200):
+        job = jobs.get_job(job_id, owner=owner)
+        if job is None or job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_is_only_visible_to_its_owner():
+    job_id = jobs.submit_job(lambda set_stage: 42, owner="a@example.com")
+    assert wait_done(job_id, owner="a@example.com")["result"] == 42
+    assert jobs.get_job(job_id, owner="b@example.com") is None
+    assert jobs.get_job(job_id) is None
+
+
+def test_finished_jobs_are_capped(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_FINISHED", 3)
+    ids = []
+    for i in range(6):
+        ids.append(jobs.submit_job(lambda set_stage, i=i: i, key=("u", i)))
+        wait_done(ids[-1])
+        time.sleep(0.01)
+    jobs.get_job(ids[-1])  # any access evicts
+    assert sorted(jobs._jobs) == sorted(ids[-3:])
+    assert sorted(jobs._keys) == [("u", 3), ("u", 4), ("u", 5)]
+
+
+class RacingKeys(dict):
+    """_keys as seen by two submissions that both pass the early duplicate check."""
+
+    def get(self, key, default=None):
+        return None
+
+
+def test_duplicate_upload_file_is_removed(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(jobs, "_keys", RacingKeys())
+    release = threading.Event()
+
+    def slow_upload(set_stage, file_path, *args, **kwargs):
+        release.wait(5)
+        os.remove(file_path)
+        return file_path
+
+    monkeypatch.setattr(jobs, "process_upload", slow_upload)
+    first = jobs.submit_report_job(b"%PDF", "a.pdf", "u@example.com", "hash")
+    second = jobs.submit_report_job(b"%PDF", "a.pdf", "u@example.com", "hash")
+    assert second == first
+    assert len(os.listdir(tmp_path / "uploads")) == 1
+    release.set()
+    wait_done(first, owner="u@example.com")
+    assert os.listdir(tmp_path / "uploads") == []
@@ -0,0 +1,35 @@
+# tests/test_line_tokenizer.py
+import pytest
+
+from backend.analyzer import analyze_results
+from backend.extractor import parse_report_text
+from backend.line_tokenizer import tokenize_line
+from backend.units import canonicalize_units
+
+
+@pytest.mark.parametrize("line, unit", [
+    ("WBC 7.2 10^3/uL", "10^3/uL"),
+    ("Platelet count 250 x10^3/µL", "x10^3/µL"),
+    ("WBC Count 7.1 × 10^9/L", "× 10^9/L"),
+    ("WBC 6.1 10³/µL", "10³/µL"),
+    ("WBC 6.4 10*3/uL", "10*3/uL"),
+    ("Hemoglobin 13.5 g/dL (13-17)", "g/dL"),
+    ("Glucose 140 mg/dL", "mg/dL"),
+])
+def test_unit_capture(line, unit):
+    assert tokenize_line(line)[2] == unit
+
+
+@pytest.mark.parametrize("line, name, value", [
+    ("WBC 7.2 10^3/uL", "WBC", 7200.0),
+    ("Platelet count 250 x10^3/µL", "PLATELET COUNT", 250000.0),
+    ("WBC Count 7.1 × 10^9/L", "WBC COUNT", 7100.0),
+    ("WBC 6.1 10³/µL", "WBC", 6100.0),
+])
+def test_count_units_are_canonicalized(line, name, value):
+    df = canonicalize_units(parse_report_text(line))
+    row = df.iloc[0]
+    assert row["Test Name"] == name
+    assert row["Value"] == value
+    assert row["Unit"] == "/uL"
+    assert analyze_results(df).iloc[0]["Status"] == "Normal"
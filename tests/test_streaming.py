@@ -0,0 +1,58 @@
+# tests/test_streaming.py
+import time
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from backend.extractor import process_report
+from backend.time_budget import TimeBudget
+
+TESTS = ["GLUCOSE", "HEMOGLOBIN", "CHOLESTEROL", "TSH", "CREATININE"]
+
+
+def make_pdf(path, n_pages, blank=()):
+    """One result line per page; pages in `blank` have no text layer (they would need OCR)."""
+    pdf = canvas.Canvas(str(path))
+    for i in range(n_pages):
+        if i + 1 not in blank:
+            pdf.drawString(72, 720, f"{TESTS[i % len(TESTS)]} {90 + i} mg/dL (70-100)")
+        pdf.showPage()
+    pdf.save()
+    return str(path)
+
+
+def test_stream_has_no_report_deadline_by_default(tmp_path):
+    stream = process_report(make_pdf(tmp_path / "r.pdf", 3), stream=True, use_cache=False)
+    assert stream.budget.deadline is None
+    assert len(list(stream)) == 3
+    assert stream.skipped_pages == []
+
+
+def test_slow_consumer_still_gets_text_pages_after_the_deadline(tmp_path):
+    path = make_pdf(tmp_path / "r.pdf", 10)
+    stream = process_report(path, stream=True, use_cache=False, budget=TimeBudget(total=0.1))
+    records = []
+    for record in stream:
+        records.append(record)
+        time.sleep(0.05)
+    assert len(records) == 10
+    assert stream.skipped_pages == []
+
+
+def test_scanned_pages_after_the_deadline_are_reported(tmp_path):
+    path = make_pdf(tmp_path / "r.pdf", 6, blank={4, 6})
+    budget = TimeBudget(total=0.01)
+    time.sleep(0.02)
+    stream = process_report(path, stream=True, use_cache=False, budget=budget)
+    assert len(list(stream)) == 4
+    assert stream.skipped_pages == [4, 6]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_text_pages_are_read_when_the_budget_is_spent(tmp_path, stream):
+    path = make_pdf(tmp_path / "r.pdf", 4)
+    budget = TimeBudget(total=0.01)
+    time.sleep(0.02)
+    result = process_report(path, stream=stream, use_cache=False, budget=budget)
+    n = len(list(result)) if stream else len(result[0])
+    assert n == 4
@@ -0,0 +1,47 @@
+# tests/test_trends.py
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from backend.comparator import generate_trend_analysis
+from backend.trends import build_trend_state, new_test_stats, summary_from_state, update_test_stats
+from benchmark_trends import history_frame, old_generate_trend_analysis
+
+
+def report(day, tests):
+    return {
+        "upload_date": datetime(2024, 1, 1) + timedelta(days=day),
+        "tests": [{"test_name": n, "value": v, "status": s} for n, v, s in tests],
+    }
+
+
+# GLUCOSE is printed twice in every report (e.g. fasting and a repeat)
+DUPLICATED = [
+    report(0, [("GLUCOSE", 95.0, "Normal"), ("GLUCOSE", 97.0, "Normal"), ("TSH", 2.0, "Normal")]),
+    report(30, [("GLUCOSE", 120.0, "Slightly High"), ("GLUCOSE", 118.0, "Slightly High"), ("TSH", 2.1, "Normal")]),
+    report(60, [("GLUCOSE", 160.0, "High"), ("GLUCOSE", 158.0, "High"), ("TSH", 2.2, "Normal")]),
+]
+
+
+def test_same_date_values_count_once():
+    stats = new_test_stats()
+    for r in DUPLICATED:
+        for t in r["tests"]:
+            if t["test_name"] == "GLUCOSE":
+                update_test_stats(stats, r["upload_date"], t["value"])
+    # two earlier report dates in the baseline, the newest held apart
+    assert stats["n"] == 2
+    assert stats["mean"] == pytest.approx((95.0 + 120.0) / 2)
+    assert stats["last"] == 160.0
+
+
+@pytest.mark.parametrize("n_reports", [2, 3])
+def test_duplicate_rows_match_the_baseline_summary(n_reports):
+    history = DUPLICATED[:n_reports]
+    expected_summary, expected_trends = old_generate_trend_analysis(history_frame(history))
+    summary, trends = generate_trend_analysis(history_frame(history))
+    assert "Biggest Change" in expected_summary
+    assert summary == expected_summary
+    assert trends == expected_trends
+    assert summary_from_state(build_trend_state("u", history)) == (summary, list(trends))
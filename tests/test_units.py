@@ -0,0 +1,54 @@
+# tests/test_units.py
+import pandas as pd
+import pytest
+
+from backend.analyzer import analyze_results
+from backend.extractor import parse_report_text
+from backend.units import canonicalize_units
+
+
+def canonical_row(line):
+    df = canonicalize_units(parse_report_text(line))
+    assert len(df) == 1
+    return df.iloc[0]
+
+
+def test_glucose_mmol_per_l_becomes_mg_per_dl():
+    row = canonical_row("Glucose 5.5 mmol/L (3.9-5.6)")
+    assert row["Test Name"] == "GLUCOSE"
+    assert row["Value"] == pytest.approx(5.5 * 18.016, abs=1e-3)
+    assert row["Unit"] == "mg/dL"
+    low, high, _ = row["Reference Range Parsed"]
+    assert low == pytest.approx(3.9 * 18.016, abs=1e-3)
+    assert high == pytest.approx(5.6 * 18.016, abs=1e-3)
+    assert (row["Value Original"], row["Unit Original"]) == (5.5, "mmol/L")
+
+
+def test_hba1c_mmol_per_mol_uses_the_affine_conversion():
+    row = canonical_row("HbA1c 48 mmol/mol (20-42)")
+    assert row["Test Name"] == "HBA1C"
+    assert row["Value"] == pytest.approx(48 * 0.09148 + 2.152, abs=1e-3)
+    assert row["Unit"] == "%"
+    low, high, _ = row["Reference Range Parsed"]
+    assert low == pytest.approx(20 * 0.09148 + 2.152, abs=1e-3)
+    assert high == pytest.approx(42 * 0.09148 + 2.152, abs=1e-3)
+    assert (row["Value Original"], row["Unit Original"]) == (48.0, "mmol/mol")
+    # 48 mmol/mol is above the printed 20-42 range, and stays so once converted
+    assert analyze_results(canonicalize_units(parse_report_text("HbA1c 48 mmol/mol (20-42)"))).iloc[0]["Status"] != "Normal"
+
+
+@pytest.mark.parametrize("name, value, unit", [
+    ("GLUCOSE", 5.5, "umol/L"),      # test in the table, unit not convertible
+    ("VITAMIN D", 30.0, "ng/mL"),   # test not in the table
+    ("GLUCOSE", 99.0, ""),          # no unit printed
+])
+def test_unknown_units_pass_through(name, value, unit):
+    df = pd.DataFrame({
+        "Test Name": [name], "Value": [value], "Unit": [unit],
+        "Reference Range Parsed": [(1.0, 2.0, None)],
+    })
+    row = canonicalize_units(df).iloc[0]
+    assert row["Value"] == value
+    assert row["Unit"] == unit
+    assert row["Reference Range Parsed"] == (1.0, 2.0, None)
+    assert (row["Value Original"], row["Unit Original"]) == (value, unit)
@@ -0,0 +1,61 @@
+# tests/test_visualizer.py
+# Rendered charts are cached by content: identical data gives the identical key
+# (and PNG), any changed value gives a new key and a new PNG.
+import pandas as pd
+import pytest
+
+from backend import visualizer
+from backend.comparator import trend_plot_png
+from backend.visualizer import create_visual_summary
+
+
+@pytest.fixture
+def draws(monkeypatch):
+    """Counts results charts actually drawn."""
+    calls = []
+    draw = visualizer._draw_visual_summary
+
+    def counting(*args):
+        calls.append(args)
+        return draw(*args)
+
+    monkeypatch.setattr(visualizer, "_draw_visual_summary", counting)
+    return calls
+
+
+def results(values):
+    return pd.DataFrame({
+        "Test Name": ["GLUCOSE", "HEMOGLOBIN", "TSH"],
+        "Value": values,
+        "Status": ["High", "Normal", "Normal"],
+    })
+
+
+def test_results_chart_identical_data_is_drawn_once(draws):
+    first = create_visual_summary(results([181.0, 13.1, 2.2]))
+    again = create_visual_summary(results([181.0, 13.1, 2.2]))
+    assert again == first
+    assert len(draws) == 1
+
+
+def test_results_chart_changed_value_is_redrawn(draws):
+    first = create_visual_summary(results([182.0, 13.1, 2.2]))
+    changed = create_visual_summary(results([182.0, 13.4, 2.2]))
+    assert changed != first
+    assert len(draws) == 2
+
+
+def test_trend_chart_corrected_value_under_same_dates_is_redrawn():
+    dates = list(pd.date_range("2024-01-01", periods=5, freq="30D"))
+    values = [92.0, 97.0, 101.0, 99.0, 140.0]
+    first = trend_plot_png({"GLUCOSE": {"dates": dates, "values": values}}, "GLUCOSE")
+    corrected = trend_plot_png({"GLUCOSE": {"dates": dates, "values": values[:-1] + [104.0]}}, "GLUCOSE")
+    assert len(corrected) and corrected != first
+    assert trend_plot_png({"GLUCOSE": {"dates": dates, "values": list(values)}}, "GLUCOSE") == first
+
+
+def test_chart_key_covers_every_part():
+    key = visualizer.chart_key("trend", "GLUCOSE", b"\x00\x01")
+    assert key == visualizer.chart_key("trend", "GLUCOSE", b"\x00\x01")
+    assert key != visualizer.chart_key("trend", "GLUCOSE", b"\x00\x02")
+    assert key != visualizer.chart_key("trend", "GLUCOSE", b"\x00", b"\x01")